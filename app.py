@@ -2,9 +2,34 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from datetime import datetime, timedelta
+import functools
+import io
 import os
+import time
+
+from PIL import Image
+
+from core.cache import CACHE_STATS
+from core.charts import line_trace
+from core.editor import editor_batch, has_changes
+from core.finance import (
+    RECURRING_HORIZON_DAYS, category_options as build_category_options, forecast_recurring_by_month,
+    ledger_summary, monthly_expenses, new_bill, new_recurring_bill, new_transaction, next_occurrences,
+    parse_monthly_returns, pending_bill_positions as find_pending_bills, pending_bills_total, pending_page,
+    pending_schedule, simulation_summary, upcoming_occurrences,
+)
+from core.forecast import FORECAST_MONTHS, cash_flow_forecast
+from core.importer import import_statement
+from core.instrumentation import SPANS
+from core.montecarlo import simulate_percentiles
+from core.pagination import PAGE_SIZES, format_page, page_bounds, page_count, view_positions
+from core.simulation import rate_sensitivity_band, simulate_investment
+from core.ledger import open_ledger
+from core.recurrence import FREQUENCIES
+from core.storage import BILLS_SCHEMA, ID_COLUMN, RECURRING_SCHEMA, TRANSACTIONS_SCHEMA, CsvBackend
+from core.tenants import DEFAULT_TENANT, tenant_data_dir, tenant_slug
+from core.timing import SECTION_TIMINGS
 
 # --- Configuração da Página ---
 st.set_page_config(
@@ -14,114 +39,33 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Execução completa do script (as reexecuções de uma seção isolada não passam por aqui);
+# volta a False no fim do script
+script_start = time.perf_counter()
+st.session_state.full_run = True
+
 # --- Estilo CSS para o Tema Claro (Ajustado para Melhor Legibilidade e Fontes) ---
-st.markdown(
-    """
-    <style>
-    /* Cores de fundo geral */
-    .stApp {
-        background-color: #FDFDFD; /* Quase branco puro para o fundo principal */
-        color: #333333; /* Cor de texto padrão mais escura para contraste */
-    }
+# A folha de estilo fica em assets/style.css e é lida do disco uma única vez por processo
+@st.cache_resource
+def load_stylesheet(path):
+    with open(path, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
 
-    /* Estilo da barra lateral */
-    .stSidebar {
-        background-color: #E0F7FA; /* Azul claro suave para a barra lateral */
-        color: #333333; /* Texto padrão na sidebar */
-    }
-    .stSidebar h1, .stSidebar h2, .stSidebar h3, .stSidebar h4, .stSidebar h5, .stSidebar h6 {
-        color: #004D40; /* Verde escuro para títulos na sidebar, para bom contraste */
-    }
+st.markdown(load_stylesheet("assets/style.css"), unsafe_allow_html=True)
 
-    /* Cores dos Títulos Principais no Conteúdo */
-    h1 { color: #004D40; /* Verde escuro forte para o título principal */ }
-    h2 { color: #004D40; /* Verde escuro forte para subtítulos */ }
-    h3 { color: #00695C; /* Um tom de verde um pouco mais claro para h3 */ }
-    h4, h5, h6 { color: #212121; /* Preto quase total para os demais títulos */ }
-    
-    /* Cores do texto do corpo */
-    p, label, .stMarkdown {
-        color: #424242; /* Cinza escuro para o texto do corpo, fácil de ler */
-    }
-    
-    /* Cards de métricas */
-    [data-testid="stMetric"] {
-        background-color: #F0F4C3; /* Verde pastel muito claro para métricas */
-        border-radius: 12px;
-        padding: 20px;
-        box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-        border: 1px solid #DCE775;
-    }
-    [data-testid="stMetric"] label {
-        color: #004D40 !important; /* Cor do rótulo da métrica - Verde escuro com !important */
-        font-size: 1.1em !important;
-        font-weight: bold !important;
-    }
-    [data-testid="stMetricValue"] {
-        color: #000000 !important; /* PRETO PURO com !important para máxima visibilidade */
-        font-size: 1.2em !important; /* Tamanho da fonte ajustado */
-        font-weight: bold !important;
-    }
+# Largura da foto da barra lateral (o dobro da barra, para telas de alta densidade)
+SIDEBAR_IMAGE_WIDTH = 600
 
-    /* Botões */
-    .stButton>button {
-        background-color: #81D4FA; /* Azul claro para botões */
-        color: white;
-        border-radius: 8px;
-        border: none;
-        padding: 12px 24px;
-        font-weight: bold;
-        transition: background-color 0.3s ease;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    .stButton>button:hover {
-        background-color: #4FC3F7; /* Azul um pouco mais escuro no hover */
-        box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-    }
-
-    /* Caixas de informação/sucesso/alerta */
-    .stAlert {
-        border-radius: 10px;
-        padding: 15px;
-    }
-    .stInfo {
-        background-color: #E0F7FA; /* Azul claro para info */
-        color: #004D40; /* Texto verde escuro */
-        border-left: 5px solid #29B6F6; /* Borda azul mais forte */
-    }
-    .stSuccess {
-        background-color: #E8F5E9; /* Verde claro para sucesso */
-        color: #1B5E20; /* Texto verde escuro */
-        border-left: 5px solid #66BB6A; /* Borda verde mais forte */
-    }
-    .stWarning {
-        background-color: #FFFDE7; /* Amarelo muito claro para warning */
-        color: #FF6F00; /* Texto laranja */
-        border-left: 5px solid #FFA726; /* Borda laranja mais forte */
-    }
-
-    /* Ajuste para o gráfico de pizza */
-    .js-plotly-plot .plotly .scatterlayer .fills {
-        fill-opacity: 0.9;
-    }
-    /* Estilo para a tabela de dados */
-    .dataframe {
-        border-radius: 10px;
-        overflow: hidden;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.08);
-    }
-    .dataframe th {
-        background-color: #BBDEFB; /* Azul claro para cabeçalhos da tabela */
-        color: #1A237E; /* Azul escuro para texto do cabeçalho */
-        font-weight: bold;
-    }
-    .dataframe tr:nth-child(even) {
-        background-color: #F5F5F5; /* Listras leves para legibilidade */
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+@st.cache_resource
+def load_sidebar_image(path, width=SIDEBAR_IMAGE_WIDTH):
+    """Foto da barra lateral reduzida para `width` px (JPEG); None se o arquivo não existir."""
+    if not os.path.exists(path):
+        return None
+    with Image.open(path) as image:
+        image.thumbnail((width, width * 4))
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, format="JPEG", quality=85, optimize=True)
+    return buffer.getvalue()
 
 
 # --- Funções de Ajuda para Gerenciamento de Dados ---
@@ -131,108 +75,200 @@ data_dir = "data"
 if not os.path.exists(data_dir):
     os.makedirs(data_dir)
 
-# Caminhos dos arquivos ajustados para a pasta 'data/'
-DATA_FILE = os.path.join(data_dir, "transactions.csv")
-BILLS_FILE = os.path.join(data_dir, "bills.csv")
-
-
-def create_empty_transactions_df():
-    """Cria um DataFrame de transações vazio com os tipos de dados corretos."""
-    df = pd.DataFrame(columns=["Data", "Tipo", "Categoria", "Valor", "Descrição"])
-    return df.astype({
-        "Data": 'datetime64[ns]',
-        "Tipo": str,
-        "Categoria": str,
-        "Valor": float,
-        "Descrição": str
-    })
-
-def create_empty_bills_df():
-    """Cria um DataFrame de contas a pagar vazio com os tipos de dados corretos."""
-    df = pd.DataFrame(columns=["Descrição", "Valor", "Data de Vencimento", "Pago"])
-    return df.astype({
-        "Descrição": str,
-        "Valor": float,
-        "Data de Vencimento": 'datetime64[ns]',
-        "Pago": bool
-    })
-
-@st.cache_data # Cache para carregar dados de transações (roda apenas se o arquivo muda ou o cache é limpo)
-def load_data_from_csv():
-    """Carrega o DataFrame de transações ou cria um vazio se não existir, garantindo tipos corretos."""
-    try:
-        df = pd.read_csv(DATA_FILE)
-        
-        df["Data"] = pd.to_datetime(df["Data"], format="%Y-%m-%d", errors='coerce')
-        df = df.dropna(subset=['Data'])
-        
-        df["Valor"] = pd.to_numeric(df["Valor"], errors='coerce') 
-        df = df.dropna(subset=['Valor'])
-        
-        return df.astype({
-            "Data": 'datetime64[ns]',
-            "Tipo": str,
-            "Categoria": str,
-            "Valor": float,
-            "Descrição": str
-        })
-
-    except FileNotFoundError:
-        return create_empty_transactions_df()
-    except Exception as e:
-        st.error(f"Erro ao carregar transactions.csv: {e}. Criando DataFrame vazio.")
-        return create_empty_transactions_df()
 
+def current_tenant():
+    """Usuário (tenant) desta sessão, que define a pasta de dados usada.
+
+    Com login configurado (st.login), é o e-mail do usuário. Sem login, `?tenant=<nome>` na
+    URL apenas separa os dados (não é controle de acesso); sem nenhum dos dois, os dados
+    ficam na pasta 'data' original.
+    """
+    if st.user.get("is_logged_in") and st.user.get("email"):
+        return tenant_slug(st.user.get("email"))
+    return tenant_slug(st.query_params.get("tenant", DEFAULT_TENANT))
+
+TENANT = current_tenant()
+
+# Armazenamento colunar (Feather por padrão; IASMIN_STORAGE=csv mantém o CSV) com journal
+# append-only: novas linhas vão para '<arquivo>.journal' e são incorporadas ao arquivo base
+# em segundo plano. Na primeira execução os CSVs existentes são migrados (ver core/storage.py).
+# Edições seguidas dentro de IASMIN_FLUSH_DELAY segundos (0.2 por padrão) são gravadas juntas.
+# Com IASMIN_STORAGE=sqlite os dados ficam em tabelas SQLite indexadas (core/sqlite_store.py)
+def show_load_error(store, error):
+    st.error(f"Erro ao carregar {store.base_path}: {error}. Criando DataFrame vazio.")
+
+@st.cache_resource # Um por usuário e processo: stores (versão, lock, journal), DataFrames e totais compartilhados entre sessões
+def open_user_ledger(tenant):
+    """Abre os dados do usuário uma única vez por processo (ver core/ledger.py).
+
+    A primeira carga começa em segundo plano, enquanto o título e a barra lateral são
+    desenhados; LEDGER.snapshot() espera por ela se ainda não tiver terminado.
+    """
+    ledger = open_ledger(tenant_data_dir(data_dir, tenant))
+    ledger.warm()
+    return ledger
+
+LEDGER = open_user_ledger(TENANT)
+TRANSACTIONS_STORE = LEDGER.transactions_store
+BILLS_STORE = LEDGER.bills_store
+
+# No modo SQLite as transações não são carregadas na memória: filtros, página exibida e
+# agregações são consultas ao banco, e a memória não cresce com o livro-caixa
+SQL_MODE = LEDGER.sql_ledger is not None
+
+
+def versioned_cache(*datasets):
+    """Cacheia (st.cache_data) uma função derivada de `datasets`, contando acertos e recálculos.
+
+    A função recebe o usuário e as versões dos conjuntos de dados como argumentos comuns,
+    que formam a chave do cache, e os DataFrames em parâmetros com prefixo '_', que o
+    Streamlit não inclui no hash. Assim, salvar contas invalida apenas os resultados que
+    dependem de contas.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            CACHE_STATS.record_miss(datasets)
+            return func(*args, **kwargs)
+
+        cached = st.cache_data(show_spinner=False)(compute)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            CACHE_STATS.record_call(datasets)
+            return cached(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Escritas: cada uma grava no store e publica um novo snapshot compartilhado
 def save_data(df):
-    """Salva o DataFrame de transações no arquivo CSV e limpa o cache."""
-    df_to_save = df.copy() 
-    df_to_save['Data'] = df_to_save['Data'].dt.strftime('%Y-%m-%d') 
-    df_to_save.to_csv(DATA_FILE, index=False)
-    st.session_state.transactions_df = df 
-    st.cache_data.clear() # Limpa o cache para que load_data_from_csv() releia o arquivo na próxima execução
-
-
-@st.cache_data # Cache para carregar dados de contas (roda apenas se o arquivo muda ou o cache é limpo)
-def load_bills_from_csv():
-    """Carrega o DataFrame de contas a pagar ou cria um vazio se não existir, garantindo tipos corretos."""
-    try:
-        df = pd.read_csv(BILLS_FILE)
-        
-        df["Data de Vencimento"] = pd.to_datetime(df["Data de Vencimento"], format="%Y-%m-%d", errors='coerce')
-        df = df.dropna(subset=['Data de Vencimento'])
-        df["Valor"] = pd.to_numeric(df["Valor"], errors='coerce')
-        df = df.dropna(subset=['Valor'])
-        df["Pago"] = df["Pago"].astype(bool)
-        return df.astype({
-            "Descrição": str,
-            "Valor": float,
-            "Data de Vencimento": 'datetime64[ns]',
-            "Pago": bool
-        })
-    except FileNotFoundError:
-        return create_empty_bills_df()
-    except Exception as e:
-        st.error(f"Erro ao carregar bills.csv: {e}. Criando DataFrame vazio.")
-        return create_empty_bills_df()
+    """Reescreve o arquivo de transações por completo (ex.: importação de CSV)."""
+    LEDGER.replace_transactions(df)
+
+def edit_data(batch, version):
+    """Aplica um lote de alterações do editor: uma entrada no journal e totais atualizados por delta.
+
+    `version` é a versão das transações exibida no editor (de onde vêm os IDs do lote).
+    """
+    LEDGER.edit_transactions(batch, version)
+
+def append_data(new_rows_df):
+    """Acrescenta novas transações ao journal, sem reescrever o arquivo inteiro."""
+    LEDGER.append_transactions(new_rows_df)
+
+def categorize_uncategorized():
+    """Preenche a categoria das transações sem categoria com a sugestão aprendida do histórico."""
+    return LEDGER.categorize_uncategorized()
 
 def save_bills(df):
-    """Salva o DataFrame de contas a pagar no arquivo CSV e limpa o cache."""
-    df_to_save = df.copy()
-    df_to_save['Data de Vencimento'] = df_to_save['Data de Vencimento'].dt.strftime('%Y-%m-%d')
-    df_to_save.to_csv(BILLS_FILE, index=False)
-    st.session_state.bills_df = df 
-    st.cache_data.clear() # Limpa o cache para que load_bills_from_csv() releia o arquivo na próxima execução
+    """Reescreve o arquivo de contas a pagar por completo (ex.: importação de CSV)."""
+    LEDGER.replace_bills(df)
+
+def edit_bills(batch, version):
+    """Aplica um lote de alterações do editor de contas (ver edit_data())."""
+    LEDGER.edit_bills(batch, version)
+
+def append_bills(new_rows_df):
+    """Acrescenta novas contas a pagar ao journal, sem reescrever o arquivo inteiro."""
+    LEDGER.append_bills(new_rows_df)
+
+def edit_recurring(batch, version):
+    """Aplica um lote de alterações do editor de contas recorrentes (ver edit_data())."""
+    LEDGER.edit_recurring(batch, version)
+
+def append_recurring(new_rules_df):
+    """Acrescenta novas regras de contas recorrentes."""
+    LEDGER.append_recurring(new_rules_df)
+
+def pay_occurrence(occurrence):
+    """Registra o pagamento de uma ocorrência recorrente (uma conta paga + "Pago Até" da regra)."""
+    due_date = occurrence["Data de Vencimento"]
+    LEDGER.pay_occurrence(
+        occurrence["Regra"], due_date,
+        new_bill(occurrence["Descrição"], occurrence["Valor"], due_date, paid=True),
+    )
 
 
-# Inicializa os DataFrames no st.session_state no início da execução do script
-if "transactions_df" not in st.session_state:
-    st.session_state.transactions_df = load_data_from_csv()
-if "bills_df" not in st.session_state:
-    st.session_state.bills_df = load_bills_from_csv()
+@versioned_cache("transactions")
+def transaction_view_positions(tenant, version, sort_by, descending, _df, _date_index, **filters):
+    """Posições das transações filtradas e ordenadas (a página exibida é um recorte delas).
+
+    O período e a ordenação por Data saem do índice por data do snapshot (core/dateindex.py).
+    """
+    return view_positions(_df, sort_by, descending, date_index=_date_index, **filters)
+
+@versioned_cache("bills")
+def pending_bill_positions(tenant, version, _df):
+    """Posições das contas não pagas, por data de vencimento (ver core/finance.py)."""
+    return find_pending_bills(_df)
+
+# As ocorrências recorrentes são expandidas só para a janela exibida; `today` entra na
+# chave para que a janela avance com a data
+@versioned_cache("recurring")
+def pending_recurring(tenant, version, today, _df):
+    """Ocorrências recorrentes pendentes: vencidas e dos próximos dias (ver core/finance.py)."""
+    return upcoming_occurrences(_df, today)
+
+@versioned_cache("recurring")
+def recurring_forecast(tenant, version, today, _df):
+    """Ocorrências recorrentes previstas por mês, para o gráfico de despesas mensais."""
+    return forecast_recurring_by_month(_df, today)
+
+@versioned_cache("transactions", "bills", "recurring")
+def projected_cash_flow(tenant, transactions_version, bills_version, recurring_version, today, months,
+                        _rollups, _bills_df, _recurring_df):
+    """Saldo projetado dia a dia para os próximos `months` meses (ver core/forecast.py)."""
+    return cash_flow_forecast(_rollups, _bills_df, _recurring_df, today, months)
+
+def page_controls(n_rows, key):
+    """Seletores de tamanho e número da página; retorna o intervalo [início, fim) a exibir."""
+    col_size, col_page, col_info = st.columns([1, 1, 2])
+    page_size = col_size.selectbox("Linhas por página", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    n_pages = page_count(n_rows, page_size)
+    # Filtros podem reduzir o número de páginas: volta para a última página válida
+    if st.session_state.get(f"{key}_page", 1) > n_pages:
+        st.session_state[f"{key}_page"] = n_pages
+    page = col_page.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, step=1, key=f"{key}_page")
+    start, stop = page_bounds(n_rows, page, page_size)
+    col_info.caption(f"Mostrando {start + 1}–{stop} de {n_rows} linhas" if n_rows else "Nenhuma linha encontrada.")
+    return start, stop
+
+
+def plotly_modules():
+    """plotly.express e plotly.graph_objects, importados só quando uma seção desenha um gráfico.
+
+    O import do Plotly é a parte mais cara da carga do script; adiá-lo deixa o título, a
+    barra lateral e os indicadores aparecerem antes. Depois do primeiro, é uma consulta
+    a sys.modules.
+    """
+    with SPANS.span("import.plotly"):
+        import plotly.express as px
+        import plotly.graph_objects as go
+    return px, go
+
+
+def dashboard_section(name):
+    """Transforma uma seção do dashboard em fragmento (st.fragment), com o tempo medido.
+
+    Um widget dentro da seção reexecuta só a seção, não o script inteiro. Os dados de que
+    ela depende, inclusive o usuário (tenant), as versões e a data de hoje, são os seus
+    parâmetros: numa reexecução isolada, o Streamlit repete a chamada com os argumentos da
+    última execução completa. Fora eles, a seção só usa o livro-caixa da sessão (LEDGER,
+    TRANSACTIONS_STORE) para escritas e consultas do modo SQLite; escritas chamam
+    st.rerun(), que reexecuta o script inteiro com o novo snapshot.
+    """
+    def decorator(func):
+        @st.fragment
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            partial = not st.session_state.get("full_run", True)
+            with SECTION_TIMINGS.measure(name, partial=partial), SPANS.span(f"section.{name}"):
+                return func(*args, **kwargs)
+        return run
+    return decorator
+
 
-# Acessa os DataFrames através do session_state em todo o script
-transactions_df = st.session_state.transactions_df
-bills_df = st.session_state.bills_df
 
 
 # --- Variáveis de Estado da Sessão para Reserva de Viagem ---
@@ -247,35 +283,45 @@ st.markdown("Bem-vinda ao seu controle financeiro! Aqui você pode registrar sua
 
 # --- Sidebar para Adicionar Transações e Contas ---
 with st.sidebar:
-    # Adicionar imagem da Iasmin
+    # Adicionar imagem da Iasmin (reduzida uma vez por processo; os mesmos bytes geram a
+    # mesma URL de mídia, que o navegador mantém em cache entre execuções)
     iasmin_image_path = "iasmin.jpeg"
-    if os.path.exists(iasmin_image_path):
-        st.image(iasmin_image_path, caption="Dra Iasmin Cardoso", use_container_width=True)
+    iasmin_image = load_sidebar_image(iasmin_image_path)
+    if iasmin_image is not None:
+        st.image(iasmin_image, caption="Dra Iasmin Cardoso", use_container_width=True)
     else:
         st.warning(f"Imagem '{iasmin_image_path}' não encontrada. Certifique-se de que está na mesma pasta do 'app.py'.")
 
+
+# Snapshot dos dados do usuário para esta execução do script: DataFrames e totais
+# pré-calculados compartilhados entre as sessões (nunca alterados no lugar). As versões
+# identificam o conteúdo; métricas e gráficos leem dos totais pré-calculados (no modo
+# SQLite, das consultas agregadas ao banco)
+snapshot = LEDGER.snapshot()
+transactions_df = snapshot.transactions
+bills_df = snapshot.bills
+transactions_version = snapshot.transactions_version
+bills_version = snapshot.bills_version
+recurring_df = snapshot.recurring
+recurring_version = snapshot.recurring_version
+rollups = snapshot.rollups
+date_index = snapshot.date_index
+today = pd.Timestamp.today().normalize()
+for store, error in LEDGER.load_errors:
+    show_load_error(store, error)
+
+# Categorias oferecidas no formulário e no filtro do histórico, montadas uma vez por execução
+category_options = build_category_options(rollups)
+SUGGEST_CATEGORY = "Sugerir pela descrição"
+
+
+with st.sidebar:
     st.header("Adicionar Nova Transação")
     with st.form("nova_transacao_form", clear_on_submit=True):
         data = st.date_input("Data", datetime.now())
         tipo = st.selectbox("Tipo", ["Receita", "Despesa", "Reserva para Viagem"])
         
-        # LISTA DE CATEGORIAS PREDEFINIDAS
-        core_categories = ["Alimentação", "Viagem", "Receita", "Salário", "Aluguel", "Outros"]
-        
-        # Obter categorias existentes do DataFrame (limpas de NaN e strings vazias)
-        existing_categories_from_df = [
-            str(cat) for cat in transactions_df["Categoria"].unique() 
-            if pd.notna(cat) and str(cat).strip() != "" and str(cat).strip().lower() != 'nan'
-        ]
-        
-        # Construir a lista de categorias para o selectbox
-        selectbox_categories = []
-        for cat in existing_categories_from_df:
-            if cat not in core_categories:
-                selectbox_categories.append(cat)
-        
-        selectbox_categories.extend(core_categories)
-        selectbox_categories.append("Outra (especificar)")
+        selectbox_categories = category_options + ["Outra (especificar)", SUGGEST_CATEGORY]
 
         selected_category = st.selectbox("Categoria", selectbox_categories)
         
@@ -296,26 +342,11 @@ with st.sidebar:
                 st.warning("Por favor, digite o nome da nova categoria ou selecione uma existente.")
                 st.stop()
             
-            new_transaction_data = {
-                "Data": [data], 
-                "Tipo": [tipo],
-                "Categoria": [category_to_use], 
-                "Valor": [float(valor)],
-                "Descrição": [descricao],
-            }
-            
-            new_row_df = pd.DataFrame(new_transaction_data).astype({
-                "Data": 'datetime64[ns]',
-                "Tipo": str,
-                "Categoria": str,
-                "Valor": float,
-                "Descrição": str
-            })
-            
-            current_df = st.session_state.transactions_df 
-            
-            new_df = pd.concat([current_df, new_row_df], ignore_index=True)
-            save_data(new_df) 
+            if selected_category == SUGGEST_CATEGORY:
+                # Aprendida das transações já categorizadas (core/categorizer.py)
+                suggested = LEDGER.categorizer().classify([descricao], [tipo]).iloc[0]
+                category_to_use = suggested if pd.notna(suggested) else "Não Especificado"
+            append_data(new_transaction(data, tipo, category_to_use, valor, descricao))
             st.success("Transação adicionada com sucesso!")
             st.rerun()
 
@@ -324,277 +355,401 @@ with st.sidebar:
         bill_description = st.text_input("Descrição da Conta")
         bill_value = st.number_input("Valor da Conta (R$)", min_value=0.01, format="%.2f")
         bill_due_date = st.date_input("Data de Vencimento", datetime.now() + timedelta(days=30))
+        # Contas recorrentes viram uma regra; os vencimentos são calculados quando exibidos
+        bill_repeat = st.selectbox("Repetir", ["Não repetir"] + list(FREQUENCIES))
+        bill_interval = st.number_input("A cada (dias/semanas/meses/anos)", min_value=1, value=1, step=1)
+        bill_end_date = st.date_input("Repetir até (opcional)", value=None)
 
         bill_submitted = st.form_submit_button("Registrar Conta")
         if bill_submitted:
-            new_bill_data = {
-                "Descrição": [bill_description],
-                "Valor": [float(bill_value)], 
-                "Data de Vencimento": [bill_due_date], 
-                "Pago": [False],
-            }
-            
-            new_bill_df = pd.DataFrame(new_bill_data).astype({
-                "Descrição": str,
-                "Valor": float,
-                "Data de Vencimento": 'datetime64[ns]',
-                "Pago": bool
-            })
-
-            current_bills_df = st.session_state.bills_df 
-
-            new_bills_df = pd.concat([current_bills_df, new_bill_df], ignore_index=True)
-            save_bills(new_bills_df) 
+            if bill_repeat == "Não repetir":
+                append_bills(new_bill(bill_description, bill_value, bill_due_date))
+            else:
+                append_recurring(new_recurring_bill(
+                    bill_description, bill_value, bill_repeat, bill_interval, bill_due_date, bill_end_date,
+                ))
             st.success("Conta a pagar registrada com sucesso!")
             st.rerun()
 
+    st.header("Importar / Exportar CSV")
+    with st.expander("Arquivos CSV"):
+        # O CSV é gerado apenas quando o botão é clicado (geração adiada)
+        st.download_button("Exportar Transações (CSV)", data=lambda: TRANSACTIONS_STORE.export_csv(),
+                           file_name="transactions.csv", mime="text/csv")
+        st.download_button("Exportar Contas (CSV)", data=lambda: BILLS_STORE.export_csv(),
+                           file_name="bills.csv", mime="text/csv")
+
+        st.markdown("**Importar** (substitui os dados atuais)")
+        import_target = st.radio("Conjunto de dados", ["Transações", "Contas a Pagar"], horizontal=True)
+        uploaded_csv = st.file_uploader("Arquivo CSV", type="csv")
+        if uploaded_csv is not None and st.button("Importar CSV"):
+            try:
+                if import_target == "Transações":
+                    save_data(CsvBackend().read(uploaded_csv, TRANSACTIONS_SCHEMA).reset_index(drop=True))
+                else:
+                    save_bills(CsvBackend().read(uploaded_csv, BILLS_SCHEMA).reset_index(drop=True))
+            except Exception as e:
+                st.error(f"Erro ao importar o CSV: {e}")
+            else:
+                st.success("CSV importado com sucesso!")
+                st.rerun()
+
+    with st.expander("Importar Extrato Bancário"):
+        st.caption("Acrescenta os lançamentos de um extrato CSV ou OFX às transações. Lançamentos com a "
+                   "mesma data, valor e descrição de uma transação já registrada são ignorados.")
+        # O resultado é guardado na sessão para ser exibido depois do st.rerun()
+        last_import = st.session_state.pop("statement_import_result", None)
+        if last_import is not None:
+            st.success(f"{last_import.imported:,} lançamentos importados; {last_import.duplicates:,} já existiam"
+                       + (f" e {last_import.invalid:,} linhas inválidas foram ignoradas." if last_import.invalid else "."))
+        uploaded_statement = st.file_uploader("Extrato (CSV ou OFX)", type=["csv", "ofx"], key="statement_upload")
+        if uploaded_statement is not None and st.button("Importar Extrato"):
+            try:
+                st.session_state.statement_import_result = import_statement(
+                    LEDGER, uploaded_statement, uploaded_statement.name,
+                )
+            except Exception as e:
+                st.error(f"Erro ao importar o extrato: {e}")
+            else:
+                st.rerun()
+
 # --- Análise Financeira ---
 st.header("Visão Geral Financeira")
 
-df_sorted = transactions_df.sort_values(by="Data", ascending=True)
+# Receita, despesa (transações + contas pagas), reserva de viagem e caixa (ver core/finance.py)
+summary = ledger_summary(rollups)
+
+transactions_date_range = rollups.date_range()
+
 
 # --- Gráfico de Receitas e Despesas Acumuladas ao Longo do Tempo ---
-st.subheader("Receitas e Despesas Acumuladas ao Longo do Tempo")
+# Figuras prontas em cache: mudar outra seção (ou voltar a um período já visto) não
+# remonta o gráfico. As séries são reduzidas a um número de pontos limitado pela largura
+# do gráfico e, se ainda forem longas, desenhadas em WebGL (ver core/charts.py)
+@versioned_cache("transactions")
+def cumulative_figure(tenant, version, start_date, end_date, _rollups):
+    """Gráfico das receitas e despesas acumuladas no período; None se não houver transações nele."""
+    _, go = plotly_modules()
+    df_cumulative = _rollups.cumulative_daily(start_date, end_date)
+    if df_cumulative.empty:
+        return None
+    with SPANS.span("chart.cumulative", rows=len(df_cumulative)):
+        fig_cumulative = go.Figure([
+            line_trace(df_cumulative["Data"], df_cumulative[column], name=column, line=dict(color=color))
+            for column, color in [("Receita Acumulada", "#4CAF50"), ("Despesa Acumulada", "#F44336")]
+        ])
+        fig_cumulative.update_layout(
+            title=f"Receitas e Despesas Acumuladas de {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}",
+            xaxis_title="Data", yaxis_title="Valor (R$)", legend_title="Tipo de Valor", hovermode="x unified",
+        )
+    return fig_cumulative
+
 
-if not df_sorted.empty:
-    min_available_date = df_sorted["Data"].min()
-    max_available_date = df_sorted["Data"].max()
+@dashboard_section("Gráfico acumulado")
+def cumulative_section(tenant, rollups, transactions_version, transactions_date_range):
+    """Gráfico de receitas e despesas acumuladas, com o período escolhido na própria seção."""
+    st.subheader("Receitas e Despesas Acumuladas ao Longo do Tempo")
+
+    if transactions_date_range is not None:
+        min_available_date, max_available_date = transactions_date_range
     
-    try:
-        default_start_date = min_available_date.date() if pd.notna(min_available_date) else datetime.now().replace(day=1).date() - timedelta(days=365)
-    except: 
-        default_start_date = datetime.now().replace(day=1).date() - timedelta(days=365) 
+        try:
+            default_start_date = min_available_date.date() if pd.notna(min_available_date) else datetime.now().replace(day=1).date() - timedelta(days=365)
+        except: 
+            default_start_date = datetime.now().replace(day=1).date() - timedelta(days=365) 
     
-    try:
-        default_end_date = max_available_date.date() if pd.notna(max_available_date) else datetime.now().date()
-    except: 
-        default_end_date = datetime.now().date()
-
-
-    col_start_date, col_end_date = st.columns(2)
-    with col_start_date:
-        start_date_filter = st.date_input(
-            "Data de Início", 
-            value=default_start_date, 
-            min_value=min_available_date.date() if pd.notna(min_available_date) else datetime(1900, 1, 1).date(),
-            max_value=default_end_date,
-            key="start_date_cumulative_graph"
-        )
-    with col_end_date:
-        end_date_filter = st.date_input(
-            "Data de Fim", 
-            value=default_end_date, 
-            min_value=start_date_filter, 
-            max_value=datetime.now().date(),
-            key="end_date_cumulative_graph"
-        )
-
-    df_filtered_by_date = df_sorted[(df_sorted["Data"].dt.date >= start_date_filter) & 
-                                    (df_sorted["Data"].dt.date <= end_date_filter)].copy()
+        try:
+            default_end_date = max_available_date.date() if pd.notna(max_available_date) else datetime.now().date()
+        except: 
+            default_end_date = datetime.now().date()
+
+
+        col_start_date, col_end_date = st.columns(2)
+        with col_start_date:
+            start_date_filter = st.date_input(
+                "Data de Início", 
+                value=default_start_date, 
+                min_value=min_available_date.date() if pd.notna(min_available_date) else datetime(1900, 1, 1).date(),
+                max_value=default_end_date,
+                key="start_date_cumulative_graph"
+            )
+        with col_end_date:
+            end_date_filter = st.date_input(
+                "Data de Fim", 
+                value=default_end_date, 
+                min_value=start_date_filter, 
+                max_value=datetime.now().date(),
+                key="end_date_cumulative_graph"
+            )
 
-    if not df_filtered_by_date.empty:
-        min_date_filtered = df_filtered_by_date["Data"].min()
-        max_date_filtered = df_filtered_by_date["Data"].max()
-        
-        all_dates_filtered = pd.date_range(start=min_date_filtered, end=max_date_filtered, freq='D')
-
-        daily_summary = df_filtered_by_date.groupby(df_filtered_by_date["Data"].dt.date).apply(
-            lambda x: pd.Series({
-                'Receita': x[x["Tipo"] == "Receita"]["Valor"].sum(),
-                'Despesa': x[x["Tipo"] == "Despesa"]["Valor"].sum()
-            })
-        ).reset_index()
-        daily_summary.columns = ['Data', 'Receita', 'Despesa']
-        daily_summary['Data'] = pd.to_datetime(daily_summary['Data'])
-
-        full_date_range = pd.DataFrame(all_dates_filtered, columns=['Data'])
-        merged_df = pd.merge(full_date_range, daily_summary, on='Data', how='left').fillna(0)
-        
-        merged_df['Receita Acumulada'] = merged_df['Receita'].cumsum()
-        merged_df['Despesa Acumulada'] = merged_df['Despesa'].cumsum()
+        fig_cumulative = cumulative_figure(tenant, transactions_version, start_date_filter, end_date_filter, rollups)
 
-        df_plot = merged_df.melt(id_vars=['Data'], value_vars=['Receita Acumulada', 'Despesa Acumulada'],
-                                 var_name='Tipo de Valor', value_name='Valor Acumulado')
-        
-        fig_cumulative = px.line(
-            df_plot,
-            x="Data",
-            y="Valor Acumulado",
-            color="Tipo de Valor",
-            title=f"Receitas e Despesas Acumuladas de {start_date_filter.strftime('%d/%m/%Y')} a {end_date_filter.strftime('%d/%m/%Y')}",
-            labels={"Valor Acumulado": "Valor (R$)", "Data": "Data"},
-            line_shape="linear",
-            render_mode="svg",
-            color_discrete_map={
-                'Receita Acumulada': '#4CAF50', 
-                'Despesa Acumulada': '#F44336'
-            }
-        )
-        fig_cumulative.update_layout(hovermode="x unified")
-        st.plotly_chart(fig_cumulative, use_container_width=True)
+        if fig_cumulative is not None:
+            st.plotly_chart(fig_cumulative, use_container_width=True)
+        else:
+            st.info("Não há transações no período selecionado para gerar o gráfico acumulado.")
     else:
-        st.info("Não há transações no período selecionado para gerar o gráfico acumulado.")
-else:
-    st.info("Adicione transações para ver o gráfico de receitas e despesas acumuladas.")
-
+        st.info("Adicione transações para ver o gráfico de receitas e despesas acumuladas.")
 
-# Cálculo do Caixa (Receita total - Despesa total)
-total_receita = transactions_df[transactions_df["Tipo"] == "Receita"]["Valor"].sum()
-total_despesa_from_transactions = transactions_df[transactions_df["Tipo"] == "Despesa"]["Valor"].sum()
-total_despesa_from_paid_bills = bills_df[bills_df["Pago"] == True]["Valor"].sum()
-total_despesa = total_despesa_from_transactions + total_despesa_from_paid_bills
 
-# Desconsidera o valor de "Reserva para Viagem" do caixa para o cálculo de fluxo
-total_reserva_viagem_movimentado = transactions_df[transactions_df["Tipo"] == "Reserva para Viagem"]["Valor"].sum()
-caixa_atual = total_receita - total_despesa - total_reserva_viagem_movimentado
+cumulative_section(TENANT, rollups, transactions_version, transactions_date_range)
 
-col1, col2, col3, col4 = st.columns(4)
 
-with col1:
-    st.metric("Receita Total", f"R$ {total_receita:,.2f}")
-with col2:
-    st.metric("Despesa Total", f"R$ {total_despesa:,.2f}")
-with col3:
-    st.metric("Caixa Atual", f"R$ {caixa_atual:,.2f}")
-with col4:
-    st.metric("Reserva Atual para Viagem", f"R$ {st.session_state.travel_reserve:,.2f}")
+@dashboard_section("Indicadores")
+def metrics_section(summary):
+    """Cartões com os totais de receita, despesa, caixa e reserva de viagem."""
+    col1, col2, col3, col4 = st.columns(4)
 
+    with col1:
+        st.metric("Receita Total", f"R$ {summary.receita:,.2f}")
+    with col2:
+        st.metric("Despesa Total", f"R$ {summary.despesa:,.2f}")
+    with col3:
+        st.metric("Caixa Atual", f"R$ {summary.caixa:,.2f}")
+    with col4:
+        st.metric("Reserva Atual para Viagem", f"R$ {st.session_state.travel_reserve:,.2f}")
 
-st.markdown("---")
 
-# --- Média de Gastos Mensal (Agora incluindo despesas de transações e contas pagas) ---
-st.subheader("Média de Gastos Mensal")
+metrics_section(summary)
 
-all_expenses_data = []
+# Tempo até a primeira tela útil (título, barra lateral, gráfico acumulado e indicadores) na
+# primeira execução de cada sessão: é o que o usuário espera ao abrir o dashboard
+if "first_paint_recorded" not in st.session_state:
+    st.session_state.first_paint_recorded = True
+    SPANS.record("startup.first_paint", time.perf_counter() - script_start)
 
-if not transactions_df.empty:
-    df_exp_trans = transactions_df[transactions_df["Tipo"] == "Despesa"].copy()
-    if not df_exp_trans.empty:
-        df_exp_trans = df_exp_trans[['Data', 'Valor']].copy()
-        all_expenses_data.append(df_exp_trans)
 
-if not bills_df.empty:
-    df_exp_bills = bills_df[bills_df["Pago"] == True].copy()
-    if not df_exp_bills.empty:
-        df_exp_bills = df_exp_bills[['Data de Vencimento', 'Valor']].rename(columns={'Data de Vencimento': 'Data'}).copy()
-        all_expenses_data.append(df_exp_bills)
+st.markdown("---")
 
-if all_expenses_data:
-    combined_expenses_df = pd.concat(all_expenses_data, ignore_index=True)
-    
-    combined_expenses_df['Data'] = pd.to_datetime(combined_expenses_df['Data'], errors='coerce')
-    combined_expenses_df = combined_expenses_df.dropna(subset=['Data'])
-    combined_expenses_df['Valor'] = pd.to_numeric(combined_expenses_df['Valor'], errors='coerce')
-    combined_expenses_df = combined_expenses_df.dropna(subset=['Valor'])
-
-    if not combined_expenses_df.empty:
-        combined_expenses_df["AnoMes"] = combined_expenses_df["Data"].dt.to_period("M")
-        gastos_por_mes = combined_expenses_df.groupby("AnoMes")["Valor"].sum()
-
-        if len(gastos_por_mes) > 0:
-            media_gastos_mensal = gastos_por_mes.mean()
-            st.info(f"Sua média de gastos mensais nos últimos **{len(gastos_por_mes)}** meses é de: **R$ {media_gastos_mensal:,.2f}**")
-            
-            # --- Gráfico de Despesas por Mês (Reativado e Usando Dados Combinados) ---
-            st.markdown("### Total de Despesas por Mês")
+# --- Média de Gastos Mensal (Agora incluindo despesas de transações e contas pagas) ---
+@dashboard_section("Despesas mensais")
+def monthly_section(tenant, today, rollups, recurring_df, recurring_version):
+    """Média e gráfico das despesas mensais (transações + contas pagas), com as contas
+    recorrentes ainda não pagas previstas nos próximos meses.
+    """
+    px, _ = plotly_modules()
+    st.subheader("Média de Gastos Mensal")
+
+    gastos_por_mes, media_gastos_mensal = monthly_expenses(rollups)
+    recorrentes_por_mes = recurring_forecast(tenant, recurring_version, today, recurring_df)
+
+    if len(gastos_por_mes) > 0:
+        st.info(f"Sua média de gastos mensais nos últimos **{len(gastos_por_mes)}** meses é de: **R$ {media_gastos_mensal:,.2f}**")
+
+    if len(gastos_por_mes) > 0 or len(recorrentes_por_mes) > 0:
+        # --- Gráfico de Despesas por Mês (Reativado e Usando Dados Combinados) ---
+        st.markdown("### Total de Despesas por Mês")
+        monthly_df = pd.concat([
+            pd.DataFrame({"Mês": gastos_por_mes.index.astype(str), "Valor": gastos_por_mes.to_numpy(),
+                          "Situação": "Realizadas"}),
+            pd.DataFrame({"Mês": recorrentes_por_mes.index.astype(str), "Valor": recorrentes_por_mes.to_numpy(),
+                          "Situação": "Recorrentes a pagar"}),
+        ], ignore_index=True).sort_values("Mês", kind="stable")
+        with SPANS.span("chart.monthly", rows=len(monthly_df)):
             fig_monthly_expenses = px.bar(
-                x=gastos_por_mes.index.astype(str),
-                y=gastos_por_mes.values,
-                labels={"x": "Mês", "y": "Valor (R$)"},
+                monthly_df,
+                x="Mês",
+                y="Valor",
+                color="Situação",
+                labels={"Valor": "Valor (R$)"},
                 title="Distribuição Mensal das Despesas (Transações + Contas Pagas)",
                 text_auto=True,
                 color_discrete_sequence=px.colors.qualitative.Pastel
             )
-            st.plotly_chart(fig_monthly_expenses, use_container_width=True)
-        else:
-            st.warning("Não há despesas registradas para calcular a média mensal.")
+        st.plotly_chart(fig_monthly_expenses, use_container_width=True)
     else:
         st.warning("Não há despesas registradas para calcular a média mensal.")
-else:
-    st.warning("Não há despesas registradas para calcular a média mensal.")
+
+
+monthly_section(TENANT, today, rollups, recurring_df, recurring_version)
+
+
+# --- Projeção de Caixa ---
+@dashboard_section("Projeção de caixa")
+def forecast_section(tenant, today, rollups, bills_df, recurring_df, transactions_version, bills_version,
+                     recurring_version):
+    """Saldo projetado dia a dia: contas a vencer, receitas recorrentes e a média de gastos."""
+    _, go = plotly_modules()
+    st.subheader("Projeção de Caixa")
+    st.caption("Parte do caixa atual e desconta as contas pendentes (avulsas e recorrentes) no vencimento "
+               "e a média de gastos mensal; as receitas que se repetem no mesmo dia do mês nos últimos "
+               "12 meses são projetadas nos mesmos dias.")
+    months = st.slider("Meses à frente", min_value=1, max_value=60, value=FORECAST_MONTHS, key="forecast_months")
+    forecast = projected_cash_flow(
+        tenant, transactions_version, bills_version, recurring_version, today, months,
+        rollups, bills_df, recurring_df,
+    )
+
+    col_final, col_lowest = st.columns(2)
+    col_final.metric(f"Saldo Projetado em {forecast.daily['Data'].iloc[-1]:%d/%m/%Y}", f"R$ {forecast.final_balance:,.2f}")
+    col_lowest.metric(f"Menor Saldo ({forecast.lowest_date:%d/%m/%Y})", f"R$ {forecast.lowest_balance:,.2f}")
+    if forecast.lowest_balance < 0:
+        st.warning(f"O saldo projetado fica negativo a partir de "
+                   f"{forecast.daily['Data'][forecast.daily['Saldo'] < 0].iloc[0]:%d/%m/%Y}.")
+
+    with SPANS.span("chart.forecast", rows=len(forecast.daily)):
+        fig_forecast = go.Figure([line_trace(forecast.daily["Data"], forecast.daily["Saldo"], name="Saldo")])
+        fig_forecast.update_layout(title="Saldo de Caixa Projetado", xaxis_title="Data", yaxis_title="Saldo (R$)")
+        fig_forecast.add_hline(y=0, line_dash="dot", line_color="#c0392b")
+    st.plotly_chart(fig_forecast, use_container_width=True)
+
+
+forecast_section(TENANT, today, rollups, bills_df, recurring_df, transactions_version, bills_version, recurring_version)
 
 
 st.markdown("---")
 
+# --- Simulação Estocástica (Monte Carlo) ---
+@st.cache_data(show_spinner="Simulando trajetórias...") # Só recalcula quando os parâmetros da simulação mudam
+def monte_carlo_fan(initial, contribution, years, n_paths, mean_percent, volatility_percent, historical_returns, seed):
+    """Percentis P5/P50/P95 do Capital Acumulado por mês (ver core/montecarlo.py)."""
+    return simulate_percentiles(
+        initial, contribution, years, n_paths=n_paths,
+        mean_annual_percent=mean_percent, volatility_annual_percent=volatility_percent,
+        historical_returns=historical_returns, seed=seed,
+    )
+
 # --- Simulação de Aplicação Financeira (AGORA SEMPRE VISÍVEL) ---
-st.header("Simulação de Aplicação Financeira")
-
-# Removido o 'with st.expander("Calcule o crescimento do seu investimento"):'
-# O conteúdo agora fica direto abaixo do cabeçalho da seção
-
-col_inv_init, col_aporte = st.columns(2)
-with col_inv_init:
-    initial_investment = st.number_input("Investimento Inicial (R$)", min_value=0.0, value=1000.0, format="%.2f")
-with col_aporte:
-    monthly_contribution = st.number_input("Aporte Mensal (R$)", min_value=0.0, value=100.0, format="%.2f")
-
-col_taxa, col_periodo = st.columns(2)
-with col_taxa:
-    annual_interest_rate_percent = st.number_input("Taxa de Juros Anual (%)", min_value=0.0, value=10.0, format="%.2f")
-with col_periodo:
-    investment_period_years = st.number_input("Período de Investimento (Anos)", min_value=1, value=5)
-
-if st.button("Simular Crescimento"):
-    if initial_investment <= 0 and monthly_contribution <= 0:
-        st.warning("Por favor, insira um Investimento Inicial ou um Aporte Mensal.")
-    else:
-        monthly_interest_rate = (1 + annual_interest_rate_percent / 100)**(1/12) - 1
-        total_months = investment_period_years * 12
+# Não depende dos dados do livro-caixa: mexer nos parâmetros reexecuta só esta seção
+@st.cache_data(show_spinner=False) # Depende só dos parâmetros; ver cumulative_figure()
+def simulation_figure(initial_investment, monthly_contribution, annual_interest_rate_percent, years, rate_spread_percent):
+    """Gráfico da simulação determinística, com a faixa de sensibilidade da taxa."""
+    _, go = plotly_modules()
+    simulation_df = simulate_investment(initial_investment, monthly_contribution, annual_interest_rate_percent, years)
+    with SPANS.span("chart.simulation", rows=len(simulation_df)):
+        traces = [
+            line_trace(simulation_df["Mês"], simulation_df[column], name=column, line=dict(color=color))
+            for column, color in [("Capital Investido", "#66BB6A"), ("Capital Acumulado", "#29B6F6")]
+        ]
+        if rate_spread_percent > 0:
+            # Faixa de sensibilidade: centenas de taxas avaliadas numa única chamada vetorizada
+            band_df = rate_sensitivity_band(
+                initial_investment, monthly_contribution, annual_interest_rate_percent, years, rate_spread_percent,
+            )
+            traces += [
+                line_trace(band_df["Mês"], band_df["Mínimo"], line=dict(width=0), showlegend=False, hoverinfo="skip"),
+                line_trace(band_df["Mês"], band_df["Máximo"], line=dict(width=0), fill="tonexty",
+                           fillcolor="rgba(41, 182, 246, 0.2)", name=f"Taxa ± {rate_spread_percent:.2f} p.p.",
+                           hoverinfo="skip"),
+            ]
+        fig_sim = go.Figure(traces)
+        fig_sim.update_layout(
+            title="Simulação de Crescimento do Investimento", xaxis_title="Meses Decorridos",
+            yaxis_title="Valor (R$)", legend_title="Tipo de Capital", hovermode="x unified",
+        )
+    return fig_sim
 
-        months = []
-        invested_capital = []
-        accumulated_capital = []
 
-        current_accumulated = initial_investment
-        total_invested = initial_investment
+@dashboard_section("Simulação")
+def simulation_section():
+    """Simuladores de investimento (determinístico e Monte Carlo); não usa o livro-caixa."""
+    _, go = plotly_modules()
+    st.header("Simulação de Aplicação Financeira")
 
-        for month in range(1, total_months + 1):
-            if month > 1:
-                current_accumulated += monthly_contribution
-                total_invested += monthly_contribution
-            
-            current_accumulated *= (1 + monthly_interest_rate)
-            
-            months.append(month)
-            invested_capital.append(total_invested)
-            accumulated_capital.append(current_accumulated)
-
-        simulation_df = pd.DataFrame({
-            "Mês": months,
-            "Capital Investido": invested_capital,
-            "Capital Acumulado": accumulated_capital
-        })
-
-        df_plot_sim = simulation_df.melt(id_vars=['Mês'], 
-                                         value_vars=['Capital Investido', 'Capital Acumulado'],
-                                         var_name='Tipo de Capital', 
-                                         value_name='Valor (R$)')
+    # Removido o 'with st.expander("Calcule o crescimento do seu investimento"):'
+    # O conteúdo agora fica direto abaixo do cabeçalho da seção
+
+    col_inv_init, col_aporte = st.columns(2)
+    with col_inv_init:
+        initial_investment = st.number_input("Investimento Inicial (R$)", min_value=0.0, value=1000.0, format="%.2f")
+    with col_aporte:
+        monthly_contribution = st.number_input("Aporte Mensal (R$)", min_value=0.0, value=100.0, format="%.2f")
+
+    col_taxa, col_periodo = st.columns(2)
+    with col_taxa:
+        annual_interest_rate_percent = st.number_input("Taxa de Juros Anual (%)", min_value=0.0, value=10.0, format="%.2f")
+    with col_periodo:
+        investment_period_years = st.number_input("Período de Investimento (Anos)", min_value=1, value=5)
+
+    rate_spread_percent = st.number_input(
+        "Faixa de Sensibilidade da Taxa (± p.p.)", min_value=0.0, value=2.0, format="%.2f",
+        help="Mostra no gráfico a faixa de resultados para taxas anuais entre a taxa informada menos e mais este valor.",
+    )
+
+    if st.button("Simular Crescimento"):
+        if initial_investment <= 0 and monthly_contribution <= 0:
+            st.warning("Por favor, insira um Investimento Inicial ou um Aporte Mensal.")
+        else:
+            total_months = investment_period_years * 12
+
+            # Trajetória calculada em forma fechada (ver core/simulation.py)
+            simulation_df = simulate_investment(
+                initial_investment, monthly_contribution, annual_interest_rate_percent, investment_period_years
+            )
+
+            fig_sim = simulation_figure(
+                initial_investment, monthly_contribution, annual_interest_rate_percent,
+                investment_period_years, rate_spread_percent,
+            )
+            st.plotly_chart(fig_sim, use_container_width=True)
+
+            st.markdown("#### Resumo da Simulação")
+            resumo = simulation_summary(simulation_df)
         
-        fig_sim = px.line(
-            df_plot_sim,
-            x="Mês",
-            y="Valor (R$)",
-            color="Tipo de Capital",
-            title="Simulação de Crescimento do Investimento",
-            labels={"Valor (R$)": "Valor (R$)", "Mês": "Meses Decorridos"},
-            color_discrete_map={
-                'Capital Investido': '#66BB6A', 
-                'Capital Acumulado': '#29B6F6'
-            }
+            st.success(f"Após **{investment_period_years} anos** (ou {total_months} meses):")
+            st.markdown(f"- Capital Total Investido: **R$ {resumo.invested:,.2f}**")
+            st.markdown(f"- Capital Total Acumulado: **R$ {resumo.accumulated:,.2f}**")
+            st.markdown(f"- Juros Ganhos: **R$ {resumo.interest:,.2f}**")
+            if resumo.growth_percent is not None:
+                st.info(f"O seu capital cresceu **{resumo.growth_percent:,.2f}%** no período, se {(annual_interest_rate_percent):.2f}% de juros anuais forem mantidos.")
+
+    # --- Simulação Estocástica (Monte Carlo) ---
+    st.markdown("### Simulação Estocástica (Monte Carlo)")
+    if st.toggle("Simular com retornos aleatórios", key="monte_carlo_toggle"):
+        mc_method = st.radio(
+            "Distribuição dos retornos mensais",
+            ["Normal (média e volatilidade)", "Bootstrap de retornos históricos"],
+            horizontal=True,
         )
-        fig_sim.update_layout(hovermode="x unified")
-        st.plotly_chart(fig_sim, use_container_width=True)
+        col_mc_paths, col_mc_mean, col_mc_vol = st.columns(3)
+        with col_mc_paths:
+            mc_paths = st.selectbox("Número de Trajetórias", [1_000, 10_000, 50_000, 100_000], index=1,
+                                    format_func=lambda n: f"{n:,}".replace(",", "."))
+        historical_returns = None
+        if mc_method == "Normal (média e volatilidade)":
+            with col_mc_mean:
+                mc_mean = st.number_input("Retorno Médio Anual (%)", value=float(annual_interest_rate_percent), format="%.2f")
+            with col_mc_vol:
+                mc_volatility = st.number_input("Volatilidade Anual (%)", min_value=0.0, value=15.0, format="%.2f")
+        else:
+            mc_mean, mc_volatility = 0.0, 0.0
+            returns_text = st.text_area("Retornos Mensais Históricos (%)", placeholder="0,85\n-1,20\n1,10",
+                                        help="Um retorno mensal por linha (ou separados por ';'), em %.")
+            try:
+                historical_returns = parse_monthly_returns(returns_text)
+            except ValueError:
+                st.warning("Não foi possível ler os retornos históricos. Use um número por linha, em %.")
+
+        if mc_method != "Normal (média e volatilidade)" and not historical_returns:
+            st.info("Informe os retornos mensais históricos para simular por bootstrap.")
+        elif initial_investment <= 0 and monthly_contribution <= 0:
+            st.warning("Por favor, insira um Investimento Inicial ou um Aporte Mensal.")
+        else:
+            fan_df = monte_carlo_fan(
+                initial_investment, monthly_contribution, int(investment_period_years), mc_paths,
+                mc_mean, mc_volatility, historical_returns, 42,
+            )
+            with SPANS.span("chart.monte_carlo", rows=len(fan_df)):
+                fig_fan = go.Figure([
+                    line_trace(fan_df["Mês"], fan_df["P5"], line=dict(width=0), showlegend=False, hoverinfo="skip"),
+                    line_trace(fan_df["Mês"], fan_df["P95"], line=dict(width=0), fill="tonexty",
+                               fillcolor="rgba(41, 182, 246, 0.25)", name="P5–P95"),
+                    line_trace(fan_df["Mês"], fan_df["P50"], line=dict(color="#29B6F6"), name="Mediana (P50)"),
+                    line_trace(fan_df["Mês"], fan_df["Capital Investido"], line=dict(color="#66BB6A"),
+                               name="Capital Investido"),
+                ])
+                fig_fan.update_layout(
+                    title=f"Capital Acumulado em {mc_paths:,} Trajetórias Simuladas".replace(",", "."),
+                    xaxis_title="Meses Decorridos", yaxis_title="Valor (R$)", hovermode="x unified",
+                )
+            st.plotly_chart(fig_fan, use_container_width=True)
+            final = fan_df.iloc[-1]
+            st.info(
+                f"Após **{investment_period_years} anos**, em 90% dos cenários o capital fica entre "
+                f"**R$ {final['P5']:,.2f}** e **R$ {final['P95']:,.2f}** (mediana: **R$ {final['P50']:,.2f}**)."
+            )
 
-        st.markdown("#### Resumo da Simulação")
-        final_invested = invested_capital[-1] if invested_capital else 0
-        final_accumulated = accumulated_capital[-1] if accumulated_capital else 0
-        total_interest_earned = final_accumulated - final_invested
-        
-        st.success(f"Após **{investment_period_years} anos** (ou {total_months} meses):")
-        st.markdown(f"- Capital Total Investido: **R$ {final_invested:,.2f}**")
-        st.markdown(f"- Capital Total Acumulado: **R$ {final_accumulated:,.2f}**")
-        st.markdown(f"- Juros Ganhos: **R$ {total_interest_earned:,.2f}**")
-        st.info(f"O seu capital cresceu **{(final_accumulated / final_invested - 1) * 100:,.2f}%** no período, se {(annual_interest_rate_percent):.2f}% de juros anuais forem mantidos.")
+simulation_section()
 
 st.markdown("---")
 
@@ -607,180 +762,285 @@ st.info(f"Seu total atual reservado para viagens é: **R$ {st.session_state.trav
 st.markdown("Use a seção 'Adicionar Nova Transação' na barra lateral para adicionar ou retirar fundos da sua reserva de viagem, escolhendo o tipo 'Reserva para Viagem'.")
 st.markdown("Quando você adiciona à reserva, esse valor é subtraído do seu 'Caixa Atual', e quando você 'retira' para uma viagem (registrando como despesa de viagem), ele é computado como despesa.")
 
-reserva_viagem_transacoes = transactions_df[transactions_df["Tipo"] == "Reserva para Viagem"]["Valor"].sum()
-st.session_state.travel_reserve = reserva_viagem_transacoes
+st.session_state.travel_reserve = summary.reserva_viagem
 
 
 st.markdown("---")
 
 # --- Contas a Pagar ---
-st.subheader("Contas a Pagar")
-
-if not bills_df.empty:
-    st.markdown("### Gerenciar Contas")
-    st.info("Para **editar** uma conta, clique diretamente na célula da tabela e digite. Para **apagar** uma conta, clique no número da linha à esquerda para selecioná-la e pressione `Delete` ou `Backspace`.")
+@dashboard_section("Contas a pagar")
+def bills_section(tenant, today, bills_df, bills_version, recurring_df, recurring_version):
+    """Editores das contas a pagar e das recorrentes e lista paginada das pendentes."""
+    st.subheader("Contas a Pagar")
+
+    if not bills_df.empty:
+        st.markdown("### Gerenciar Contas")
+        st.info("Para **editar** uma conta, clique diretamente na célula da tabela e digite. Para **apagar** uma conta, clique no número da linha à esquerda para selecioná-la e pressione `Delete` ou `Backspace`.")
     
-    bills_df_display = bills_df.copy()
-    bills_df_display['Data de Vencimento'] = bills_df_display['Data de Vencimento'].dt.strftime('%d/%m/%Y')
-
-    edited_bills_df = st.data_editor(
-        bills_df_display,
-        column_config={
-            "Pago": st.column_config.CheckboxColumn(
-                "Pago?",
-                help="Marque para indicar que a conta foi paga",
-                default=False,
-            )
-        },
-        key="bills_data_editor",
-        hide_index=False,
-        num_rows="dynamic",
-    )
+        # O índice exibido é o ID da conta, que identifica a linha nas edições
+        bills_df_display = bills_df.set_index(ID_COLUMN)
+        bills_df_display['Data de Vencimento'] = bills_df_display['Data de Vencimento'].dt.strftime('%d/%m/%Y')
+
+        # O retorno não é usado: as alterações são lidas do estado do widget (editor_batch)
+        st.data_editor(
+            bills_df_display,
+            column_config={
+                "Pago": st.column_config.CheckboxColumn(
+                    "Pago?",
+                    help="Marque para indicar que a conta foi paga",
+                    default=False,
+                )
+            },
+            key="bills_data_editor",
+            hide_index=False,
+            num_rows="dynamic",
+        )
     
-    if 'bills_data_editor' in st.session_state and (
-        st.session_state.bills_data_editor.get('edited_rows') or
-        st.session_state.bills_data_editor.get('added_rows') or
-        st.session_state.bills_data_editor.get('deleted_rows')
-    ):
-        
-        updated_bills_df = bills_df.copy()
-
-        for idx, row_dict in st.session_state.bills_data_editor['edited_rows'].items():
-            for col, val in row_dict.items():
-                if col == "Data de Vencimento":
-                    updated_bills_df.loc[idx, col] = pd.to_datetime(val, format='%d/%m/%Y', errors='coerce')
-                elif col == "Valor":
-                    updated_bills_df.loc[idx, col] = pd.to_numeric(val, errors='coerce')
-                else:
-                    updated_bills_df.loc[idx, col] = val
-        
-        for row_dict in st.session_state.bills_data_editor['added_rows']:
-            new_row_data = {
-                "Descrição": row_dict.get("Descrição", ""),
-                "Valor": pd.to_numeric(row_dict.get("Valor", 0), errors='coerce'),
-                "Data de Vencimento": pd.to_datetime(row_dict.get("Data de Vencimento"), format='%d/%m/%Y', errors='coerce'),
-                "Pago": row_dict.get("Pago", False),
-            }
-            new_row_df = pd.DataFrame([new_row_data]).astype(updated_bills_df.dtypes.to_dict())
-            updated_bills_df = pd.concat([updated_bills_df, new_row_df], ignore_index=True)
-
-        deleted_indices = st.session_state.bills_data_editor['deleted_rows']
-        updated_bills_df = updated_bills_df.drop(deleted_indices).reset_index(drop=True)
-
-        updated_bills_df = updated_bills_df.dropna(subset=['Data de Vencimento', 'Valor'])
-
-        save_bills(updated_bills_df)
-        st.success("Contas atualizadas com sucesso!")
-        st.rerun()
+        if has_changes(st.session_state.get('bills_data_editor')):
+            # Todas as alterações do editor são aplicadas em bloco e persistidas como um único delta
+            edit_bills(editor_batch(
+                st.session_state.bills_data_editor, BILLS_SCHEMA,
+                row_ids=bills_df[ID_COLUMN].to_numpy(),
+                defaults={"Descrição": "", "Valor": 0, "Pago": False},
+            ), bills_version)
+            st.success("Contas atualizadas com sucesso!")
+            st.rerun()
 
+    if not recurring_df.empty:
+        st.markdown("### Contas Recorrentes")
+        st.caption("Cada linha é uma regra; os vencimentos são calculados a partir do início e da frequência. "
+                   "\"Pago Até\" é o vencimento da última ocorrência paga.")
+        recurring_display = recurring_df.set_index(ID_COLUMN)
+        for col in RECURRING_SCHEMA.date_columns:
+            recurring_display[col] = recurring_display[col].dt.strftime('%d/%m/%Y')
+        st.data_editor(
+            recurring_display,
+            column_config={
+                "Frequência": st.column_config.SelectboxColumn("Frequência", options=list(FREQUENCIES), required=True),
+                "Intervalo": st.column_config.NumberColumn("A cada", min_value=1, step=1),
+            },
+            key="recurring_data_editor",
+            hide_index=False,
+            num_rows="dynamic",
+        )
+        if has_changes(st.session_state.get('recurring_data_editor')):
+            edit_recurring(editor_batch(
+                st.session_state.recurring_data_editor, RECURRING_SCHEMA,
+                row_ids=recurring_df[ID_COLUMN].to_numpy(),
+                defaults={"Descrição": "", "Valor": 0, "Frequência": "Mensal", "Intervalo": 1},
+            ), recurring_version)
+            st.success("Contas recorrentes atualizadas com sucesso!")
+            st.rerun()
+
+    if bills_df.empty and recurring_df.empty:
+        st.info("Nenhuma conta a pagar registrada ainda. Use a barra lateral para adicionar.")
+        return
 
     st.markdown("### Contas Pendentes")
-    contas_pendentes = bills_df[bills_df["Pago"] == False].sort_values(by="Data de Vencimento")
-    if not contas_pendentes.empty:
+    pending_positions = pending_bill_positions(tenant, bills_version, bills_df)
+    occurrences = pending_recurring(tenant, recurring_version, today, recurring_df)
+    if len(pending_positions) or len(occurrences):
+        # Avulsas e recorrentes intercaladas por vencimento; só a página exibida é montada e formatada
+        source, index = pending_schedule(bills_df, pending_positions, occurrences)
+        page_start, page_stop = page_controls(len(source), "pending_bills")
+        contas_pendentes_pagina = pending_page(bills_df, occurrences, source[page_start:page_stop], index[page_start:page_stop])
         st.dataframe(
-            contas_pendentes.style.format({"Valor": "R$ {:.2f}", "Data de Vencimento": lambda x: x.strftime("%d/%m/%Y")}),
+            format_page(contas_pendentes_pagina, ["Data de Vencimento"], ["Valor"]),
             use_container_width=True,
             hide_index=True,
         )
-        total_a_pagar = contas_pendentes["Valor"].sum()
+        total_a_pagar = pending_bills_total(bills_df, pending_positions, occurrences)
         st.warning(f"Total de contas pendentes: **R$ {total_a_pagar:,.2f}**")
+        if len(occurrences):
+            st.caption(f"Inclui as contas recorrentes vencidas e as que vencem até {(today + pd.Timedelta(days=RECURRING_HORIZON_DAYS)):%d/%m/%Y}.")
+            # Só a próxima ocorrência de cada regra pode ser paga: "Pago Até" avança em ordem
+            payable = next_occurrences(occurrences)
+            selected = st.selectbox(
+                "Pagar conta recorrente",
+                range(len(payable)),
+                format_func=lambda i: (f"{payable['Descrição'].iloc[i]} — "
+                                       f"{payable['Data de Vencimento'].iloc[i]:%d/%m/%Y} — "
+                                       f"R$ {payable['Valor'].iloc[i]:,.2f}"),
+                key="pay_recurring_choice",
+            )
+            if st.button("Marcar como paga", key="pay_recurring"):
+                pay_occurrence(payable.iloc[selected])
+                st.success("Pagamento registrado!")
+                st.rerun()
     else:
         st.info("Nenhuma conta pendente. Tudo em dia! 🎉")
 
-else:
-    st.info("Nenhuma conta a pagar registrada ainda. Use a barra lateral para adicionar.")
+
+bills_section(TENANT, today, bills_df, bills_version, recurring_df, recurring_version)
 
 
 st.markdown("---")
 
 # --- Histórico de Transações ---
-st.header("Histórico Detalhado de Transações")
-
-if not transactions_df.empty:
+@dashboard_section("Histórico de transações")
+def transactions_section(tenant, transactions_df, transactions_version, date_index, transactions_date_range,
+                         category_options):
+    """Filtros, ordenação e editor paginado do histórico de transações."""
     st.subheader("Filtrar e Gerenciar Transações")
     st.info("Para **editar** uma transação, clique diretamente na célula da tabela e digite. Para **apagar** uma transação, clique no número da linha à esquerda para selecioná-la e pressione `Delete` ou `Backspace`.")
 
-    existing_categories_from_df = [
-        str(cat) for cat in transactions_df["Categoria"].unique() 
-        if pd.notna(cat) and str(cat).strip() != "" and str(cat).strip().lower() != 'nan'
-    ]
-    
-    filter_categories_options = ["Todas as Categorias"]
-    for cat in existing_categories_from_df:
-        if cat not in core_categories:
-            filter_categories_options.append(cat)
-    
-    filter_categories_options.extend(core_categories)
+    filter_categories_options = ["Todas as Categorias"] + category_options
+
+    col_category, col_search, col_dates = st.columns(3)
+    selected_filter_category = col_category.selectbox("Selecione uma Categoria para Filtrar", filter_categories_options, key="filter_category_selectbox")
+    search_text = col_search.text_input("Buscar na Descrição/Categoria", key="transactions_search").strip()
+    date_range = col_dates.date_input(
+        "Período", tuple(day.date() for day in transactions_date_range), key="transactions_date_range"
+    )
+    # Enquanto só a data inicial foi escolhida, o período fica aberto no fim
+    start_date, end_date = (tuple(date_range) + (None, None))[:2]
+
+    col_sort, col_order = st.columns(2)
+    sort_by = col_sort.selectbox("Ordenar por", ["Data", "Valor", "Categoria", "Tipo", ID_COLUMN], key="transactions_sort_by")
+    descending = col_order.toggle("Ordem decrescente", value=True, key="transactions_sort_desc")
+
+    filters = {
+        "category": None if selected_filter_category == "Todas as Categorias" else selected_filter_category,
+        "search": search_text,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+    if SQL_MODE:
+        # Filtro, ordenação e recorte da página feitos pelo SQLite (LIMIT/OFFSET)
+        page_start, page_stop = page_controls(TRANSACTIONS_STORE.count(**filters), "transactions")
+        df_filtered = TRANSACTIONS_STORE.query_page(filters, sort_by, descending, page_start, page_stop - page_start)
+    else:
+        positions = transaction_view_positions(
+            tenant, transactions_version, sort_by, descending, transactions_df, date_index, **filters
+        )
+        page_start, page_stop = page_controls(len(positions), "transactions")
+        df_filtered = transactions_df.iloc[positions[page_start:page_stop]]
+    filtered_ids = df_filtered[ID_COLUMN].to_numpy()
 
-    selected_filter_category = st.selectbox("Selecione uma Categoria para Filtrar", filter_categories_options, key="filter_category_selectbox")
+    # Categoria é exibida como texto livre (e não como lista fechada das categorias existentes);
+    # o índice exibido é o ID da transação. Datas e valores são formatados pelo próprio
+    # componente (column_config), sem Styler nem funções por célula no servidor
+    df_filtered = df_filtered.astype({"Categoria": str}).set_index(ID_COLUMN)
 
-    df_filtered = transactions_df.copy()
-    if selected_filter_category != "Todas as Categorias":
-        df_filtered = df_filtered[df_filtered["Categoria"] == selected_filter_category]
-    
-    edited_transactions_df = st.data_editor(
-        df_filtered.style.format({"Valor": "R$ {:.2f}", "Data": lambda x: x.strftime("%d/%m/%Y")}),
+    st.data_editor(
+        df_filtered,
+        column_config={
+            "Data": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+            "Valor": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+        },
         use_container_width=True,
         hide_index=False,
         num_rows="dynamic",
         key="transactions_data_editor",
     )
 
-    if 'transactions_data_editor' in st.session_state and (
-        st.session_state.transactions_data_editor.get('edited_rows') or
-        st.session_state.transactions_data_editor.get('added_rows') or
-        st.session_state.transactions_data_editor.get('deleted_rows')
-    ):
-
-        updated_transactions_df = transactions_df.copy()
-
-        for idx, row_dict in st.session_state.transactions_data_editor['edited_rows'].items():
-            for col, val in row_dict.items():
-                if col == "Data":
-                    updated_transactions_df.loc[idx, col] = pd.to_datetime(val, format='%d/%m/%Y', errors='coerce')
-                elif col == "Valor":
-                    updated_transactions_df.loc[idx, col] = pd.to_numeric(val, errors='coerce')
-                else:
-                    updated_transactions_df.loc[idx, col] = val
-        
-        for row_dict in st.session_state.transactions_data_editor['added_rows']:
-            new_row_data = {
-                "Data": pd.to_datetime(row_dict.get("Data"), format='%d/%m/%Y', errors='coerce'),
-                "Tipo": row_dict.get("Tipo", ""),
-                "Categoria": row_dict.get("Categoria", ""),
-                "Valor": pd.to_numeric(row_dict.get("Valor", 0), errors='coerce'),
-                "Descrição": row_dict.get("Descrição", ""),
-            }
-            new_row_df = pd.DataFrame([new_row_data]).astype(updated_transactions_df.dtypes.to_dict())
-            updated_transactions_df = pd.concat([updated_transactions_df, new_row_df], ignore_index=True)
-
-        deleted_indices = st.session_state.transactions_data_editor['deleted_rows']
-        updated_transactions_df = updated_transactions_df.drop(deleted_indices).reset_index(drop=True)
-
-        updated_transactions_df = updated_transactions_df.dropna(subset=['Data', 'Valor'])
-
-        save_data(updated_transactions_df)
+    if st.button("Categorizar automaticamente", key="categorize_uncategorized",
+                 help="Sugere a categoria das transações em 'Outros' ou 'Não Especificado' a partir da descrição."):
+        categorized = categorize_uncategorized()
+        if categorized:
+            st.success(f"{categorized:,} transações categorizadas.")
+            st.rerun()
+        st.info("Nenhuma transação sem categoria recebeu sugestão.")
+
+    if has_changes(st.session_state.get('transactions_data_editor')):
+        # As linhas do editor são as da página exibida: mapeia cada uma para o seu ID
+        edit_data(editor_batch(
+            st.session_state.transactions_data_editor, TRANSACTIONS_SCHEMA,
+            row_ids=filtered_ids,
+            defaults={"Tipo": "", "Categoria": "", "Valor": 0, "Descrição": ""},
+        ), transactions_version)
         st.success("Transações atualizadas com sucesso!")
         st.rerun()
 
+
+@dashboard_section("Despesas por categoria")
+def expenses_by_category_section(rollups):
+    """Gráfico de pizza das despesas por categoria (todas as transações)."""
+    px, _ = plotly_modules()
     st.markdown("### Despesas por Categoria (Todas as Transações)")
-    df_despesas_categorias = transactions_df[transactions_df["Tipo"] == "Despesa"]
-    if not df_despesas_categorias.empty:
-        fig_pie = px.pie(
-            df_despesas_categorias,
-            values="Valor",
-            names="Categoria",
-            title="Distribuição das Despesas por Categoria",
-            hole=0.3,
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
+    despesas_por_categoria = rollups.expenses_by_category()
+    if not despesas_por_categoria.empty:
+        with SPANS.span("chart.categories", rows=len(despesas_por_categoria)):
+            fig_pie = px.pie(
+                values=despesas_por_categoria.values,
+                names=despesas_por_categoria.index.astype(str),
+                title="Distribuição das Despesas por Categoria",
+                hole=0.3,
+                color_discrete_sequence=px.colors.qualitative.Pastel
+            )
         st.plotly_chart(fig_pie, use_container_width=True)
     else:
         st.info("Adicione despesas para ver a distribuição por categoria.")
 
+
+st.header("Histórico Detalhado de Transações")
+
+if transactions_date_range is not None:
+    transactions_section(TENANT, transactions_df, transactions_version, date_index, transactions_date_range, category_options)
+    expenses_by_category_section(rollups)
 else:
     st.info("Nenhuma transação registrada ainda. Use a barra lateral para adicionar receitas e despesas.")
 
 # --- Footer ---
 st.markdown("---")
 st.markdown("Controle suas finanças, viva seus sonhos!")
+
+# --- Métricas de Cache (ao final, para incluir as chamadas desta execução) ---
+with st.sidebar:
+    with st.expander("Métricas de Cache"):
+        cache_rows = CACHE_STATS.rows()
+        if cache_rows:
+            st.dataframe(
+                pd.DataFrame(cache_rows).style.format({"Taxa de Acerto": "{:.0%}"}),
+                use_container_width=True,
+                hide_index=True,
+            )
+        st.caption(f"Usuário: {TENANT} · Versões: transações v{transactions_version}, contas v{bills_version}")
+    with st.expander("Uso de Memória"):
+        st.dataframe(LEDGER.memory_report(), use_container_width=True, hide_index=True)
+
+    @st.fragment
+    def section_timings_panel():
+        with st.expander("Tempo por Seção"):
+            st.button("Atualizar", key="refresh_section_timings") # Reexecuta só este painel
+            timing_rows = SECTION_TIMINGS.rows()
+            if timing_rows:
+                st.dataframe(
+                    pd.DataFrame(timing_rows).style.format({"Última (ms)": "{:.1f}", "Média (ms)": "{:.1f}"}),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+    SECTION_TIMINGS.record("Script completo", time.perf_counter() - script_start)
+    section_timings_panel()
+
+    # Diagnóstico (oculto): spans dos trechos quentes com percentis, visível com ?diagnostics=1
+    # na URL ou IASMIN_DIAGNOSTICS=1. Com IASMIN_METRICS_FILE, os mesmos dados são gravados
+    # em formato texto do Prometheus ao fim de cada execução (ex.: para o textfile collector)
+    if st.query_params.get("diagnostics") == "1" or os.environ.get("IASMIN_DIAGNOSTICS") == "1":
+        @st.fragment
+        def diagnostics_panel():
+            with st.expander("Diagnóstico", expanded=True):
+                st.button("Atualizar", key="refresh_diagnostics")
+                span_rows = SPANS.rows()
+                if span_rows:
+                    st.dataframe(
+                        pd.DataFrame(span_rows).style.format({
+                            "Linhas": "{:,.0f}", "p50 (ms)": "{:.2f}", "p95 (ms)": "{:.2f}",
+                            "p99 (ms)": "{:.2f}", "Máx. (ms)": "{:.2f}", "Total (s)": "{:.3f}",
+                        }, na_rep=""),
+                        use_container_width=True,
+                        hide_index=True,
+                    )
+                if st.button("Zerar medições", key="reset_diagnostics"):
+                    SPANS.reset()
+                    SECTION_TIMINGS.reset()
+                    st.rerun(scope="fragment")
+
+        diagnostics_panel()
+
+metrics_file = os.environ.get("IASMIN_METRICS_FILE")
+if metrics_file:
+    SPANS.write_prometheus(metrics_file)
+
+st.session_state.full_run = False
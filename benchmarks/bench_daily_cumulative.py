@@ -0,0 +1,75 @@
+# benchmarks/bench_daily_cumulative.py
+#
+# Mede a série acumulada diária (core.aggregations.cumulative_daily) em livros-caixa
+# sintéticos de vários anos, comparando com o groupby().apply(lambda) antigo nos
+# tamanhos menores. Executar a partir da raiz do projeto:
+#
+#     python -m benchmarks.bench_daily_cumulative
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.aggregations import cumulative_daily
+from core.storage import TRANSACTIONS_SCHEMA
+
+SIZES = [10_000, 100_000, 1_000_000, 3_000_000]
+LEGACY_MAX_ROWS = 100_000  # acima disso o groupby().apply leva tempo demais
+YEARS = 10
+
+
+def synthetic_transactions(n_rows, years=YEARS, seed=0):
+    """Gera `n_rows` transações distribuídas ao longo de `years` anos."""
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, 365 * years, n_rows)
+    return TRANSACTIONS_SCHEMA.coerce(pd.DataFrame({
+        "Data": pd.Timestamp("2015-01-01") + pd.to_timedelta(days, unit="D"),
+        "Tipo": rng.choice(["Receita", "Despesa", "Reserva para Viagem"], n_rows, p=[0.3, 0.65, 0.05]),
+        "Categoria": rng.choice(["Alimentação", "Moradia", "Salário", "Viagem", "Outros"], n_rows),
+        "Valor": rng.gamma(2.0, 150.0, n_rows).round(2),
+        "Descrição": "",
+    }))
+
+
+def legacy_cumulative_daily(df):
+    """Implementação anterior (groupby por data com apply + merge com o calendário completo)."""
+    all_dates = pd.date_range(start=df["Data"].min(), end=df["Data"].max(), freq='D')
+    daily_summary = df.groupby(df["Data"].dt.date).apply(
+        lambda x: pd.Series({
+            'Receita': x[x["Tipo"] == "Receita"]["Valor"].sum(),
+            'Despesa': x[x["Tipo"] == "Despesa"]["Valor"].sum()
+        })
+    ).reset_index()
+    daily_summary.columns = ['Data', 'Receita', 'Despesa']
+    daily_summary['Data'] = pd.to_datetime(daily_summary['Data'])
+    merged_df = pd.merge(pd.DataFrame(all_dates, columns=['Data']), daily_summary, on='Data', how='left').fillna(0)
+    merged_df['Receita Acumulada'] = merged_df['Receita'].cumsum()
+    merged_df['Despesa Acumulada'] = merged_df['Despesa'].cumsum()
+    return merged_df
+
+
+def best_of(func, repeat=5):
+    """Menor tempo (s) entre `repeat` execuções."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    print(f"{'linhas':>10} {'vetorizado (ms)':>16} {'ns/linha':>9} {'apply (ms)':>11}")
+    for n_rows in SIZES:
+        df = synthetic_transactions(n_rows)
+        elapsed = best_of(lambda: cumulative_daily(df))
+        legacy = ""
+        if n_rows <= LEGACY_MAX_ROWS:
+            legacy_elapsed = best_of(lambda: legacy_cumulative_daily(df), repeat=1)
+            legacy = f"{legacy_elapsed * 1e3:.1f}"
+        print(f"{n_rows:>10,} {elapsed * 1e3:>16.1f} {elapsed / n_rows * 1e9:>9.1f} {legacy:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_editor_diff.py
+#
+# Mede a aplicação de 1.000 edições de célula (mais inclusões e exclusões) vindas do
+# st.data_editor num livro-caixa de 500 mil linhas: aplicação em bloco por coluna via
+# IDs (core.editor + Schema.apply_edit) contra o laço antigo de .loc por célula, e a
+# persistência como uma entrada no journal contra a regravação completa do arquivo.
+# Executar a partir da raiz do projeto:
+#
+#     python -m benchmarks.bench_editor_diff
+
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_daily_cumulative import best_of, synthetic_transactions
+from core.editor import editor_batch
+from core.storage import TRANSACTIONS_SCHEMA, CsvBackend, FeatherBackend, JournaledStore
+
+N_ROWS = 500_000
+N_EDITS = 1_000
+N_ADDED = 50
+N_DELETED = 50
+
+
+def synthetic_editor_state(n_rows, seed=1):
+    """Estado de editor com N_EDITS células editadas em Data/Valor/Categoria/Descrição."""
+    rng = np.random.default_rng(seed)
+    edited_rows = {}
+    columns = ["Data", "Valor", "Categoria", "Descrição"]
+    for pos, col in zip(rng.integers(0, n_rows, N_EDITS), rng.choice(columns, N_EDITS)):
+        if col == "Data":
+            value = f"{rng.integers(1, 28):02d}/{rng.integers(1, 13):02d}/2020"
+        elif col == "Valor":
+            value = float(rng.gamma(2.0, 150.0))
+        elif col == "Categoria":
+            value = str(rng.choice(["Alimentação", "Moradia", "Lazer"]))
+        else:
+            value = f"editado {pos}"
+        edited_rows.setdefault(int(pos), {})[col] = value
+    added_rows = [
+        {"Data": "10/10/2024", "Tipo": "Despesa", "Categoria": "Outros", "Valor": 10.0, "Descrição": "nova"}
+        for _ in range(N_ADDED)
+    ]
+    deleted_rows = sorted(set(rng.integers(0, n_rows, N_DELETED).tolist()) - set(edited_rows))
+    return {"edited_rows": edited_rows, "added_rows": added_rows, "deleted_rows": deleted_rows}
+
+
+def legacy_apply(df, state):
+    """Implementação anterior: cópia completa, um .loc por célula e um concat por linha nova.
+
+    Com as mesmas conversões do editor atual (Valor arredondado a centavos, Descrição
+    no tipo de texto do esquema), para que os resultados possam ser comparados.
+    """
+    updated = df.copy()
+    for idx, row_dict in state['edited_rows'].items():
+        for col, val in row_dict.items():
+            if col == "Data":
+                updated.loc[idx, col] = pd.to_datetime(val, format='%d/%m/%Y', errors='coerce')
+            elif col == "Valor":
+                updated.loc[idx, col] = round(float(pd.to_numeric(val, errors='coerce')), 2)
+            elif col in TRANSACTIONS_SCHEMA.categorical:
+                if val not in updated[col].cat.categories:
+                    updated[col] = updated[col].cat.add_categories([val])
+                updated.loc[idx, col] = val
+            else:
+                updated.loc[idx, col] = val
+    for col in TRANSACTIONS_SCHEMA.text:
+        updated[col] = updated[col].astype(TRANSACTIONS_SCHEMA.dtypes[col])
+    for row_dict in state['added_rows']:
+        new_row_df = TRANSACTIONS_SCHEMA.from_records([row_dict], "%d/%m/%Y")
+        updated = TRANSACTIONS_SCHEMA.concat([updated, new_row_df])
+    updated = updated.drop(state['deleted_rows']).dropna(subset=['Data', 'Valor'])
+    return updated.reset_index(drop=True)
+
+
+def batched_apply(df, state):
+    batch = editor_batch(state, TRANSACTIONS_SCHEMA, row_ids=df["ID"].to_numpy())
+    return TRANSACTIONS_SCHEMA.apply_edit(df, batch)[0], batch
+
+
+def main():
+    df = synthetic_transactions(N_ROWS)
+    state = synthetic_editor_state(N_ROWS)
+    n_cells = sum(len(row) for row in state["edited_rows"].values())
+    print(f"{N_ROWS:,} linhas, {n_cells} células editadas, {N_ADDED} inclusões, "
+          f"{len(state['deleted_rows'])} exclusões")
+
+    legacy_df = legacy_apply(df, state)
+    new_df, batch = batched_apply(df, state)
+    assert legacy_df.equals(new_df), "resultados diferentes entre as implementações"
+
+    print(f"  aplicação (.loc por célula):      {best_of(lambda: legacy_apply(df, state), repeat=1) * 1e3:8.1f} ms")
+    print(f"  aplicação (em bloco por coluna):  {best_of(lambda: batched_apply(df, state)) * 1e3:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_store = JournaledStore(f"{tmp}/t.csv", TRANSACTIONS_SCHEMA, CsvBackend())
+        feather_store = JournaledStore(f"{tmp}/t.feather", TRANSACTIONS_SCHEMA, FeatherBackend())
+        journal_store = JournaledStore(f"{tmp}/j.feather", TRANSACTIONS_SCHEMA, FeatherBackend(),
+                                       compact_threshold=10**9)
+        journal_store.rewrite(df)
+        print(f"  persistência (CSV completo):      {best_of(lambda: csv_store.rewrite(new_df), repeat=1) * 1e3:8.1f} ms")
+        print(f"  persistência (Feather completo):  {best_of(lambda: feather_store.rewrite(new_df)) * 1e3:8.1f} ms")
+        print(f"  persistência (entrada no journal):{best_of(lambda: journal_store.edit(batch)) * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# benchmarks/bench_memory.py
+#
+# Mede a memória de livros-caixa sintéticos com os tipos do esquema (categóricas,
+# textos Arrow) e com os tipos antigos (texto como objetos Python), e confere que os
+# totais em centavos batem com a soma exata. Executar a partir da raiz do projeto:
+#
+#     python -m benchmarks.bench_memory
+
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_daily_cumulative import synthetic_transactions
+from core.rollups import Rollups
+from core.storage import BILLS_SCHEMA, TRANSACTIONS_SCHEMA
+
+SIZES = [10_000, 100_000, 1_000_000]
+DESCRIPTIONS = ["Mercado", "Aluguel Apartamento", "Salário Hospital", "Almoço Restaurante", "Farmácia"]
+
+
+def ledger(n_rows, seed=0):
+    """Transações sintéticas com descrições variadas (texto livre, com sufixo numérico)."""
+    rng = np.random.default_rng(seed)
+    df = synthetic_transactions(n_rows, seed=seed)
+    prefixes = rng.choice(DESCRIPTIONS, n_rows)
+    df["Descrição"] = pd.Series(prefixes, dtype=object) + " " + rng.integers(0, 10_000, n_rows).astype(str)
+    return TRANSACTIONS_SCHEMA.coerce(df)
+
+
+def legacy_frame(df):
+    """Os mesmos dados com os tipos antigos: texto como objetos Python, sem categóricas."""
+    return df.astype({col: object for col in ["Tipo", "Categoria", "Descrição"]})
+
+
+def megabytes(df):
+    return df.memory_usage(deep=True, index=False).sum() / 2**20
+
+
+def main():
+    print(f"{'linhas':>10} {'esquema (MB)':>13} {'B/linha':>8} {'objetos (MB)':>13} {'B/linha':>8} {'totais exatos':>14}")
+    for n_rows in SIZES:
+        df = ledger(n_rows)
+        legacy = legacy_frame(df)
+        rollups = Rollups.from_frames(df, BILLS_SCHEMA.empty())
+        exact = sum((Decimal(str(v)) for v in df.loc[df["Tipo"] == "Receita", "Valor"]), Decimal(0))
+        matches = Decimal(str(rollups.totals_by_type()["Receita"])) == exact
+        compact_mb, legacy_mb = megabytes(df), megabytes(legacy)
+        print(f"{n_rows:>10,} {compact_mb:>13.1f} {compact_mb * 2**20 / n_rows:>8.1f} "
+              f"{legacy_mb:>13.1f} {legacy_mb * 2**20 / n_rows:>8.1f} {str(matches):>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_startup.py
+#
+# Mede a partida a frio do dashboard: o custo de importar cada dependência pesada e o
+# tempo até a primeira tela útil (span startup.first_paint, ver app.py) numa sessão
+# nova, com um livro-caixa sintético. Cada medição roda num processo Python novo, para
+# que nada já esteja importado ou em cache. Executar a partir da raiz do projeto:
+#
+#     python -m benchmarks.bench_startup
+#     python -m benchmarks.bench_startup --rows 1000000
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["pandas", "pyarrow", "streamlit", "plotly.express", "core.ledger", "core.finance"]
+APP_FILES = ["app.py", "iasmin.jpeg", "assets", "core"]
+
+IMPORT_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+print(json.dumps(time.perf_counter() - start))
+"""
+
+# Roda o app uma vez (sessão nova, processo novo) e devolve os spans e tempos de seção
+APP_SNIPPET = """
+import json, sys
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=600).run()
+if at.exception:
+    sys.exit(at.exception[0].value)
+from core.instrumentation import SPANS
+from core.timing import SECTION_TIMINGS
+spans = {row["Span"]: row["p50 (ms)"] for row in SPANS.rows()}
+sections = {row["Seção"]: row["Última (ms)"] for row in SECTION_TIMINGS.rows()}
+print(json.dumps({"spans": spans, "sections": sections}))
+"""
+
+
+def run_python(snippet, *args, cwd=ROOT):
+    output = subprocess.run(
+        [sys.executable, "-c", snippet, *args], cwd=cwd, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def prepare_app_dir(tmp, n_rows):
+    """Cópia do app com um livro-caixa sintético de `n_rows` linhas na pasta 'data'."""
+    from benchmarks.synthetic import synthetic_bills, synthetic_ledger
+    from core.storage import BILLS_SCHEMA, TRANSACTIONS_SCHEMA, CsvBackend
+
+    for name in APP_FILES:
+        source = os.path.join(ROOT, name)
+        target = os.path.join(tmp, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, target, ignore=shutil.ignore_patterns("__pycache__"))
+        else:
+            shutil.copy(source, target)
+    os.makedirs(os.path.join(tmp, "data"))
+    CsvBackend().write(os.path.join(tmp, "data", "transactions.csv"), synthetic_ledger(n_rows), TRANSACTIONS_SCHEMA)
+    CsvBackend().write(os.path.join(tmp, "data", "bills.csv"), synthetic_bills(200), BILLS_SCHEMA)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partida a frio: imports e tempo até a primeira tela.")
+    parser.add_argument("--rows", type=int, default=100_000, help="linhas do livro-caixa sintético")
+    args = parser.parse_args(argv)
+
+    print("Import a frio (processo novo)")
+    for module in MODULES:
+        print(f"  {module:<16} {run_python(IMPORT_SNIPPET, module) * 1e3:>9.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare_app_dir(tmp, args.rows)
+        # A primeira execução migra os CSVs para Feather; a medida é a segunda, com os dados já migrados
+        run_python(APP_SNIPPET, cwd=tmp)
+        result = run_python(APP_SNIPPET, cwd=tmp)
+
+    print(f"Primeira execução do app ({args.rows:,} transações)")
+    for name in ["startup.first_paint", "ledger.load", "import.plotly"]:
+        if name in result["spans"]:
+            print(f"  {name:<24} {result['spans'][name]:>9.1f} ms")
+    for section, ms in sorted(result["sections"].items(), key=lambda item: -item[1]):
+        print(f"  {'seção ' + section:<24} {ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# benchmarks/bench_suite.py
+#
+# Suíte de desempenho sem navegador: gera livros-caixa sintéticos (benchmarks/synthetic.py)
+# e mede carga, agregações do dashboard, aplicação das edições do st.data_editor e
+# gravações, em cada tamanho. Os resultados saem numa tabela e num JSON comparável entre
+# execuções (mesmas chaves: rows, operation, seconds). Executar a partir da raiz do projeto:
+#
+#     python -m benchmarks.bench_suite                       # 10 mil a 10 milhões de linhas
+#     python -m benchmarks.bench_suite --sizes 10000 100000 --output antes.json
+
+import argparse
+import io
+import json
+import platform
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_daily_cumulative import best_of
+from benchmarks.bench_editor_diff import synthetic_editor_state
+from benchmarks.synthetic import synthetic_bills, synthetic_ledger
+from core.aggregations import cumulative_daily
+from core.categorizer import Categorizer
+from core.charts import downsample
+from core.dateindex import DateIndex
+from core.editor import editor_batch
+from core.forecast import cash_flow_forecast
+from core.importer import import_statement
+from core.pagination import filter_mask, sorted_positions, view_positions
+from core.ledger import SharedLedger
+from core.rollups import Rollups
+from core.sqlite_store import SqlLedger, SqliteStore
+from core.storage import BILLS_SCHEMA, RECURRING_SCHEMA, TRANSACTIONS_SCHEMA, CsvBackend, FeatherBackend, JournaledStore
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+N_BILLS = 200
+CSV_MAX_ROWS = 1_000_000  # acima disso gravar/ler CSV leva minutos
+SQLITE_MAX_ROWS = 1_000_000
+
+
+def new_row():
+    return TRANSACTIONS_SCHEMA.from_records([{
+        "Data": "2024-05-10", "Tipo": "Despesa", "Categoria": "Alimentação", "Valor": 42.5, "Descrição": "Mercado",
+    }])
+
+
+def apply_editor_state(df, rollups, state):
+    """O caminho de uma edição no app: lote do editor, aplicação por ID e totais por delta."""
+    batch = editor_batch(state, TRANSACTIONS_SCHEMA, row_ids=df["ID"].to_numpy())
+    new_df, removed, added = TRANSACTIONS_SCHEMA.apply_edit(df, batch)
+    updated = rollups.copy()
+    updated.remove_transactions(removed)
+    updated.add_transactions(added)
+    return new_df, batch
+
+
+def run_size(n_rows, tmp):
+    """Mede todas as operações para um tamanho; retorna {operação: segundos}."""
+    repeat = 3 if n_rows < 1_000_000 else 1
+    df = synthetic_ledger(n_rows)
+    bills = synthetic_bills(N_BILLS)
+    results = {}
+
+    # --- Carga ---
+    base = f"{tmp}/transactions_{n_rows}"
+    FeatherBackend().write(base + ".feather", df, TRANSACTIONS_SCHEMA)
+    FeatherBackend().write(f"{tmp}/bills_{n_rows}.feather", bills, BILLS_SCHEMA)
+    results["load.feather"] = best_of(lambda: FeatherBackend().read(base + ".feather", TRANSACTIONS_SCHEMA), repeat)
+    if n_rows <= CSV_MAX_ROWS:
+        CsvBackend().write(base + ".csv", df, TRANSACTIONS_SCHEMA)
+        results["load.csv"] = best_of(lambda: CsvBackend().read(base + ".csv", TRANSACTIONS_SCHEMA), repeat)
+
+    def load_snapshot():
+        transactions_store = JournaledStore(base + ".feather", TRANSACTIONS_SCHEMA, FeatherBackend())
+        bills_store = JournaledStore(f"{tmp}/bills_{n_rows}.feather", BILLS_SCHEMA, FeatherBackend())
+        return SharedLedger(transactions_store, bills_store).snapshot()
+    results["load.snapshot"] = best_of(load_snapshot, repeat)
+
+    # --- Agregações do dashboard ---
+    results["aggregate.rollups_build"] = best_of(lambda: Rollups.from_frames(df, bills), repeat)
+    rollups = Rollups.from_frames(df, bills)
+    results["aggregate.cumulative_daily"] = best_of(lambda: cumulative_daily(df), repeat)
+    results["aggregate.cumulative_daily_rollups"] = best_of(lambda: rollups.cumulative_daily(), repeat)
+    results["aggregate.monthly_average"] = best_of(lambda: rollups.monthly_expenses().mean(), repeat)
+    results["aggregate.expenses_by_category"] = best_of(lambda: rollups.expenses_by_category(), repeat)
+    results["aggregate.totals_by_type"] = best_of(lambda: rollups.totals_by_type(), repeat)
+
+    # --- Histórico: período de 3 meses ordenado por Data, com e sem o índice por data ---
+    date_index = DateIndex.from_frame(df)
+    period = {"start_date": df["Data"].iloc[n_rows // 2], "end_date": df["Data"].iloc[n_rows // 2] + pd.DateOffset(months=3)}
+    results["view.date_index_build"] = best_of(lambda: DateIndex.from_frame(df), repeat)
+    date_index.ordered_positions(descending=True)  # montada uma vez por versão, como no app
+    results["view.period_sorted_mask"] = best_of(
+        lambda: sorted_positions(df, filter_mask(df, **period), "Data", True), repeat
+    )
+    results["view.period_sorted_index"] = best_of(
+        lambda: view_positions(df, "Data", True, date_index=date_index, **period), repeat
+    )
+
+    # --- Redução da série acumulada para o gráfico (LTTB) ---
+    cumulative = rollups.cumulative_daily()
+    results["chart.downsample_cumulative"] = best_of(
+        lambda: downsample(cumulative["Data"], cumulative["Receita Acumulada"]), repeat
+    )
+
+    # --- Projeção de caixa (5 anos, dia a dia) ---
+    results["forecast.cash_flow_60m"] = best_of(
+        lambda: cash_flow_forecast(rollups, bills, RECURRING_SCHEMA.empty(), months=60), repeat
+    )
+
+    # --- Edições do st.data_editor ---
+    state = synthetic_editor_state(n_rows)
+    results["edit.apply"] = best_of(lambda: apply_editor_state(df, rollups, state), repeat)
+    _, batch = apply_editor_state(df, rollups, state)
+
+    # --- Gravações ---
+    store = JournaledStore(f"{tmp}/save_{n_rows}.feather", TRANSACTIONS_SCHEMA, FeatherBackend(),
+                           compact_threshold=10**9)
+    results["save.rewrite_feather"] = best_of(lambda: store.rewrite(df), repeat)
+    results["save.append"] = best_of(lambda: store.append(new_row()), repeat)
+    results["save.edit"] = best_of(lambda: store.edit(batch), repeat)
+    results["save.compact"] = best_of(store.compact, 1)
+    if n_rows <= CSV_MAX_ROWS:
+        csv_store = JournaledStore(f"{tmp}/save_{n_rows}.csv", TRANSACTIONS_SCHEMA, CsvBackend())
+        results["save.rewrite_csv"] = best_of(lambda: csv_store.rewrite(df), 1)
+
+    # --- Categorização automática (índice montado do livro-caixa e lote com todas as linhas) ---
+    results["categorize.build"] = best_of(lambda: Categorizer.from_frame(df), 1)
+    categorizer = Categorizer.from_frame(df)
+    results["categorize.classify"] = best_of(lambda: categorizer.classify(df["Descrição"], df["Tipo"]), repeat)
+
+    # --- Importação de extrato (metade já está no livro-caixa e é descartada) ---
+    if n_rows <= CSV_MAX_ROWS:
+        statement = CsvBackend().write(None, df, TRANSACTIONS_SCHEMA).encode("utf-8")
+        ledger_store = JournaledStore(f"{tmp}/import_{n_rows}.feather", TRANSACTIONS_SCHEMA, FeatherBackend(),
+                                      compact_threshold=10**9)
+        ledger_store.rewrite(df.iloc[: n_rows // 2])
+        bills_store = JournaledStore(f"{tmp}/bills_{n_rows}.feather", BILLS_SCHEMA, FeatherBackend())
+        ledger = SharedLedger(ledger_store, bills_store)
+        results["import.statement_csv"] = best_of(
+            lambda: import_statement(ledger, io.BytesIO(statement), "extrato.csv"), 1
+        )
+
+    # --- SQLite (IASMIN_STORAGE=sqlite) ---
+    if n_rows <= SQLITE_MAX_ROWS:
+        sql_store = SqliteStore(f"{tmp}/ledger_{n_rows}.sqlite", "transactions", TRANSACTIONS_SCHEMA)
+        sql_bills = SqliteStore(f"{tmp}/ledger_{n_rows}.sqlite", "bills", BILLS_SCHEMA)
+        results["sqlite.rewrite"] = best_of(lambda: sql_store.rewrite(df), 1)
+        sql_bills.rewrite(bills)
+        filters = {"category": "Alimentação", "search": "mercado", "start_date": None, "end_date": None}
+        results["sqlite.count"] = best_of(lambda: sql_store.count(**filters), repeat)
+        results["sqlite.query_page"] = best_of(lambda: sql_store.query_page(filters, "Data", True, 0, 50), repeat)
+
+        def sql_aggregates():
+            ledger = SqlLedger(sql_store, sql_bills)  # sem memo: cada chamada consulta o banco
+            ledger.totals_by_type()
+            ledger.expenses_by_category()
+            ledger.monthly_expenses()
+            ledger.cumulative_daily()
+        results["sqlite.aggregates"] = best_of(sql_aggregates, repeat)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suíte de desempenho: carga, agregações, edições e gravações.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="tamanhos do livro-caixa (linhas)")
+    parser.add_argument("--output", default="bench_results.json", help="arquivo JSON com os resultados")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "results": [],
+    }
+    print(f"{'linhas':>11} {'operação':<36} {'ms':>10} {'ns/linha':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.sizes:
+            for operation, seconds in run_size(n_rows, tmp).items():
+                report["results"].append({"rows": n_rows, "operation": operation, "seconds": seconds})
+                print(f"{n_rows:>11,} {operation:<36} {seconds * 1e3:>10.2f} {seconds / n_rows * 1e9:>9.1f}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/synthetic.py
+#
+# Livros-caixa sintéticos no esquema do app (core.storage), com categorias e descrições
+# em português e distribuições de valores próximas às de uso real: salário e plantões
+# como receita, moradia em valores fixos mensais, alimentação e transporte frequentes
+# e de valor baixo.
+
+import numpy as np
+import pandas as pd
+
+from core.storage import BILLS_SCHEMA, TRANSACTIONS_SCHEMA
+
+START = pd.Timestamp("2015-01-01")
+
+# Tipo -> [(categoria, peso, média do valor em R$, descrições)]
+CATEGORIES = {
+    "Receita": [
+        ("Salário", 0.45, 9_500.0, ["Salário Hospital", "Salário Clínica"]),
+        ("Plantão", 0.40, 1_800.0, ["Plantão Noturno", "Plantão Fim de Semana", "Plantão Extra"]),
+        ("Outros", 0.15, 600.0, ["Reembolso", "Venda", "Rendimento Poupança"]),
+    ],
+    "Despesa": [
+        ("Alimentação", 0.30, 55.0, ["Almoço Restaurante", "Mercado", "Padaria", "Delivery"]),
+        ("Transporte", 0.18, 35.0, ["Uber", "Combustível", "Estacionamento"]),
+        ("Moradia", 0.08, 1_200.0, ["Aluguel Apartamento", "Condomínio", "Conta de Luz", "Internet"]),
+        ("Saúde", 0.08, 180.0, ["Farmácia", "Plano de Saúde", "Academia"]),
+        ("Lazer", 0.14, 120.0, ["Cinema", "Show", "Bar com amigos", "Streaming"]),
+        ("Educação", 0.06, 450.0, ["Curso de Especialização", "Livros", "Congresso"]),
+        ("Compras", 0.12, 230.0, ["Roupas", "Eletrônicos", "Presentes"]),
+        ("Outros", 0.04, 90.0, ["Diversos", "Taxa Bancária"]),
+    ],
+    "Reserva para Viagem": [
+        ("Viagem", 1.0, 500.0, ["Reserva Viagem", "Passagens", "Hospedagem"]),
+    ],
+}
+TYPE_WEIGHTS = {"Receita": 0.12, "Despesa": 0.85, "Reserva para Viagem": 0.03}
+
+
+def synthetic_ledger(n_rows, years=10, seed=0):
+    """`n_rows` transações em `years` anos, já no TRANSACTIONS_SCHEMA (IDs 1..n, em ordem)."""
+    rng = np.random.default_rng(seed)
+    tipos = np.array(list(TYPE_WEIGHTS))
+    tipo_codes = rng.choice(len(tipos), n_rows, p=list(TYPE_WEIGHTS.values()))
+
+    categoria = np.empty(n_rows, dtype=object)
+    descricao = np.empty(n_rows, dtype=object)
+    valor = np.empty(n_rows)
+    for code, tipo in enumerate(tipos):
+        rows = np.flatnonzero(tipo_codes == code)
+        options = CATEGORIES[tipo]
+        weights = np.array([option[1] for option in options])
+        choice = rng.choice(len(options), rows.size, p=weights / weights.sum())
+        for i, (name, _, mean, descriptions) in enumerate(options):
+            selected = rows[choice == i]
+            categoria[selected] = name
+            descricao[selected] = rng.choice(descriptions, selected.size)
+            # Log-normal em torno da média: muitos valores pequenos, poucos grandes
+            valor[selected] = rng.lognormal(np.log(mean) - 0.125, 0.5, selected.size)
+
+    days = np.sort(rng.integers(0, 365 * years, n_rows))
+    return TRANSACTIONS_SCHEMA.coerce(pd.DataFrame({
+        "ID": np.arange(1, n_rows + 1, dtype=np.int64),
+        "Data": START + pd.to_timedelta(days, unit="D"),
+        "Tipo": tipos[tipo_codes],
+        "Categoria": categoria,
+        "Valor": valor.round(2),
+        "Descrição": descricao,
+    }))
+
+
+def synthetic_bills(n_rows, years=10, seed=0):
+    """`n_rows` contas a pagar com vencimentos em `years` anos; as já vencidas estão pagas."""
+    rng = np.random.default_rng(seed)
+    names = np.array(["Conta de Luz", "Internet", "Condomínio", "Cartão de Crédito", "IPTU", "Seguro do Carro"])
+    due = START + pd.to_timedelta(np.sort(rng.integers(0, 365 * years + 60, n_rows)), unit="D")
+    return BILLS_SCHEMA.coerce(pd.DataFrame({
+        "ID": np.arange(1, n_rows + 1, dtype=np.int64),
+        "Descrição": rng.choice(names, n_rows),
+        "Valor": rng.lognormal(np.log(300.0), 0.6, n_rows).round(2),
+        "Data de Vencimento": due,
+        "Pago": due < START + pd.Timedelta(days=365 * years),
+    }))
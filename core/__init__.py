@@ -0,0 +1 @@
+"""Núcleo de dados do Dashboard Financeiro (armazenamento, agregações e simulações)."""
@@ -0,0 +1,90 @@
+# core/aggregations.py
+
+import numpy as np
+import pandas as pd
+
+from core.instrumentation import traced
+
+
+def to_cents(values):
+    """Valores em reais como centavos inteiros (int64), para somas sem erro de arredondamento."""
+    return np.rint(np.asarray(values, dtype=float) * 100).astype(np.int64)
+
+
+def from_cents(cents):
+    """Centavos inteiros de volta para reais (float)."""
+    return np.asarray(cents) / 100
+
+
+def _to_day(value):
+    """Converte uma data (date, datetime, Timestamp ou string) para datetime64[D]."""
+    return np.datetime64(pd.Timestamp(value).date(), "D")
+
+
+def _daily_cents(df, start_date, end_date):
+    """Índice de dias e somas diárias (em centavos) de Receita e Despesa; None se o período estiver vazio."""
+    days = df["Data"].to_numpy(dtype="datetime64[D]")
+    mask = ~np.isnat(days)
+    if start_date is not None:
+        mask &= days >= _to_day(start_date)
+    if end_date is not None:
+        mask &= days <= _to_day(end_date)
+
+    days = days[mask]
+    if days.size == 0:
+        return None
+
+    first_day = days.min()
+    offsets = (days - first_day).astype(np.int64)
+    n_days = int(offsets.max()) + 1
+
+    cents = to_cents(df["Valor"].to_numpy(dtype=float)[mask])
+    tipo = df["Tipo"]
+    is_receita = (tipo == "Receita").to_numpy()[mask]
+    is_despesa = (tipo == "Despesa").to_numpy()[mask]
+
+    # Os pesos do bincount são float64, exatos para somas inteiras de até 2**53 centavos
+    receita = np.bincount(offsets, weights=np.where(is_receita, cents, 0), minlength=n_days).astype(np.int64)
+    despesa = np.bincount(offsets, weights=np.where(is_despesa, cents, 0), minlength=n_days).astype(np.int64)
+
+    index = pd.date_range(start=pd.Timestamp(first_day), periods=n_days, freq="D", name="Data")
+    return index, receita, despesa
+
+
+@traced("aggregations.daily_totals")
+def daily_totals(df, start_date=None, end_date=None):
+    """Totais diários de Receita e Despesa entre `start_date` e `end_date` (inclusive).
+
+    Os dias são convertidos em deslocamentos inteiros a partir do primeiro dia com
+    transações e somados com um único `np.bincount` por tipo, já na grade completa
+    de dias (dias sem transações ficam com 0). O período do resultado vai do primeiro
+    ao último dia com transações dentro do filtro. Retorna um DataFrame indexado por
+    data com as colunas 'Receita' e 'Despesa', vazio se não houver transações no período.
+    As somas são feitas em centavos inteiros e convertidas para reais só no final.
+    """
+    daily = _daily_cents(df, start_date, end_date)
+    if daily is None:
+        return pd.DataFrame(
+            {"Receita": [], "Despesa": []},
+            index=pd.DatetimeIndex([], name="Data"),
+        )
+    index, receita, despesa = daily
+    return pd.DataFrame({"Receita": from_cents(receita), "Despesa": from_cents(despesa)}, index=index)
+
+
+@traced("aggregations.cumulative_daily")
+def cumulative_daily(df, start_date=None, end_date=None):
+    """Receita e Despesa acumuladas dia a dia, prontas para o gráfico de linhas.
+
+    Retorna um DataFrame com as colunas 'Data', 'Receita Acumulada' e 'Despesa Acumulada'.
+    """
+    daily = _daily_cents(df, start_date, end_date)
+    if daily is None:
+        return pd.DataFrame({"Data": pd.DatetimeIndex([], name="Data"),
+                             "Receita Acumulada": [], "Despesa Acumulada": []})
+    index, receita, despesa = daily
+    return pd.DataFrame({
+        "Data": index,
+        "Receita Acumulada": from_cents(np.cumsum(receita)),
+        "Despesa Acumulada": from_cents(np.cumsum(despesa)),
+    })
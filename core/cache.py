@@ -0,0 +1,51 @@
+# core/cache.py
+
+import threading
+from collections import defaultdict
+
+
+class CacheStats:
+    """Contadores de chamadas e de recálculos (misses) das funções cacheadas, por conjunto de dados.
+
+    Uma instância única (`CACHE_STATS`) vive no módulo e, portanto, é compartilhada
+    por todas as sessões do processo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = defaultdict(int)
+        self._misses = defaultdict(int)
+
+    def record_call(self, datasets):
+        with self._lock:
+            for dataset in datasets:
+                self._calls[dataset] += 1
+
+    def record_miss(self, datasets):
+        with self._lock:
+            for dataset in datasets:
+                self._misses[dataset] += 1
+
+    def rows(self):
+        """Retorna uma linha por conjunto de dados com chamadas, acertos, recálculos e taxa de acerto."""
+        with self._lock:
+            rows = []
+            for dataset in sorted(self._calls):
+                calls = self._calls[dataset]
+                misses = min(self._misses[dataset], calls)
+                rows.append({
+                    "Conjunto": dataset,
+                    "Chamadas": calls,
+                    "Acertos": calls - misses,
+                    "Recálculos": misses,
+                    "Taxa de Acerto": (calls - misses) / calls if calls else 0.0,
+                })
+            return rows
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._misses.clear()
+
+
+CACHE_STATS = CacheStats()
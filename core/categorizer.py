@@ -0,0 +1,205 @@
+# core/categorizer.py
+#
+# Sugestão de Categoria a partir da Descrição, em lote. O índice aprende com as
+# transações já categorizadas: uma tabela de contagens token x categoria (tokens são as
+# palavras da descrição sem acentos) e as descrições completas já vistas. Regras de
+# palavras-chave (KEYWORD_RULES) cobrem o que ainda não foi aprendido. A classificação
+# trabalha sobre as descrições distintas do lote, com operações de string e de array;
+# o índice aceita inclusão e remoção de linhas, como os totais de core.rollups.
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from core.instrumentation import traced
+
+# Categorias que não ensinam nada (lançamentos ainda não categorizados)
+UNKNOWN_CATEGORIES = {"", "Outros", "Não Especificado", "Outra (especificar)"}
+TIPOS = ["Receita", "Despesa", "Reserva para Viagem"]
+
+# Palavra-chave (sem acentos, minúsculas) -> categoria, usadas quando o histórico não decide
+KEYWORD_RULES = {
+    "salario": "Salário",
+    "aluguel": "Aluguel",
+    "restaurante": "Alimentação",
+    "mercado": "Alimentação",
+    "padaria": "Alimentação",
+    "ifood": "Alimentação",
+    "uber": "Transporte",
+    "combustivel": "Transporte",
+    "farmacia": "Saúde",
+    "passagem": "Viagem",
+    "hotel": "Viagem",
+}
+
+# Fração mínima dos votos dos tokens para a categoria sugerida
+MIN_TOKEN_SCORE = 0.5
+_TOKEN = r"[a-z]{3,}"
+
+
+def plain_text(values):
+    """Texto sem acentos, em minúsculas e com espaços simples (vetorizado)."""
+    text = pd.Series(values, dtype=object).fillna("").astype(str)
+    text = text.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+    return text.str.lower().str.split().str.join(" ")
+
+
+class Categorizer:
+    """Índice token -> categoria e descrição -> categoria aprendido das transações.
+
+    `token_counts[i, j]` é o número de transações com o token i na categoria j;
+    `tipo_counts[j, t]`, o número de transações da categoria j com o Tipo TIPOS[t]
+    (uma Despesa nunca recebe uma categoria só vista em Receitas).
+    """
+
+    def __init__(self, rules=None):
+        self.rules = dict(KEYWORD_RULES if rules is None else rules)
+        # Regras compiladas numa alternância: as palavras mais longas primeiro
+        keywords = sorted(map(re.escape, self.rules), key=len, reverse=True)
+        self._rules_pattern = rf"\b({'|'.join(keywords)})" if keywords else None
+        self.tokens = {}
+        self.categories = []
+        self._category_index = {}
+        self.token_counts = np.zeros((0, 0), dtype=np.int64)
+        self.tipo_counts = np.zeros((0, len(TIPOS)), dtype=np.int64)
+        self.exact = {}  # (descrição sem acentos, tipo) -> {categoria: contagem}
+
+    @classmethod
+    def from_frame(cls, df, rules=None):
+        categorizer = cls(rules)
+        categorizer.add_transactions(df)
+        return categorizer
+
+    def copy(self):
+        other = Categorizer(self.rules)
+        other.tokens = dict(self.tokens)
+        other.categories = list(self.categories)
+        other._category_index = dict(self._category_index)
+        other.token_counts = self.token_counts.copy()
+        other.tipo_counts = self.tipo_counts.copy()
+        other.exact = {key: dict(counts) for key, counts in self.exact.items()}
+        return other
+
+    def _grow(self, new_tokens, new_categories):
+        """Inclui linhas (tokens) e colunas (categorias) novas nas tabelas de contagem."""
+        for token in new_tokens:
+            self.tokens[token] = len(self.tokens)
+        for category in new_categories:
+            self._category_index[category] = len(self.categories)
+            self.categories.append(category)
+        n_tokens, n_categories = len(self.tokens), len(self.categories)
+        if self.token_counts.shape != (n_tokens, n_categories):
+            grown = np.zeros((n_tokens, n_categories), dtype=np.int64)
+            grown[: self.token_counts.shape[0], : self.token_counts.shape[1]] = self.token_counts
+            self.token_counts = grown
+            tipo_counts = np.zeros((n_categories, len(TIPOS)), dtype=np.int64)
+            tipo_counts[: self.tipo_counts.shape[0]] = self.tipo_counts
+            self.tipo_counts = tipo_counts
+
+    def add_counts(self, counts, sign=1):
+        """Aprende de contagens já agrupadas: DataFrame com Descrição, Tipo, Categoria e n."""
+        counts = counts[~counts["Categoria"].astype(str).str.strip().isin(UNKNOWN_CATEGORIES)]
+        counts = counts[counts["Tipo"].astype(str).isin(TIPOS)]
+        if counts.empty:
+            return
+        plain = plain_text(counts["Descrição"].to_numpy(dtype=object)).to_numpy()
+        tipos = counts["Tipo"].astype(str).to_numpy()
+        categories = counts["Categoria"].astype(str).str.strip().to_numpy()
+        weights = counts["n"].to_numpy(dtype=np.int64) * sign
+
+        tokens = pd.Series(plain).str.findall(_TOKEN).explode().dropna()
+        self._grow(
+            [token for token in pd.unique(tokens.to_numpy()) if token not in self.tokens],
+            [category for category in pd.unique(categories) if category not in self._category_index],
+        )
+        category_idx = np.array([self._category_index[category] for category in categories], dtype=np.int64)
+        token_rows = tokens.index.to_numpy()
+        np.add.at(
+            self.token_counts,
+            (np.array([self.tokens[token] for token in tokens.to_numpy()], dtype=np.int64), category_idx[token_rows]),
+            weights[token_rows],
+        )
+        np.add.at(self.tipo_counts, (category_idx, pd.Index(TIPOS).get_indexer(tipos)), weights)
+
+        for key, category, weight in zip(zip(plain, tipos), categories, weights.tolist()):
+            seen = self.exact.setdefault(key, {})
+            seen[category] = seen.get(category, 0) + weight
+            if seen[category] <= 0:
+                del seen[category]
+                if not seen:
+                    del self.exact[key]
+
+    def add_transactions(self, df, sign=1):
+        """Aprende com transações (Descrição, Tipo, Categoria); sign=-1 desfaz."""
+        if df is None or df.empty:
+            return
+        counts = (
+            pd.DataFrame({
+                "Descrição": df["Descrição"].astype(object).to_numpy(),
+                "Tipo": df["Tipo"].astype(object).to_numpy(),
+                "Categoria": df["Categoria"].astype(object).to_numpy(),
+            })
+            .fillna("")
+            .groupby(["Descrição", "Tipo", "Categoria"], sort=False)
+            .size()
+            .rename("n")
+            .reset_index()
+        )
+        self.add_counts(counts, sign)
+
+    def remove_transactions(self, df):
+        self.add_transactions(df, sign=-1)
+
+    @traced("categorizer.classify")
+    def classify(self, descriptions, tipos):
+        """Categoria sugerida para cada (descrição, tipo); NaN quando não há evidência suficiente.
+
+        Ordem de decisão: a mesma descrição já categorizada antes (a categoria mais usada),
+        os votos dos tokens da descrição e, só para o que o histórico não decide, as regras
+        de palavras-chave.
+        """
+        # As descrições se repetem muito: cada par (descrição, tipo) distinto é decidido uma vez
+        keys = pd.MultiIndex.from_arrays([
+            pd.Series(np.asarray(descriptions, dtype=object)).fillna("").to_numpy(),
+            pd.Series(np.asarray(tipos, dtype=object)).astype(str).to_numpy(),
+        ])
+        codes, uniques = keys.factorize()
+        plain = plain_text(uniques.get_level_values(0).to_numpy(dtype=object))
+        unique_tipos = uniques.get_level_values(1)
+
+        exact = [self.exact.get(key) for key in zip(plain, unique_tipos)]
+        result = pd.Series([max(seen, key=seen.get) if seen else np.nan for seen in exact], dtype=object)
+
+        missing = np.flatnonzero(result.isna().to_numpy())
+        if missing.size and len(self.categories):
+            result.iloc[missing] = self._token_votes(plain.iloc[missing], unique_tipos[missing])
+
+        missing = result.isna().to_numpy()
+        if missing.any() and self._rules_pattern is not None:
+            # Uma única passada de regex para todas as palavras-chave (a primeira que aparecer)
+            keyword = plain[missing].str.extract(self._rules_pattern, expand=False)
+            result[missing] = keyword.map(self.rules).to_numpy()
+        return pd.Series(result.to_numpy()[codes], dtype=object)
+
+    def _token_votes(self, plain, tipos):
+        """Categoria com mais votos dos tokens (cada token vota com sua distribuição de categorias)."""
+        tokens = plain.reset_index(drop=True).str.findall(_TOKEN).explode().dropna()
+        token_idx = tokens.map(self.tokens).dropna()
+        votes = np.zeros((len(plain), len(self.categories)))
+        if len(token_idx):
+            counts = self.token_counts[token_idx.to_numpy(dtype=np.int64)].astype(float)
+            totals = counts.sum(axis=1, keepdims=True)
+            np.add.at(votes, token_idx.index.to_numpy(), np.divide(counts, totals, where=totals > 0,
+                                                                   out=np.zeros_like(counts)))
+        # Só categorias já vistas com o mesmo Tipo
+        tipo_idx = pd.Index(TIPOS).get_indexer(tipos)
+        allowed = np.zeros_like(votes, dtype=bool)
+        known = tipo_idx >= 0
+        allowed[known] = (self.tipo_counts[:, tipo_idx[known]] > 0).T
+        votes[~allowed] = 0
+        matched = np.bincount(token_idx.index.to_numpy(), minlength=len(plain)) if len(token_idx) else np.zeros(len(plain))
+        best = votes.argmax(axis=1)
+        score = votes[np.arange(len(plain)), best] / np.maximum(matched, 1)
+        categories = np.array(self.categories, dtype=object)[best]
+        return np.where((matched > 0) & (score >= MIN_TOKEN_SCORE), categories, np.nan)
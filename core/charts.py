@@ -0,0 +1,77 @@
+# core/charts.py
+#
+# Séries longas nos gráficos de linha (acumulado diário de décadas, simulações longas):
+# cada série é reduzida a no máximo MAX_POINTS pontos com o LTTB (Largest-Triangle-
+# Three-Buckets), que preserva picos, vales e mudanças de inclinação, e traços com mais
+# de WEBGL_THRESHOLD pontos são desenhados em WebGL (Scattergl) em vez de SVG. O gráfico
+# não ganha nada com mais pontos do que pixels na horizontal; o payload enviado ao
+# navegador deixa de crescer com o tamanho do histórico.
+
+import numpy as np
+
+from core.instrumentation import traced
+
+# Orçamento de pontos por série: ~2 por pixel na largura de um gráfico em tela cheia
+MAX_POINTS = 2000
+# A partir deste número de pontos num traço, o desenho passa para WebGL
+WEBGL_THRESHOLD = 1000
+
+
+def lttb_indices(x, y, n_out):
+    """Índices (crescentes) dos `n_out` pontos escolhidos pelo LTTB; todos se a série já couber.
+
+    O primeiro e o último ponto são sempre mantidos; os demais são divididos em
+    `n_out - 2` faixas e, de cada faixa, fica o ponto que forma o maior triângulo com o
+    ponto escolhido na faixa anterior e a média da faixa seguinte. As médias vêm de somas
+    acumuladas; só a escolha, que depende da faixa anterior, percorre as faixas.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    starts, stops = edges[:-1], edges[1:]
+    sum_x = np.concatenate([[0.0], np.cumsum(x)])
+    sum_y = np.concatenate([[0.0], np.cumsum(y)])
+    sizes = stops - starts
+    # Média da faixa seguinte de cada faixa (a da última é o último ponto)
+    next_x = np.append(((sum_x[stops] - sum_x[starts]) / sizes)[1:], x[-1])
+    next_y = np.append(((sum_y[stops] - sum_y[starts]) / sizes)[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i, (lo, hi) in enumerate(zip(starts.tolist(), stops.tolist())):
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+@traced("charts.downsample")
+def downsample(x, y, max_points=MAX_POINTS):
+    """(x, y) reduzidos a no máximo `max_points` pontos (LTTB); `x` pode ser de datas."""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    if len(x) <= max_points:
+        return x, y
+    position = x.astype("datetime64[ns]").astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x
+    position = np.asarray(position, dtype=float) - float(position[0])  # evita somas de números enormes
+    keep = lttb_indices(position, y, max_points)
+    return x[keep], y[keep]
+
+
+def line_trace(x, y, max_points=MAX_POINTS, webgl_threshold=WEBGL_THRESHOLD, **kwargs):
+    """Traço de linha do Plotly para (x, y), já reduzido: Scatter em SVG ou Scattergl acima do limite.
+
+    `kwargs` vão para o traço (name, line, fill...). O Plotly é importado aqui, quando o
+    gráfico é montado (ver plotly_modules() em app.py).
+    """
+    import plotly.graph_objects as go
+
+    x, y = downsample(x, y, max_points)
+    trace = go.Scattergl if len(x) > webgl_threshold else go.Scatter
+    return trace(x=x, y=y, mode="lines", **kwargs)
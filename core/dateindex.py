@@ -0,0 +1,95 @@
+# core/dateindex.py
+#
+# Índice por data de um DataFrame que fica ordenado por ID (ver core/storage.py): os dias
+# em ordem crescente (int64, dias desde 1970-01-01) e, para cada um, a posição (iloc) da
+# linha. Um período vira um recorte [lo, hi) achado por busca binária (np.searchsorted),
+# em O(log n), e a ordenação por data já está pronta. O índice acompanha as escritas do
+# livro-caixa (core/ledger.py): inclusões são intercaladas nos dias já ordenados, sem
+# reordenar tudo; as instâncias nunca são alteradas no lugar, como os DataFrames.
+
+import numpy as np
+
+from core.aggregations import _to_day
+
+
+def _days(values):
+    return np.asarray(values, dtype="datetime64[D]").astype(np.int64)
+
+
+class DateIndex:
+    """Posições das linhas em ordem de data; empates (mesmo dia) em ordem de posição (de ID).
+
+    Linhas sem data ficam fora do índice.
+    """
+
+    def __init__(self, days, positions):
+        self.days = days
+        self.positions = positions
+        self._descending = None  # ordem decrescente, montada na primeira vez que é pedida
+
+    @classmethod
+    def from_frame(cls, df, column="Data"):
+        days = df[column].to_numpy(dtype="datetime64[D]")
+        valid = np.flatnonzero(~np.isnat(days))
+        days = days[valid].astype(np.int64)
+        # Ordenação estável de inteiros (radix sort): empates mantêm a ordem de ID
+        order = np.argsort(days, kind="stable")
+        return cls(days[order], valid[order])
+
+    def __len__(self):
+        return len(self.days)
+
+    def append(self, df, first_position, column="Data"):
+        """Novo índice com as linhas de `df` acrescentadas a partir da posição `first_position`.
+
+        As linhas novas são ordenadas entre si e intercaladas com np.searchsorted; como
+        vêm depois (IDs maiores), entram após as linhas do mesmo dia.
+        """
+        added = DateIndex.from_frame(df, column)
+        if not len(added):
+            return self
+        at = np.searchsorted(self.days, added.days, side="right")
+        return DateIndex(
+            np.insert(self.days, at, added.days),
+            np.insert(self.positions, at, added.positions + first_position),
+        )
+
+    def bounds(self, start_date=None, end_date=None):
+        """Recorte [lo, hi) do índice com as datas entre `start_date` e `end_date` (inclusive)."""
+        lo = 0 if start_date is None else int(np.searchsorted(self.days, _days(_to_day(start_date)), side="left"))
+        hi = len(self.days) if end_date is None else int(np.searchsorted(self.days, _days(_to_day(end_date)), side="right"))
+        return lo, max(lo, hi)
+
+    def positions_between(self, start_date=None, end_date=None):
+        """Posições das linhas no período, em ordem de data (uma view, sem cópia)."""
+        lo, hi = self.bounds(start_date, end_date)
+        return self.positions[lo:hi]
+
+    def ordered_between(self, start_date=None, end_date=None, descending=False):
+        """Posições das linhas no período em ordem de data (recorte de ordered_positions(), sem cópia).
+
+        O recorte cobre dias inteiros, então na ordem decrescente ele é o intervalo espelhado.
+        """
+        lo, hi = self.bounds(start_date, end_date)
+        if not descending:
+            return self.positions[lo:hi]
+        n = len(self.days)
+        return self.ordered_positions(descending=True)[n - hi:n - lo]
+
+    def ordered_positions(self, descending=False):
+        """Todas as posições em ordem de data; em ordem decrescente, os empates continuam em ordem de ID."""
+        if not descending:
+            return self.positions
+        if self._descending is None:
+            self._descending = self._descending_positions()
+        return self._descending
+
+    def _descending_positions(self):
+        days = self.days[::-1]
+        positions = self.positions[::-1]
+        # Reverter a ordem inverte também os empates: desfaz dentro de cada grupo de dias iguais
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        ends = np.r_[starts[1:], len(days)]
+        group = np.repeat(np.arange(len(starts)), ends - starts)
+        index = starts[group] + ends[group] - 1 - np.arange(len(days))
+        return positions[index]
@@ -0,0 +1,46 @@
+# core/editor.py
+
+from collections import defaultdict
+
+import numpy as np
+
+from core.instrumentation import traced
+from core.storage import ID_COLUMN, EditBatch
+
+
+def has_changes(state):
+    """Indica se o estado de um st.data_editor tem edições, inclusões ou exclusões pendentes."""
+    return bool(state) and bool(
+        state.get("edited_rows") or state.get("added_rows") or state.get("deleted_rows")
+    )
+
+
+@traced("editor.batch")
+def editor_batch(state, schema, row_ids, date_format="%d/%m/%Y", defaults=None):
+    """Converte o estado de um st.data_editor em um EditBatch do esquema.
+
+    As edições são agrupadas por coluna e convertidas de uma vez (uma chamada de
+    to_datetime/to_numeric por coluna, não por célula). `row_ids` traz o ID de cada
+    linha exibida no editor (na ordem exibida, por exemplo numa visão filtrada), de
+    modo que o lote referencia as linhas pelo ID. `defaults` preenche as colunas não
+    informadas nas linhas novas.
+    """
+    row_ids = np.asarray(row_ids, dtype=np.int64)
+
+    by_column = defaultdict(lambda: ([], []))
+    for pos, row in state.get("edited_rows", {}).items():
+        for col, val in row.items():
+            if col in schema.dtypes and col != ID_COLUMN:
+                by_column[col][0].append(int(pos))
+                by_column[col][1].append(val)
+
+    updates = {
+        col: (row_ids[np.asarray(positions, dtype=np.int64)], schema.parse_values(col, values, date_format))
+        for col, (positions, values) in by_column.items()
+    }
+
+    added_rows = [{**(defaults or {}), **row} for row in state.get("added_rows", [])]
+    added = schema.from_records(added_rows, date_format) if added_rows else None
+
+    deleted = row_ids[np.asarray(state.get("deleted_rows", []), dtype=np.int64)]
+    return EditBatch(updates, deleted, added)
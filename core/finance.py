@@ -0,0 +1,199 @@
+# core/finance.py
+#
+# Regras de negócio do dashboard, sem Streamlit: recebem os totais pré-calculados
+# (core.rollups.Rollups ou core.sqlite_store.SqlLedger, que têm a mesma interface) ou os
+# DataFrames do esquema e retornam números, Series ou tuplas nomeadas. Podem ser usadas
+# em scripts, benchmarks e workers, e cacheadas individualmente pela interface.
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from core.aggregations import from_cents, to_cents
+from core.pagination import sorted_positions
+from core.recurrence import pending_occurrences
+from core.storage import BILLS_SCHEMA, ID_COLUMN, PENDING_ID, RECURRING_SCHEMA, TRANSACTIONS_SCHEMA
+
+# Categorias sempre oferecidas no formulário e no filtro, além das já usadas
+CORE_CATEGORIES = ["Alimentação", "Viagem", "Receita", "Salário", "Aluguel", "Outros"]
+
+# Ocorrências de contas recorrentes listadas como pendentes: as vencidas e as dos próximos N dias
+RECURRING_HORIZON_DAYS = 30
+# Meses à frente com as ocorrências recorrentes previstas no gráfico de despesas mensais
+RECURRING_CHART_MONTHS = 3
+
+# Totais do livro-caixa exibidos nos indicadores
+LedgerSummary = namedtuple("LedgerSummary", [
+    "receita", "despesa_transacoes", "despesa_contas_pagas", "despesa", "reserva_viagem", "caixa",
+])
+
+# Despesas por mês (Series indexada por período) e sua média; `average` é None sem despesas
+MonthlyExpenses = namedtuple("MonthlyExpenses", ["by_month", "average"])
+
+# Resultado final de uma simulação de investimento
+SimulationSummary = namedtuple("SimulationSummary", ["invested", "accumulated", "interest", "growth_percent"])
+
+
+# --- Livro-caixa ---
+
+def ledger_summary(rollups):
+    """Receita, despesas, reserva de viagem e caixa atual a partir dos totais pré-calculados.
+
+    A despesa inclui as contas pagas; o caixa desconsidera o que foi movimentado para a
+    reserva de viagem (caixa = receita - despesa - reserva).
+    """
+    totals = rollups.totals_by_type()
+    receita = float(totals.get("Receita", 0.0))
+    despesa_transacoes = float(totals.get("Despesa", 0.0))
+    despesa_contas_pagas = float(rollups.paid_bills_total())
+    despesa = despesa_transacoes + despesa_contas_pagas
+    reserva_viagem = float(totals.get("Reserva para Viagem", 0.0))
+    return LedgerSummary(
+        receita, despesa_transacoes, despesa_contas_pagas, despesa, reserva_viagem,
+        receita - despesa - reserva_viagem,
+    )
+
+
+def monthly_expenses(rollups):
+    """Despesas por mês (transações do tipo Despesa + contas pagas) e a média mensal."""
+    by_month = rollups.monthly_expenses()
+    return MonthlyExpenses(by_month, float(by_month.mean()) if len(by_month) else None)
+
+
+def category_options(rollups, core_categories=CORE_CATEGORIES):
+    """Categorias já usadas nas transações (sem vazias) seguidas das predefinidas, sem repetição."""
+    used = [
+        str(cat) for cat in rollups.categories()
+        if pd.notna(cat) and str(cat).strip() != "" and str(cat).strip().lower() != 'nan'
+    ]
+    return [cat for cat in used if cat not in core_categories] + list(core_categories)
+
+
+def new_transaction(date, tipo, categoria, valor, descricao=""):
+    """Uma transação nova (ID provisório) no esquema, pronta para SharedLedger.append_transactions()."""
+    return pd.DataFrame({
+        ID_COLUMN: [PENDING_ID],
+        "Data": [date],
+        "Tipo": [tipo],
+        "Categoria": [categoria],
+        "Valor": [float(valor)],
+        "Descrição": [descricao],
+    }).astype(TRANSACTIONS_SCHEMA.dtypes)
+
+
+def new_bill(descricao, valor, due_date, paid=False):
+    """Uma conta a pagar nova (ID provisório) no esquema, pronta para SharedLedger.append_bills()."""
+    return pd.DataFrame({
+        ID_COLUMN: [PENDING_ID],
+        "Descrição": [descricao],
+        "Valor": [float(valor)],
+        "Data de Vencimento": [due_date],
+        "Pago": [bool(paid)],
+    }).astype(BILLS_SCHEMA.dtypes)
+
+
+def new_recurring_bill(descricao, valor, frequencia, intervalo, inicio, fim=None):
+    """Uma regra de conta recorrente nova (ID provisório), pronta para SharedLedger.append_recurring()."""
+    return RECURRING_SCHEMA.from_records([{
+        "Descrição": descricao,
+        "Valor": float(valor),
+        "Frequência": frequencia,
+        "Intervalo": int(intervalo),
+        "Início": pd.Timestamp(inicio).strftime("%Y-%m-%d"),
+        "Fim": pd.Timestamp(fim).strftime("%Y-%m-%d") if fim is not None else None,
+        "Pago Até": None,
+    }])
+
+
+# --- Contas a pagar ---
+
+def pending_bill_positions(bills_df):
+    """Posições das contas não pagas, por data de vencimento."""
+    return sorted_positions(bills_df, ~bills_df["Pago"].to_numpy(dtype=bool), "Data de Vencimento")
+
+
+def upcoming_occurrences(recurring_df, today=None, horizon_days=RECURRING_HORIZON_DAYS):
+    """Ocorrências recorrentes não pagas vencidas ou com vencimento nos próximos `horizon_days` dias."""
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+    return pending_occurrences(recurring_df, today + pd.Timedelta(days=horizon_days))
+
+
+def pending_bills_total(bills_df, positions=None, occurrences=None):
+    """Soma das contas não pagas (de `positions`, se já calculadas) e das `occurrences`
+    recorrentes pendentes, somada em centavos.
+    """
+    if positions is None:
+        positions = np.flatnonzero(~bills_df["Pago"].to_numpy(dtype=bool))
+    cents = int(to_cents(bills_df["Valor"].to_numpy(dtype=float)[positions]).sum())
+    if occurrences is not None:
+        cents += int(to_cents(occurrences["Valor"]).sum())
+    return cents / 100
+
+
+def pending_schedule(bills_df, positions, occurrences):
+    """Contas avulsas pendentes (`positions`) e ocorrências recorrentes intercaladas por vencimento.
+
+    Retorna (origem, posição): origem 0 indica a posição em `bills_df` e 1, em `occurrences`.
+    Só as chaves são ordenadas; a página exibida é montada por pending_page().
+    """
+    due = np.concatenate([
+        bills_df["Data de Vencimento"].to_numpy()[positions],
+        occurrences["Data de Vencimento"].to_numpy(),
+    ])
+    source = np.repeat(np.array([0, 1], dtype=np.int8), [len(positions), len(occurrences)])
+    index = np.concatenate([np.asarray(positions, dtype=np.int64), np.arange(len(occurrences), dtype=np.int64)])
+    order = np.argsort(due, kind="stable")
+    return source[order], index[order]
+
+
+def pending_page(bills_df, occurrences, source, index):
+    """Linhas de uma página de pending_schedule(): descrição, valor, vencimento e se é recorrente."""
+    columns = ["Descrição", "Valor", "Data de Vencimento"]
+    from_bills = bills_df.iloc[index[source == 0]][columns]
+    from_rules = occurrences.iloc[index[source == 1]][columns]
+    page = pd.concat([
+        from_bills.assign(Recorrente=False).set_axis(np.flatnonzero(source == 0)),
+        from_rules.assign(Recorrente=True).set_axis(np.flatnonzero(source == 1)),
+    ]).sort_index()
+    return page.reset_index(drop=True)
+
+
+def next_occurrences(occurrences):
+    """A primeira ocorrência pendente de cada regra (as que podem ser pagas agora, em ordem)."""
+    return occurrences.drop_duplicates("Regra").reset_index(drop=True)
+
+
+def forecast_recurring_by_month(recurring_df, today=None, months=RECURRING_CHART_MONTHS):
+    """Ocorrências recorrentes não pagas somadas por mês, até o fim de `months` meses à frente."""
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+    until = (today + pd.offsets.MonthEnd(0)) + pd.offsets.MonthEnd(months)
+    occurrences = pending_occurrences(recurring_df, until)
+    if occurrences.empty:
+        return pd.Series(dtype=float, index=pd.PeriodIndex([], freq="M"))
+    months_index = occurrences["Data de Vencimento"].dt.to_period("M")
+    cents = pd.Series(to_cents(occurrences["Valor"]), index=months_index).groupby(level=0).sum()
+    return pd.Series(from_cents(cents.to_numpy()), index=cents.index, dtype=float)
+
+
+# --- Simulações ---
+
+def simulation_summary(simulation_df):
+    """Capital investido, acumulado, juros e crescimento (%) no último mês de uma simulação."""
+    if simulation_df.empty:
+        return SimulationSummary(0.0, 0.0, 0.0, None)
+    invested = float(simulation_df["Capital Investido"].iloc[-1])
+    accumulated = float(simulation_df["Capital Acumulado"].iloc[-1])
+    growth = (accumulated / invested - 1) * 100 if invested else None
+    return SimulationSummary(invested, accumulated, accumulated - invested, growth)
+
+
+def parse_monthly_returns(text):
+    """Lê retornos mensais em % (um por linha ou separados por ';'); aceita vírgula decimal.
+
+    Retorna uma tupla de frações (0,85 -> 0.0085); levanta ValueError em valores inválidos.
+    """
+    values = []
+    for token in text.replace(";", "\n").split():
+        values.append(float(token.replace(",", ".")) / 100)
+    return tuple(values)
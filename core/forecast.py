@@ -0,0 +1,147 @@
+# core/forecast.py
+#
+# Projeção do saldo de caixa dia a dia, de hoje até N meses à frente. Sobre uma grade
+# diária somam-se três fluxos, todos em centavos e montados com np.bincount/np.cumsum
+# (custo proporcional a dias + contas, sem laço por dia):
+# - contas: as avulsas não pagas e as ocorrências recorrentes pendentes, no vencimento
+#   (as já vencidas entram hoje);
+# - receitas recorrentes aprendidas do histórico: para cada dia do mês, a média mensal
+#   das receitas recebidas naquele dia nos últimos INCOME_HISTORY_MONTHS meses completos,
+#   considerando só os dias com receita em pelo menos RECURRING_INCOME_MIN_SHARE dos meses
+#   (o salário de todo dia 5 entra; um freela avulso, não);
+# - despesas do dia a dia: a média mensal de despesas (core.finance.monthly_expenses)
+#   distribuída igualmente pelos dias de cada mês.
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from core.aggregations import from_cents, to_cents
+from core.finance import ledger_summary, monthly_expenses
+from core.instrumentation import traced
+from core.recurrence import pending_occurrences
+
+# Horizonte padrão da projeção, em meses
+FORECAST_MONTHS = 6
+# Meses completos de histórico usados para aprender as receitas recorrentes
+INCOME_HISTORY_MONTHS = 12
+# Fração mínima dos meses com receita num dia do mês para que ele seja considerado recorrente
+RECURRING_INCOME_MIN_SHARE = 0.5
+
+# Resultado da projeção: `daily` é um DataFrame com Data, Receitas, Despesas, Contas e Saldo
+# (uma linha por dia), o menor saldo do período, o dia em que ocorre e o saldo final
+CashFlowForecast = namedtuple("CashFlowForecast", ["daily", "lowest_balance", "lowest_date", "final_balance"])
+
+
+def _days_in_month(days):
+    """Número de dias do mês de cada data (datetime64[D])."""
+    months = days.astype("datetime64[M]")
+    return ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64)
+
+
+def _day_of_month(days):
+    """Dia do mês (0 a 30) de cada data (datetime64[D])."""
+    return (days - days.astype("datetime64[M]").astype("datetime64[D]")).astype(np.int64)
+
+
+def income_profile(receita_daily, today, history_months=INCOME_HISTORY_MONTHS,
+                   min_share=RECURRING_INCOME_MIN_SHARE):
+    """Receita recorrente esperada em cada dia do mês (array de 31 posições, em centavos por mês).
+
+    `receita_daily` é uma Series de receitas por dia (índice de datas). Só os meses
+    completos antes de `today`, a partir do primeiro mês com receita, entram na média.
+    """
+    profile = np.zeros(31)
+    current_month = np.datetime64(pd.Timestamp(today).date(), "M")
+    receita_daily = receita_daily[receita_daily > 0]
+    days = receita_daily.index.to_numpy(dtype="datetime64[D]")
+    months = days.astype("datetime64[M]")
+    in_window = (months >= current_month - history_months) & (months < current_month)
+    if not in_window.any():
+        return profile
+
+    days, months = days[in_window], months[in_window]
+    cents = to_cents(receita_daily.to_numpy(dtype=float)[in_window])
+    first_month = months.min()
+    n_months = int((current_month - first_month).astype(np.int64))
+    month_idx = (months - first_month).astype(np.int64)
+    # Receitas no último dia do mês contam como dia 31 (e voltam ao último dia na projeção)
+    day_idx = np.where(_day_of_month(days) == _days_in_month(days) - 1, 30, _day_of_month(days))
+
+    presence = np.zeros((n_months, 31), dtype=bool)
+    presence[month_idx, day_idx] = True
+    totals = np.bincount(day_idx, weights=cents, minlength=31)
+    recurring = presence.mean(axis=0) >= min_share
+    profile[recurring] = totals[recurring] / n_months
+    return profile
+
+
+def _due_offsets(due_dates, today_day, n_days):
+    """Posição de cada vencimento na grade (vencidas vão para hoje); -1 fora do horizonte."""
+    offsets = (np.asarray(due_dates, dtype="datetime64[D]") - today_day).astype(np.int64)
+    offsets = np.maximum(offsets, 0)
+    return np.where(offsets < n_days, offsets, -1)
+
+
+@traced("forecast.cash_flow")
+def project_cash_flow(caixa, monthly_average, receita_daily, bills_df, recurring_df, today=None,
+                      months=FORECAST_MONTHS):
+    """Saldo projetado dia a dia de `today` até `months` meses à frente (CashFlowForecast).
+
+    O dia de hoje parte de `caixa` e recebe só as contas vencidas ou que vencem hoje;
+    receitas e despesas projetadas começam amanhã (as de hoje já estão no caixa).
+    """
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today).normalize()
+    end = today + pd.DateOffset(months=months)
+    today_day = np.datetime64(today.date(), "D")
+    days = np.arange(today_day, np.datetime64(end.date(), "D") + 1)
+    n_days = len(days)
+    future = np.arange(n_days) > 0
+
+    # Receitas: o perfil por dia do mês; no último dia de meses curtos, somam-se os dias que faltam
+    profile = income_profile(receita_daily, today)
+    tail = np.concatenate([np.cumsum(profile[::-1])[::-1], [0.0]])  # tail[k] = soma de profile[k:]
+    day_idx = _day_of_month(days)
+    month_length = _days_in_month(days)
+    income = np.where(day_idx == month_length - 1, tail[day_idx], profile[day_idx])
+    income = np.rint(np.where(future, income, 0)).astype(np.int64)
+
+    # Despesas do dia a dia: a média mensal repartida pelos dias do mês
+    average_cents = to_cents(monthly_average or 0.0)
+    expenses = np.rint(np.where(future, average_cents / month_length, 0)).astype(np.int64)
+
+    # Contas no vencimento: avulsas não pagas + ocorrências recorrentes pendentes
+    unpaid = ~bills_df["Pago"].to_numpy(dtype=bool)
+    occurrences = pending_occurrences(recurring_df, days[-1])
+    due = np.concatenate([
+        bills_df["Data de Vencimento"].to_numpy(dtype="datetime64[D]")[unpaid],
+        occurrences["Data de Vencimento"].to_numpy(dtype="datetime64[D]"),
+    ])
+    values = np.concatenate([to_cents(bills_df["Valor"].to_numpy(dtype=float)[unpaid]), to_cents(occurrences["Valor"])])
+    offsets = _due_offsets(due, today_day, n_days)
+    valid = (offsets >= 0) & ~np.isnat(due)
+    bills = np.bincount(offsets[valid], weights=values[valid], minlength=n_days).astype(np.int64)
+
+    balance = to_cents(caixa) + np.cumsum(income - expenses - bills)
+    lowest = int(np.argmin(balance))
+    daily = pd.DataFrame({
+        "Data": days.astype("datetime64[ns]"),
+        "Receitas": from_cents(income),
+        "Despesas": from_cents(expenses),
+        "Contas": from_cents(bills),
+        "Saldo": from_cents(balance),
+    })
+    return CashFlowForecast(daily, float(from_cents(balance[lowest])), pd.Timestamp(days[lowest]),
+                            float(from_cents(balance[-1])))
+
+
+def cash_flow_forecast(rollups, bills_df, recurring_df, today=None, months=FORECAST_MONTHS):
+    """project_cash_flow() com o caixa, a média de despesas e as receitas diárias dos totais pré-calculados."""
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today).normalize()
+    history_start = today.to_period("M").to_timestamp() - pd.DateOffset(months=INCOME_HISTORY_MONTHS)
+    receita_daily = rollups.daily_totals(history_start, today - pd.Timedelta(days=1))["Receita"]
+    return project_cash_flow(
+        ledger_summary(rollups).caixa, monthly_expenses(rollups).average, receita_daily,
+        bills_df, recurring_df, today, months,
+    )
@@ -0,0 +1,277 @@
+# core/importer.py
+#
+# Importação em lote de extratos bancários (CSV ou OFX) para o livro-caixa. O arquivo é
+# lido em blocos de CHUNK_ROWS linhas; cada bloco é convertido para o TRANSACTIONS_SCHEMA
+# e comparado com as transações já registradas por uma chave de hash de (dia, valor em
+# centavos, descrição normalizada). Só as linhas novas ficam na memória, e entram no
+# livro-caixa numa única escrita.
+
+import csv
+import io
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from core.aggregations import to_cents
+from core.categorizer import plain_text
+from core.instrumentation import SPANS
+from core.storage import ID_COLUMN, PENDING_ID, TRANSACTIONS_SCHEMA
+
+CHUNK_ROWS = 50_000
+# Importações a partir deste tamanho disparam a compactação do journal logo em seguida
+COMPACT_ROWS = 10_000
+DEFAULT_CATEGORY = "Não Especificado"
+
+# Cabeçalhos aceitos para cada coluna do esquema (comparados sem acentos e sem caixa)
+COLUMN_ALIASES = {
+    "Data": ["data", "date", "data lancamento", "data do lancamento", "data movimento", "dt"],
+    "Valor": ["valor", "amount", "value", "valor (r$)", "valor r$", "quantia"],
+    "Descrição": ["descricao", "description", "historico", "memo", "lancamento", "detalhes"],
+    "Tipo": ["tipo", "type", "natureza"],
+    "Categoria": ["categoria", "category"],
+}
+
+# Valores de Tipo reconhecidos nos extratos (sem acentos e sem caixa)
+TYPE_ALIASES = {
+    "receita": "Receita", "credito": "Receita", "credit": "Receita", "c": "Receita", "entrada": "Receita",
+    "despesa": "Despesa", "debito": "Despesa", "debit": "Despesa", "d": "Despesa", "saida": "Despesa",
+    "reserva para viagem": "Reserva para Viagem",
+}
+
+# Resultado de uma importação: linhas lidas, incluídas, descartadas por já existirem e inválidas
+ImportResult = namedtuple("ImportResult", ["read", "imported", "duplicates", "invalid"])
+
+_OFX_TAG = re.compile(r"<(/?[A-Za-z0-9.]+)>([^<]*)")
+
+
+def transaction_keys(df):
+    """Chave de hash (uint64) de cada transação: dia, valor em centavos e descrição normalizada.
+
+    As descrições se repetem muito: cada texto distinto é normalizado e hasheado uma vez.
+    """
+    codes, uniques = pd.factorize(df["Descrição"].to_numpy(dtype=object))
+    text_hashes = pd.util.hash_array(plain_text(uniques).to_numpy(dtype=object))
+    return pd.util.hash_pandas_object(pd.DataFrame({
+        "day": df["Data"].to_numpy(dtype="datetime64[D]").astype(np.int64),
+        "cents": to_cents(df["Valor"]),
+        "text": text_hashes[codes] if len(uniques) else np.zeros(len(df), dtype=np.uint64),
+    }), index=False).to_numpy()
+
+
+# --- Leitura dos extratos ---
+
+# Formatos de data aceitos e quantos caracteres do início do texto cada um usa
+DATE_FORMATS = [("%Y-%m-%d", 10), ("%d/%m/%Y", 10), ("%Y%m%d", 8)]
+
+
+def _parse_dates(values):
+    """Datas em AAAA-MM-DD, DD/MM/AAAA ou AAAAMMDD (OFX, com hora opcional); inválidas viram NaT."""
+    text = pd.Series(values, dtype=object).fillna("").astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    for date_format, length in DATE_FORMATS:
+        retry = parsed.isna()
+        if not retry.any():
+            break
+        parsed[retry] = pd.to_datetime(text[retry].str[:length], format=date_format, errors="coerce")
+    return parsed
+
+
+def _parse_amounts(values):
+    """Valores em texto, com vírgula (1.234,56) ou ponto decimal (1,234.56); inválidos viram NaN.
+
+    O separador decimal é o último dos dois que aparece no valor, desde que apareça uma
+    vez só; o outro (ou um que se repete, como em 1.234.567) é separador de milhar.
+    """
+    text = pd.Series(values, dtype=object).astype(str).str.strip().str.replace(r"[R$\s]", "", regex=True)
+    last_comma, last_dot = text.str.rfind(","), text.str.rfind(".")
+    decimal_comma = (last_comma > last_dot) & (text.str.count(",") == 1)
+    thousands_dots = (last_comma < 0) & (text.str.count(r"\.") > 1)
+    without_dots = text.str.replace(".", "", regex=False)
+    text = text.str.replace(",", "", regex=False)
+    text = text.where(~thousands_dots, without_dots)
+    text = text.where(~decimal_comma, without_dots.str.replace(",", ".", regex=False))
+    return pd.to_numeric(text, errors="coerce")
+
+
+def _to_schema(dates, amounts, descriptions, tipos=None, categorias=None):
+    """Monta um bloco no TRANSACTIONS_SCHEMA (IDs provisórios) e descarta as linhas inválidas.
+
+    Sem Tipo, o sinal do valor decide (negativo é Despesa); o Valor fica sempre positivo.
+    Retorna (bloco, número de linhas inválidas).
+    """
+    valor = pd.Series(_parse_amounts(np.asarray(amounts, dtype=object)).to_numpy(dtype=float)).round(2)
+    tipo = pd.Series(np.where(valor < 0, "Despesa", "Receita"), dtype=object)
+    if tipos is not None:
+        given = plain_text(np.asarray(tipos, dtype=object)).map(TYPE_ALIASES)
+        tipo = given.where(given.notna(), tipo)
+    categoria = pd.Series(DEFAULT_CATEGORY, index=valor.index, dtype=object)
+    if categorias is not None:
+        given = pd.Series(np.asarray(categorias, dtype=object)).fillna("").astype(str).str.strip()
+        categoria = categoria.where(given == "", given)
+
+    chunk = pd.DataFrame({
+        ID_COLUMN: PENDING_ID,
+        "Data": _parse_dates(np.asarray(dates, dtype=object)).to_numpy(),
+        "Tipo": tipo.to_numpy(),
+        "Categoria": categoria.to_numpy(),
+        "Valor": valor.abs().to_numpy(),
+        "Descrição": pd.Series(np.asarray(descriptions, dtype=object)).fillna("").astype(str).str.strip().to_numpy(),
+    })
+    valid = chunk.dropna(subset=TRANSACTIONS_SCHEMA.required)
+    return valid.astype(TRANSACTIONS_SCHEMA.dtypes), len(chunk) - len(valid)
+
+
+def _map_columns(header):
+    """Coluna do arquivo correspondente a cada coluna do esquema (por COLUMN_ALIASES)."""
+    plain = dict(zip(plain_text(header), header))
+    mapping = {}
+    for col, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in plain:
+                mapping[col] = plain[alias]
+                break
+    missing = [col for col in ["Data", "Valor"] if col not in mapping]
+    if missing:
+        raise ValueError(f"Colunas não encontradas no CSV: {', '.join(missing)} (cabeçalho: {', '.join(header)})")
+    return mapping
+
+
+def read_csv_statement(stream, chunk_rows=CHUNK_ROWS):
+    """Lê um extrato CSV em blocos; gera (bloco no esquema, linhas inválidas).
+
+    O separador (vírgula, ponto e vírgula ou tab) e a codificação são detectados na primeira
+    parte do arquivo.
+    """
+    sample = stream.read(64 * 1024)
+    stream.seek(0)
+    encoding = "utf-8"
+    if isinstance(sample, bytes):
+        try:
+            sample = sample.decode("utf-8")
+        except UnicodeDecodeError as e:
+            if e.start < len(sample) - 3:  # Exportações de bancos em Latin-1
+                encoding = "latin-1"
+            sample = sample.decode(encoding, errors="ignore")
+    try:
+        sep = csv.Sniffer().sniff(sample, delimiters=",;\t").delimiter
+    except csv.Error:
+        sep = ","
+    reader = pd.read_csv(stream, sep=sep, chunksize=chunk_rows, dtype=str, keep_default_na=False,
+                         skipinitialspace=True, encoding=encoding, encoding_errors="replace")
+    mapping = None
+    for raw in reader:
+        if mapping is None:
+            mapping = _map_columns(list(raw.columns))
+        yield _to_schema(
+            raw[mapping["Data"]], raw[mapping["Valor"]],
+            raw[mapping["Descrição"]] if "Descrição" in mapping else pd.Series("", index=raw.index),
+            raw[mapping["Tipo"]] if "Tipo" in mapping else None,
+            raw[mapping["Categoria"]] if "Categoria" in mapping else None,
+        )
+
+
+def _ofx_tags(stream, read_size=1 << 20):
+    """(TAG, valor) de um OFX (SGML ou XML), lido em pedaços de `read_size` caracteres."""
+    buffer = ""
+    for part in iter(lambda: stream.read(read_size), ""):
+        buffer += part
+        cut = buffer.rfind("<")
+        if cut <= 0:
+            continue
+        for match in _OFX_TAG.finditer(buffer, 0, cut):
+            yield match.group(1).upper(), match.group(2).strip()
+        buffer = buffer[cut:]
+    for match in _OFX_TAG.finditer(buffer):
+        yield match.group(1).upper(), match.group(2).strip()
+
+
+def read_ofx_statement(stream, chunk_rows=CHUNK_ROWS):
+    """Lê os lançamentos (<STMTTRN>) de um OFX em blocos; gera (bloco no esquema, linhas inválidas)."""
+    if not isinstance(stream, io.TextIOBase):
+        # OFX de bancos brasileiros costuma vir em Windows-1252 (cabeçalho CHARSET:1252)
+        header = stream.read(4096).upper()
+        stream.seek(0)
+        encoding = "cp1252" if b"CHARSET:1252" in header or b"WINDOWS-1252" in header else "utf-8"
+        stream = io.TextIOWrapper(stream, encoding=encoding, errors="replace")
+
+    dates, amounts, descriptions = [], [], []
+    current = None
+    for tag, value in _ofx_tags(stream):
+        if tag == "STMTTRN":
+            current = {}
+        elif tag == "/STMTTRN" and current is not None:
+            dates.append(current.get("DTPOSTED", ""))
+            amounts.append(current.get("TRNAMT", ""))
+            descriptions.append(current.get("MEMO") or current.get("NAME", ""))
+            current = None
+            if len(dates) >= chunk_rows:
+                yield _to_schema(dates, amounts, descriptions)
+                dates, amounts, descriptions = [], [], []
+        elif current is not None and not tag.startswith("/"):
+            current[tag] = value
+    if dates:
+        yield _to_schema(dates, amounts, descriptions)
+
+
+def read_statement(stream, name, chunk_rows=CHUNK_ROWS):
+    """Blocos de um extrato pelo tipo do arquivo (.ofx ou CSV)."""
+    if name.lower().endswith(".ofx"):
+        return read_ofx_statement(stream, chunk_rows)
+    return read_csv_statement(stream, chunk_rows)
+
+
+# --- Importação ---
+
+def _existing_keys(ledger):
+    """Chaves (ordenadas, sem repetição) das transações já registradas."""
+    transactions = ledger.snapshot().transactions
+    if transactions is None:  # Modo SQLite: só as colunas da chave vêm do banco
+        store = ledger.transactions_store
+        transactions = store.query(f'SELECT "Data", "Valor", "Descrição" FROM "{store.table}"')
+        transactions["Data"] = pd.to_datetime(transactions["Data"], format="%Y-%m-%d", errors="coerce")
+    return np.unique(transaction_keys(transactions))
+
+
+def categorize_rows(categorizer, rows):
+    """`rows` com a Categoria DEFAULT_CATEGORY trocada pela sugestão do `categorizer`, quando há uma."""
+    pending = np.flatnonzero((rows["Categoria"] == DEFAULT_CATEGORY).to_numpy())
+    if pending.size == 0:
+        return rows
+    suggested = categorizer.classify(rows["Descrição"].iloc[pending], rows["Tipo"].iloc[pending]).to_numpy()
+    found = pd.notna(suggested)
+    if not found.any():
+        return rows
+    categoria = rows["Categoria"].astype(object).to_numpy(copy=True)
+    categoria[pending[found]] = suggested[found]
+    return rows.assign(Categoria=pd.Series(categoria, index=rows.index).astype(TRANSACTIONS_SCHEMA.dtypes["Categoria"]))
+
+
+def import_statement(ledger, stream, name, chunk_rows=CHUNK_ROWS):
+    """Importa um extrato para o livro-caixa de `ledger` (SharedLedger), sem duplicar lançamentos.
+
+    Linhas cuja chave (dia, valor, descrição normalizada) já existe no livro-caixa são
+    descartadas; repetições dentro do próprio arquivo são mantidas (dois cafés iguais no
+    mesmo dia são lançamentos distintos). Linhas sem categoria no extrato recebem a
+    sugestão de ledger.categorizer(), quando houver. Todas as linhas novas entram numa
+    única escrita.
+    """
+    with SPANS.span("import.statement") as span:
+        existing = _existing_keys(ledger)
+        new_chunks, read, invalid = [], 0, 0
+        for chunk, chunk_invalid in read_statement(stream, name, chunk_rows):
+            read += len(chunk) + chunk_invalid
+            invalid += chunk_invalid
+            is_new = ~np.isin(transaction_keys(chunk), existing)
+            if is_new.any():
+                new_chunks.append(chunk[is_new])
+        new_rows = TRANSACTIONS_SCHEMA.concat(new_chunks) if new_chunks else TRANSACTIONS_SCHEMA.empty()
+        span.rows = read
+
+        if len(new_rows):
+            new_rows = categorize_rows(ledger.categorizer(), new_rows)
+            ledger.append_transactions(new_rows)
+            if len(new_rows) >= COMPACT_ROWS and hasattr(ledger.transactions_store, "compact_in_background"):
+                ledger.transactions_store.compact_in_background()
+    return ImportResult(read, len(new_rows), read - invalid - len(new_rows), invalid)
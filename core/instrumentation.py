@@ -0,0 +1,144 @@
+# core/instrumentation.py
+
+import contextlib
+import functools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+# Amostras guardadas por span para os percentis (as mais recentes)
+MAX_SAMPLES = 1024
+
+# Log estruturado (uma linha JSON por span), ativado pelo nível DEBUG deste logger
+logger = logging.getLogger("iasmin.spans")
+
+
+class Span:
+    """Uma medição em andamento; `rows` pode ser preenchido dentro do bloco."""
+
+    __slots__ = ("name", "rows")
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+
+class Instrumentation:
+    """Tempos (spans) dos trechos quentes: leituras, agregações, gráficos, edições e gravações.
+
+    Cada span guarda as últimas MAX_SAMPLES durações, para percentis sob uso real, além do
+    total acumulado e do número de linhas da última execução. Como `CACHE_STATS`, uma
+    instância única (`SPANS`) é compartilhada por todas as sessões do processo; o custo por
+    span é um perf_counter() e um append sob lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+        self._count = defaultdict(int)
+        self._total = defaultdict(float)
+        self._rows = {}
+
+    @contextlib.contextmanager
+    def span(self, name, rows=None):
+        """Mede o bloco como uma execução de `name`; o Span retornado aceita `rows`."""
+        span = Span(name, rows)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self.record(name, time.perf_counter() - start, span.rows)
+
+    def record(self, name, seconds, rows=None):
+        with self._lock:
+            self._samples[name].append(seconds)
+            self._count[name] += 1
+            self._total[name] += seconds
+            if rows is not None:
+                self._rows[name] = int(rows)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({"span": name, "ms": round(seconds * 1e3, 3), "rows": rows}))
+
+    def rows(self):
+        """Uma linha por span: execuções, linhas da última execução e percentis em ms."""
+        with self._lock:
+            snapshot = {name: np.array(samples) for name, samples in self._samples.items()}
+            counts, totals, last_rows = dict(self._count), dict(self._total), dict(self._rows)
+        rows = []
+        for name in sorted(snapshot):
+            p50, p95, p99 = np.percentile(snapshot[name], [50, 95, 99]) * 1e3
+            rows.append({
+                "Span": name,
+                "Execuções": counts[name],
+                "Linhas": last_rows.get(name),
+                "p50 (ms)": p50,
+                "p95 (ms)": p95,
+                "p99 (ms)": p99,
+                "Máx. (ms)": snapshot[name].max() * 1e3,
+                "Total (s)": totals[name],
+            })
+        return rows
+
+    def prometheus_text(self):
+        """Métricas no formato texto do Prometheus (summary com quantis + gauge de linhas)."""
+        lines = [
+            "# HELP iasmin_span_seconds Duração dos trechos instrumentados.",
+            "# TYPE iasmin_span_seconds summary",
+        ]
+        rows_lines = [
+            "# HELP iasmin_span_rows Linhas processadas na última execução do trecho.",
+            "# TYPE iasmin_span_rows gauge",
+        ]
+        with self._lock:
+            for name in sorted(self._samples):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                quantiles = np.percentile(np.array(self._samples[name]), [50, 95, 99])
+                for q, value in zip(["0.5", "0.95", "0.99"], quantiles):
+                    lines.append(f'iasmin_span_seconds{{span="{label}",quantile="{q}"}} {value:.6f}')
+                lines.append(f'iasmin_span_seconds_sum{{span="{label}"}} {self._total[name]:.6f}')
+                lines.append(f'iasmin_span_seconds_count{{span="{label}"}} {self._count[name]}')
+                if name in self._rows:
+                    rows_lines.append(f'iasmin_span_rows{{span="{label}"}} {self._rows[name]}')
+        return "\n".join(lines + rows_lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Grava prometheus_text() em `path` (troca atômica, para o coletor nunca ler pela metade)."""
+        # Importação adiada: core.storage depende deste módulo
+        from core.storage import atomic_write
+
+        text = self.prometheus_text()
+
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+
+        atomic_write(path, write)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._count.clear()
+            self._total.clear()
+            self._rows.clear()
+
+
+SPANS = Instrumentation()
+
+
+def traced(name):
+    """Decorador: mede cada chamada como o span `name`; DataFrames/arrays retornados informam as linhas."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with SPANS.span(name) as span:
+                result = func(*args, **kwargs)
+                shape = getattr(result, "shape", None)
+                if shape:
+                    span.rows = shape[0]
+                return result
+        return wrapper
+    return decorator
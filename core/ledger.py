@@ -0,0 +1,360 @@
+# core/ledger.py
+
+import threading
+from collections import namedtuple
+
+import pandas as pd
+
+from core.categorizer import UNKNOWN_CATEGORIES, Categorizer
+from core.dateindex import DateIndex
+from core.instrumentation import SPANS
+from core.rollups import Rollups
+from core.sqlite_store import SqlLedger, SqliteStore
+from core.storage import BILLS_SCHEMA, ID_COLUMN, RECURRING_SCHEMA, TRANSACTIONS_SCHEMA, EditBatch, open_store
+
+# Estado imutável visto por uma execução do script: os DataFrames, os totais
+# pré-calculados e as versões a que correspondem. `transactions` é None quando as
+# transações ficam só no banco (modo SQLite). `recurring` traz as regras de contas
+# recorrentes (core/recurrence.py), que não entram nos totais. `date_index` é o índice
+# por Data das transações (core/dateindex.py), None no modo SQLite.
+Snapshot = namedtuple(
+    "Snapshot",
+    ["transactions", "bills", "rollups", "transactions_version", "bills_version", "recurring", "recurring_version",
+     "date_index"],
+)
+
+
+class SharedLedger:
+    """Dados de um usuário compartilhados por todas as sessões do processo.
+
+    As sessões leem um Snapshot e não guardam cópias próprias dos DataFrames: a memória
+    não cresce com o número de sessões. Cada escrita grava no store, monta os novos
+    DataFrames/totais a partir do snapshot atual e publica um novo snapshot, tudo sob um
+    lock; quem já tinha o snapshot anterior continua vendo uma versão consistente. Os
+    DataFrames de um snapshot nunca são alterados no lugar.
+
+    Com `sql_ledger` (modo SQLite), as transações não são carregadas e os totais vêm
+    das consultas agregadas do banco.
+    """
+
+    def __init__(self, transactions_store, bills_store, sql_ledger=None, on_load_error=None, recurring_store=None):
+        self.transactions_store = transactions_store
+        self.bills_store = bills_store
+        self.recurring_store = recurring_store
+        self.sql_ledger = sql_ledger
+        self.on_load_error = on_load_error
+        self._lock = threading.RLock()
+        self._snapshot = None
+        # (store, erro) das leituras que falharam na última carga; vazio se tudo foi lido
+        self.load_errors = []
+        # (versão das transações, Categorizer): montado na primeira sugestão de categoria
+        self._categorizer = None
+
+    def _read(self, store, errors):
+        try:
+            return store.read()
+        except FileNotFoundError:
+            return store.schema.empty()
+        except Exception as e:
+            errors.append((store, e))
+            if self.on_load_error is not None:
+                self.on_load_error(store, e)
+            return store.schema.empty()
+
+    def _stores(self):
+        stores = [self.transactions_store, self.bills_store, self.recurring_store]
+        return [store for store in stores if store is not None]
+
+    def _publish(self, transactions, bills, rollups, recurring, date_index):
+        self._snapshot = Snapshot(
+            transactions, bills, rollups, self.transactions_store.version, self.bills_store.version,
+            recurring, self.recurring_store.version if self.recurring_store is not None else 0, date_index,
+        )
+        return self._snapshot
+
+    def _changed_elsewhere(self, store, version_before):
+        """Indica se, além da nossa escrita, outro processo alterou o store (a versão pulou mais de 1)."""
+        if store.version == version_before + 1:
+            return False
+        self._snapshot = None
+        return True
+
+    def snapshot(self):
+        """Snapshot atual; recarrega se outro processo alterou os arquivos desde a última leitura."""
+        with self._lock:
+            for store in self._stores():
+                store.refresh()
+            current = self._snapshot
+            if (current is not None
+                    and current.transactions_version == self.transactions_store.version
+                    and current.bills_version == self.bills_store.version
+                    and (self.recurring_store is None or current.recurring_version == self.recurring_store.version)):
+                return current
+            errors = []
+            with SPANS.span("ledger.load") as span:
+                transactions = None if self.sql_ledger is not None else self._read(self.transactions_store, errors)
+                bills = self._read(self.bills_store, errors)
+                recurring = RECURRING_SCHEMA.empty()
+                if self.recurring_store is not None:
+                    recurring = self._read(self.recurring_store, errors)
+                rollups = self.sql_ledger or Rollups.from_frames(transactions, bills)
+                date_index = DateIndex.from_frame(transactions) if transactions is not None else None
+                span.rows = (len(transactions) if transactions is not None else 0) + len(bills)
+            self.load_errors = errors
+            return self._publish(transactions, bills, rollups, recurring, date_index)
+
+    def warm(self):
+        """Carrega o snapshot em segundo plano; quem chamar snapshot() antes do fim espera pelo lock."""
+        thread = threading.Thread(target=self.snapshot, name="iasmin-ledger-warm", daemon=True)
+        thread.start()
+        return thread
+
+    def memory_report(self):
+        """Memória ocupada pelos DataFrames do snapshot atual, por conjunto de dados.
+
+        Conta o conteúdo real das colunas (memory_usage(deep=True)): textos Arrow e
+        categóricas pelo tamanho dos buffers. No modo SQLite as transações ficam no banco.
+        """
+        snapshot = self.snapshot()
+        rows = []
+        for name, df in [("transactions", snapshot.transactions), ("bills", snapshot.bills),
+                         ("recurring", snapshot.recurring)]:
+            if df is None:
+                rows.append({"Conjunto": name, "Linhas": None, "Memória (MB)": 0.0, "Bytes/linha": None})
+                continue
+            total = int(df.memory_usage(deep=True, index=False).sum())
+            rows.append({
+                "Conjunto": name,
+                "Linhas": len(df),
+                "Memória (MB)": round(total / 2**20, 3),
+                "Bytes/linha": round(total / len(df), 1) if len(df) else None,
+            })
+        return pd.DataFrame(rows)
+
+    # --- Transações ---
+
+    def replace_transactions(self, df):
+        """Reescreve as transações por completo (ex.: importação de CSV)."""
+        with self._lock:
+            current = self.snapshot()
+            self.transactions_store.rewrite(df)
+            if self._changed_elsewhere(self.transactions_store, current.transactions_version):
+                return self.snapshot()
+            rollups = current.rollups.copy()
+            if current.transactions is not None:
+                rollups.remove_transactions(current.transactions)
+            rollups.add_transactions(df)
+            if self.sql_ledger is not None:
+                return self._publish(None, current.bills, rollups, current.recurring, None)
+            return self._publish(df, current.bills, rollups, current.recurring, DateIndex.from_frame(df))
+
+    def _seen_version(self, field, version):
+        """Versão em que os IDs de um lote foram lidos: `version` ou a do último snapshot publicado."""
+        if version is not None or self._snapshot is None:
+            return version
+        return getattr(self._snapshot, field)
+
+    def edit_transactions(self, batch, version=None):
+        """Aplica um lote do editor: uma escrita no store e totais atualizados por delta.
+
+        `version` é a versão das transações em que os IDs do lote foram lidos (padrão: o
+        último snapshot publicado), para o store acompanhar IDs renumerados desde então.
+        """
+        with self._lock:
+            version = self._seen_version("transactions_version", version)
+            current = self.snapshot()
+            batch = self.transactions_store.edit(batch, version) # Grava primeiro: as linhas novas recebem seus IDs
+            if self._changed_elsewhere(self.transactions_store, current.transactions_version):
+                return self.snapshot()
+            if self.sql_ledger is not None:
+                return self._publish(None, current.bills, current.rollups, current.recurring, None)
+            new_df, removed, added = self.transactions_store.schema.apply_edit(current.transactions, batch)
+            rollups = current.rollups.copy()
+            rollups.remove_transactions(removed)
+            rollups.add_transactions(added)
+            self._update_categorizer(current.transactions_version, added, removed)
+            # Edições mudam datas e apagar linhas desloca as posições: o índice é remontado
+            # (ordenação estável de inteiros, em tempo linear)
+            return self._publish(new_df, current.bills, rollups, current.recurring, DateIndex.from_frame(new_df))
+
+    def append_transactions(self, rows_df):
+        """Acrescenta transações (uma entrada no journal, sem reescrever o arquivo)."""
+        with self._lock:
+            current = self.snapshot()
+            rows_df = self.transactions_store.append(rows_df)
+            if self._changed_elsewhere(self.transactions_store, current.transactions_version):
+                return self.snapshot()
+            self._update_categorizer(current.transactions_version, rows_df)
+            if self.sql_ledger is not None:
+                return self._publish(None, current.bills, current.rollups, current.recurring, None)
+            rollups = current.rollups.copy()
+            rollups.add_transactions(rows_df)
+            schema = self.transactions_store.schema
+            return self._publish(
+                schema.concat([current.transactions, rows_df]), current.bills, rollups, current.recurring,
+                current.date_index.append(rows_df, len(current.transactions)),
+            )
+
+    # --- Categorização automática ---
+
+    def categorizer(self):
+        """Categorizer (core/categorizer.py) aprendido das transações atuais.
+
+        É montado na primeira chamada e depois atualizado por delta a cada escrita. No modo
+        SQLite aprende das contagens agrupadas por descrição, tipo e categoria, sem
+        carregar as transações.
+        """
+        with self._lock:
+            current = self.snapshot()
+            if self._categorizer is not None and self._categorizer[0] == current.transactions_version:
+                return self._categorizer[1]
+            with SPANS.span("categorizer.build") as span:
+                if current.transactions is None:
+                    store = self.transactions_store
+                    counts = store.query(
+                        f'SELECT "Descrição", "Tipo", "Categoria", COUNT(*) AS n FROM "{store.table}" '
+                        'GROUP BY "Descrição", "Tipo", "Categoria"'
+                    )
+                    categorizer = Categorizer()
+                    categorizer.add_counts(counts.fillna(""))
+                    span.rows = int(counts["n"].sum())
+                else:
+                    categorizer = Categorizer.from_frame(current.transactions)
+                    span.rows = len(current.transactions)
+            self._categorizer = (current.transactions_version, categorizer)
+            return categorizer
+
+    def _update_categorizer(self, version_before, added, removed=None):
+        """Leva o Categorizer já montado para a nova versão (numa cópia, como os totais).
+
+        Sem as linhas removidas (edição no modo SQLite), ele é remontado na próxima sugestão.
+        """
+        if self._categorizer is None or self._categorizer[0] != version_before:
+            return
+        categorizer = self._categorizer[1].copy()
+        if removed is not None:
+            categorizer.remove_transactions(removed)
+        categorizer.add_transactions(added)
+        self._categorizer = (self.transactions_store.version, categorizer)
+
+    def categorize_uncategorized(self):
+        """Preenche, num único lote de edição, a Categoria das transações ainda sem categoria
+        (UNKNOWN_CATEGORIES) com a sugestão do Categorizer. Retorna quantas foram categorizadas.
+        """
+        with self._lock:
+            current = self.snapshot()
+            if current.transactions is None:
+                store = self.transactions_store
+                unknown = sorted(UNKNOWN_CATEGORIES)
+                pending = store.query(
+                    f'SELECT "{ID_COLUMN}", "Descrição", "Tipo" FROM "{store.table}" '
+                    f'WHERE "Categoria" IS NULL OR TRIM("Categoria") IN ({", ".join("?" * len(unknown))})',
+                    unknown,
+                )
+            else:
+                transactions = current.transactions
+                categoria = transactions["Categoria"].astype(object).fillna("").astype(str).str.strip()
+                pending = transactions[categoria.isin(UNKNOWN_CATEGORIES).to_numpy()]
+            if pending.empty:
+                return 0
+            suggested = self.categorizer().classify(pending["Descrição"], pending["Tipo"])
+            found = suggested.notna().to_numpy()
+            if found.any():
+                schema = self.transactions_store.schema
+                values = schema.parse_values("Categoria", suggested[found])
+                batch = EditBatch({"Categoria": (pending[ID_COLUMN].to_numpy()[found], values)}, [], None)
+                self.edit_transactions(batch, current.transactions_version)
+            return int(found.sum())
+
+    # --- Contas a pagar ---
+
+    def replace_bills(self, df):
+        """Reescreve as contas a pagar por completo (ex.: importação de CSV)."""
+        with self._lock:
+            current = self.snapshot()
+            self.bills_store.rewrite(df)
+            if self._changed_elsewhere(self.bills_store, current.bills_version):
+                return self.snapshot()
+            rollups = current.rollups.copy()
+            rollups.remove_bills(current.bills)
+            rollups.add_bills(df)
+            return self._publish(current.transactions, df, rollups, current.recurring, current.date_index)
+
+    def edit_bills(self, batch, version=None):
+        """Aplica um lote do editor de contas (ver edit_transactions())."""
+        with self._lock:
+            version = self._seen_version("bills_version", version)
+            current = self.snapshot()
+            batch = self.bills_store.edit(batch, version)
+            if self._changed_elsewhere(self.bills_store, current.bills_version):
+                return self.snapshot()
+            new_df, removed, added = self.bills_store.schema.apply_edit(current.bills, batch)
+            rollups = current.rollups.copy()
+            rollups.remove_bills(removed)
+            rollups.add_bills(added)
+            return self._publish(current.transactions, new_df, rollups, current.recurring, current.date_index)
+
+    def append_bills(self, rows_df):
+        """Acrescenta contas a pagar (uma entrada no journal, sem reescrever o arquivo)."""
+        with self._lock:
+            current = self.snapshot()
+            rows_df = self.bills_store.append(rows_df)
+            if self._changed_elsewhere(self.bills_store, current.bills_version):
+                return self.snapshot()
+            rollups = current.rollups.copy()
+            rollups.add_bills(rows_df)
+            schema = self.bills_store.schema
+            return self._publish(
+                current.transactions, schema.concat([current.bills, rows_df]), rollups, current.recurring,
+                current.date_index,
+            )
+
+    # --- Contas recorrentes ---
+
+    def edit_recurring(self, batch, version=None):
+        """Aplica um lote do editor de regras recorrentes (não afeta os totais; ver edit_transactions())."""
+        with self._lock:
+            version = self._seen_version("recurring_version", version)
+            current = self.snapshot()
+            batch = self.recurring_store.edit(batch, version)
+            if self._changed_elsewhere(self.recurring_store, current.recurring_version):
+                return self.snapshot()
+            new_df, _, _ = self.recurring_store.schema.apply_edit(current.recurring, batch)
+            return self._publish(current.transactions, current.bills, current.rollups, new_df, current.date_index)
+
+    def append_recurring(self, rows_df):
+        """Acrescenta regras de contas recorrentes."""
+        with self._lock:
+            current = self.snapshot()
+            rows_df = self.recurring_store.append(rows_df)
+            if self._changed_elsewhere(self.recurring_store, current.recurring_version):
+                return self.snapshot()
+            schema = self.recurring_store.schema
+            return self._publish(
+                current.transactions, current.bills, current.rollups, schema.concat([current.recurring, rows_df]),
+                current.date_index,
+            )
+
+    def pay_occurrence(self, rule_id, due_date, bill_df):
+        """Registra o pagamento de uma ocorrência recorrente: a conta paga (`bill_df`) entra nas
+        contas a pagar, e "Pago Até" da regra avança até o vencimento pago.
+        """
+        with self._lock:
+            self.append_bills(bill_df)
+            paid_through = RECURRING_SCHEMA.parse_values("Pago Até", [due_date])
+            return self.edit_recurring(EditBatch({"Pago Até": ([rule_id], paid_through)}, [], None))
+
+
+def open_ledger(data_dir, backend=None, on_load_error=None):
+    """Abre os conjuntos de dados de `data_dir` (transações, contas e regras recorrentes) num SharedLedger.
+
+    No formato SQLite (IASMIN_STORAGE=sqlite), os totais vêm das consultas agregadas do
+    banco (SqlLedger) e as transações não são carregadas na memória.
+    """
+    transactions_store = open_store(data_dir, "transactions", TRANSACTIONS_SCHEMA, backend)
+    bills_store = open_store(data_dir, "bills", BILLS_SCHEMA, backend)
+    recurring_store = open_store(data_dir, "recurring", RECURRING_SCHEMA, backend)
+    sql_ledger = None
+    if isinstance(transactions_store, SqliteStore):
+        sql_ledger = SqlLedger(transactions_store, bills_store)
+    return SharedLedger(transactions_store, bills_store, sql_ledger, on_load_error, recurring_store)
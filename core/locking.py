@@ -0,0 +1,34 @@
+# core/locking.py
+
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextlib.contextmanager
+def file_lock(path, shared=False):
+    """Trava entre processos, num arquivo auxiliar `path` (criado se preciso).
+
+    Exclusiva para escritas; com `shared=True`, várias leituras podem segurá-la ao mesmo
+    tempo (no Windows a trava é sempre exclusiva). Dentro de um processo, os stores
+    continuam usando seus próprios locks de thread. Não é reentrante: o mesmo processo
+    não deve pedir a trava de novo enquanto a segura.
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
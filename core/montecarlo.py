@@ -0,0 +1,117 @@
+# core/montecarlo.py
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Acima deste número de trajetórias os lotes são distribuídos entre processos
+PARALLEL_MIN_PATHS = 20_000
+# Trajetórias por lote no modo paralelo e limite de lotes: o número de lotes (e, com ele,
+# as sementes de cada lote) depende só de n_paths, nunca do número de CPUs da máquina
+PATHS_PER_BATCH = 5_000
+MAX_BATCHES = 16
+# Quantis guardados por lote no modo paralelo (resumo de 1001 pontos por mês)
+SKETCH_PERCENTILES = np.linspace(0, 100, 1001)
+
+_executor = None
+
+
+def _get_executor():
+    """Pool de processos criado sob demanda e reutilizado entre chamadas."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _monthly_growth(rng, n_months, n_paths, mean_annual_percent, volatility_annual_percent, historical_returns):
+    """Fatores de crescimento mensais (1 + retorno), matriz (meses, trajetórias).
+
+    Com `historical_returns` (retornos mensais em fração), os meses são sorteados com
+    reposição desse histórico (bootstrap). Caso contrário, o log-retorno mensal é normal,
+    com volatilidade anual/√12 e média ajustada para que o crescimento esperado em um ano
+    seja `mean_annual_percent`.
+    """
+    if historical_returns is not None and len(historical_returns) > 0:
+        history = 1 + np.asarray(historical_returns, dtype=float)
+        return rng.choice(history, size=(n_months, n_paths), replace=True)
+
+    sigma = volatility_annual_percent / 100 / np.sqrt(12)
+    mu = np.log1p(mean_annual_percent / 100) / 12 - sigma ** 2 / 2
+    return np.exp(rng.normal(mu, sigma, size=(n_months, n_paths)))
+
+
+def _simulate_batch(initial_investment, monthly_contribution, n_months, n_paths,
+                    mean_annual_percent, volatility_annual_percent, historical_returns, seed):
+    """Capital acumulado de `n_paths` trajetórias, matriz (meses, trajetórias).
+
+    Mesma convenção de core.simulation: o aporte entra a partir do 2º mês, antes da
+    capitalização daquele mês.
+    """
+    rng = np.random.default_rng(seed)
+    growth = _monthly_growth(rng, n_months, n_paths, mean_annual_percent,
+                             volatility_annual_percent, historical_returns)
+    accumulated = np.empty((n_months, n_paths))
+    wealth = np.full(n_paths, float(initial_investment))
+    for month in range(n_months):
+        if month > 0:
+            wealth += monthly_contribution
+        wealth *= growth[month]
+        accumulated[month] = wealth
+    return accumulated
+
+
+def _batch_sketch(*args):
+    """Executado nos processos do pool: devolve só o resumo de quantis do lote (meses x 1001)."""
+    return np.percentile(_simulate_batch(*args), SKETCH_PERCENTILES, axis=1).T
+
+
+def simulate_percentiles(initial_investment, monthly_contribution, years, n_paths=10_000,
+                         mean_annual_percent=10.0, volatility_annual_percent=15.0,
+                         historical_returns=None, percentiles=(5, 50, 95), seed=0,
+                         parallel=None):
+    """Simulação de Monte Carlo do Capital Acumulado, resumida em percentis por mês.
+
+    Retorna um DataFrame com 'Mês', 'Capital Investido' e uma coluna 'P<n>' por percentil.
+    Até PARALLEL_MIN_PATHS trajetórias (ou com `parallel=False`) tudo roda neste processo e
+    os percentis são exatos. Acima disso, os lotes rodam em paralelo, cada um devolve 1001
+    quantis por mês e os percentis finais são calculados sobre esses resumos combinados
+    (erro da ordem de 0,1 ponto percentil). Para os mesmos parâmetros, `seed` e `parallel`,
+    o resultado é o mesmo em qualquer máquina: a divisão em lotes não depende do número de
+    CPUs, e com uma CPU só os lotes rodam neste processo.
+    """
+    n_months = int(years * 12)
+    months = np.arange(1, n_months + 1)
+    if parallel is None:
+        parallel = n_paths >= PARALLEL_MIN_PATHS
+
+    common = (initial_investment, monthly_contribution, n_months)
+    distribution = (mean_annual_percent, volatility_annual_percent, historical_returns)
+    if parallel:
+        n_batches = min(MAX_BATCHES, max(1, n_paths // PATHS_PER_BATCH))
+        batch_sizes = [len(chunk) for chunk in np.array_split(np.arange(n_paths), n_batches)]
+        seeds = np.random.SeedSequence(seed).spawn(n_batches)
+        batches = [(*common, size, *distribution, batch_seed) for size, batch_seed in zip(batch_sizes, seeds)]
+        if (os.cpu_count() or 1) > 1:
+            futures = [_get_executor().submit(_batch_sketch, *batch) for batch in batches]
+            sketches = [future.result() for future in futures]
+        else:
+            sketches = [_batch_sketch(*batch) for batch in batches]
+        samples = np.concatenate(sketches, axis=1)
+    else:
+        samples = _simulate_batch(*common, n_paths, *distribution, np.random.SeedSequence(seed))
+
+    values = np.percentile(samples, percentiles, axis=1)
+    result = pd.DataFrame({
+        "Mês": months,
+        "Capital Investido": initial_investment + monthly_contribution * (months - 1),
+    })
+    for p, column in zip(percentiles, values):
+        result[f"P{p:g}"] = column
+    return result
@@ -0,0 +1,129 @@
+# core/pagination.py
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from core.aggregations import _to_day
+from core.instrumentation import traced
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def _match(df, positions, category=None, search=None, search_columns=("Descrição", "Categoria")):
+    """Máscara dos filtros de categoria e texto sobre as linhas `positions` (None: todas)."""
+    def values(col):
+        column = df[col]
+        return column if positions is None else column.iloc[positions]
+
+    mask = np.ones(len(df) if positions is None else len(positions), dtype=bool)
+    if category is not None:
+        mask &= (values("Categoria") == category).to_numpy()
+    if search:
+        found = np.zeros(len(mask), dtype=bool)
+        for col in search_columns:
+            column = df[col]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                matches = column.cat.categories.astype(str).str.contains(search, case=False, regex=False)
+                codes = column.cat.codes.to_numpy()
+                if positions is not None:
+                    codes = codes[positions]
+                found |= (codes >= 0) & np.append(matches, False)[codes]
+            else:
+                column = values(col)
+                if not pd.api.types.is_string_dtype(column):
+                    column = column.astype(str)
+                found |= column.str.contains(search, case=False, regex=False, na=False).to_numpy(dtype=bool)
+        mask &= found
+    return mask
+
+
+@traced("pagination.filter")
+def filter_mask(df, category=None, search=None, start_date=None, end_date=None,
+                date_column="Data", search_columns=("Descrição", "Categoria")):
+    """Máscara booleana (NumPy) das linhas que passam pelos filtros informados.
+
+    `search` procura o texto, sem diferenciar maiúsculas, em qualquer uma das
+    `search_columns`; colunas categóricas são comparadas nas categorias (poucos
+    valores distintos) e depois expandidas pelos códigos.
+    """
+    mask = _match(df, None, category, search, search_columns)
+    if start_date is not None or end_date is not None:
+        days = df[date_column].to_numpy(dtype="datetime64[D]")
+        if start_date is not None:
+            mask &= days >= _to_day(start_date)
+        if end_date is not None:
+            mask &= days <= _to_day(end_date)
+    return mask
+
+
+def _sort(df, positions, sort_by, descending=False):
+    """`positions` (em ordem de ID) ordenadas por `sort_by`, de forma estável."""
+    column = df[sort_by].iloc[positions].reset_index(drop=True)
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.cat.set_categories(sorted(column.cat.categories.astype(str)), ordered=True)
+    order = column.sort_values(ascending=not descending, kind="stable").index.to_numpy()
+    return positions[order]
+
+
+@traced("pagination.sort")
+def sorted_positions(df, mask, sort_by, descending=False):
+    """Posições das linhas selecionadas por `mask`, ordenadas por `sort_by`.
+
+    A ordenação é estável nos dois sentidos (empates mantêm a ordem de ID); categóricas
+    são ordenadas pelo texto das categorias, sem converter a coluna inteira para texto.
+    """
+    return _sort(df, np.flatnonzero(mask), sort_by, descending)
+
+
+@traced("pagination.view")
+def view_positions(df, sort_by, descending=False, date_index=None, date_column="Data",
+                   category=None, search=None, start_date=None, end_date=None,
+                   search_columns=("Descrição", "Categoria")):
+    """Posições das linhas filtradas (filtros de filter_mask()) em ordem de `sort_by`.
+
+    Com `date_index` (DateIndex de `date_column`), o período é um recorte do índice achado
+    por busca binária, sem máscara do tamanho do DataFrame: categoria e texto são avaliados
+    só nas linhas do recorte e, ordenando por `date_column`, o recorte já está em ordem
+    (linhas sem data, que o índice não tem, ficam de fora).
+    """
+    by_date = sort_by == date_column
+    has_period = start_date is not None or end_date is not None
+    if date_index is None or not (by_date or has_period):
+        mask = filter_mask(df, category, search, start_date, end_date, date_column, search_columns)
+        return sorted_positions(df, mask, sort_by, descending)
+
+    if by_date:
+        positions = date_index.ordered_between(start_date, end_date, descending)
+    else:
+        positions = np.sort(date_index.positions_between(start_date, end_date))
+    if category is not None or search:
+        positions = positions[_match(df, positions, category, search, search_columns)]
+    return positions if by_date else _sort(df, positions, sort_by, descending)
+
+
+def page_count(n_rows, page_size):
+    """Número de páginas (pelo menos 1, mesmo sem linhas)."""
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def page_bounds(n_rows, page, page_size):
+    """Intervalo [início, fim) da página `page` (1..page_count), limitado ao total de linhas."""
+    page = min(max(1, page), page_count(n_rows, page_size))
+    start = (page - 1) * page_size
+    return start, min(start + page_size, n_rows)
+
+
+@traced("pagination.format")
+def format_page(df, date_columns=(), money_columns=(), date_format="%d/%m/%Y"):
+    """Formata como texto as colunas de data e de valor de uma página já recortada.
+
+    Cada coluna é convertida de uma vez (strftime e np.char.mod), sem funções por célula.
+    """
+    formatted = df.copy(deep=False)
+    for col in date_columns:
+        formatted[col] = df[col].dt.strftime(date_format)
+    for col in money_columns:
+        formatted[col] = np.char.mod("R$ %.2f", df[col].to_numpy(dtype=float))
+    return formatted
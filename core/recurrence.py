@@ -0,0 +1,133 @@
+# core/recurrence.py
+#
+# Contas recorrentes (aluguel, assinaturas): cada regra é uma linha do RECURRING_SCHEMA
+# (core/storage.py) e as ocorrências só existem quando uma janela de datas é pedida. A
+# expansão é vetorizada: para cada regra calcula-se o primeiro e o último índice de
+# ocorrência dentro da janela e as datas saem de aritmética sobre datetime64, sem laço
+# por ocorrência.
+
+import numpy as np
+import pandas as pd
+
+from core.instrumentation import traced
+from core.storage import ID_COLUMN
+
+# Frequência -> (unidade, passo): a regra repete a cada Intervalo * passo unidades
+FREQUENCIES = {
+    "Diária": ("D", 1),
+    "Semanal": ("D", 7),
+    "Mensal": ("M", 1),
+    "Anual": ("M", 12),
+}
+
+OCCURRENCE_COLUMNS = ["Regra", "Descrição", "Valor", "Data de Vencimento", "Pago"]
+
+
+def _month_dates(months, day):
+    """Dia `day` de cada mês (datetime64[M]); em meses mais curtos, o último dia do mês."""
+    first = months.astype("datetime64[D]")
+    length = ((months + 1).astype("datetime64[D]") - first).astype(np.int64)
+    return first + (np.minimum(day, length) - 1)
+
+
+def _ceil_div(a, b):
+    return -((-a) // b)
+
+
+def _occurrence_range(unit, anchor, step, lo, hi):
+    """Primeiro e último índice k (inclusive) com anchor + k * step em [lo, hi], por regra."""
+    if unit == "D":
+        k0 = _ceil_div((lo - anchor).astype(np.int64), step)
+        k1 = ((hi - anchor).astype(np.int64)) // step
+        return np.maximum(k0, 0), k1
+
+    anchor_month = anchor.astype("datetime64[M]")
+    day = (anchor - anchor_month.astype("datetime64[D]")).astype(np.int64) + 1
+    k0 = np.maximum(_ceil_div((lo.astype("datetime64[M]") - anchor_month).astype(np.int64), step), 0)
+    k0 += _month_dates(anchor_month + k0 * step, day) < lo
+    k1 = (hi.astype("datetime64[M]") - anchor_month).astype(np.int64) // step
+    k1 -= _month_dates(anchor_month + k1 * step, day) > hi
+    return k0, k1
+
+
+def _occurrence_dates(unit, anchor, step, k):
+    if unit == "D":
+        return anchor + k * step
+    anchor_month = anchor.astype("datetime64[M]")
+    day = (anchor - anchor_month.astype("datetime64[D]")).astype(np.int64) + 1
+    return _month_dates(anchor_month + k * step, day)
+
+
+def empty_occurrences():
+    return pd.DataFrame({
+        "Regra": pd.Series(dtype=np.int64),
+        "Descrição": pd.Series(dtype=object),
+        "Valor": pd.Series(dtype=float),
+        "Data de Vencimento": pd.Series(dtype="datetime64[ns]"),
+        "Pago": pd.Series(dtype=bool),
+    })
+
+
+@traced("recurrence.expand")
+def expand_rules(rules, start=None, end=None, pending_only=False):
+    """Ocorrências das regras entre `start` e `end` (inclusive), ordenadas por vencimento.
+
+    Sem `start`, a janela começa no início de cada regra; `end` é obrigatório para regras
+    sem "Fim". Ocorrências até "Pago Até" saem com Pago=True; com `pending_only`, são
+    omitidas. Retorna um DataFrame com OCCURRENCE_COLUMNS ("Regra" é o ID da regra).
+    """
+    if rules.empty:
+        return empty_occurrences()
+
+    anchor = rules["Início"].to_numpy(dtype="datetime64[D]")
+    paid_through = rules["Pago Até"].to_numpy(dtype="datetime64[D]")
+    lo = anchor.copy()
+    if start is not None:
+        lo = np.maximum(lo, np.datetime64(pd.Timestamp(start).date(), "D"))
+    if pending_only:
+        after_paid = paid_through + 1
+        lo = np.where(np.isnat(paid_through), lo, np.maximum(lo, after_paid))
+    hi = rules["Fim"].to_numpy(dtype="datetime64[D]")
+    if end is not None:
+        end_day = np.datetime64(pd.Timestamp(end).date(), "D")
+        hi = np.where(np.isnat(hi), end_day, np.minimum(hi, end_day))
+
+    frequency = rules["Frequência"].astype(object).to_numpy()
+    interval = rules["Intervalo"].to_numpy(dtype=np.int64)
+    positions, dates = [], []
+    for name, (unit, step) in FREQUENCIES.items():
+        selected = np.flatnonzero((frequency == name) & ~np.isnat(hi))
+        if selected.size == 0:
+            continue
+        steps = interval[selected] * step
+        k0, k1 = _occurrence_range(unit, anchor[selected], steps, lo[selected], hi[selected])
+        counts = np.maximum(k1 - k0 + 1, 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        # k de cada ocorrência: k0 da regra + posição dentro do bloco da regra
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        k = np.repeat(k0, counts) + offsets
+        owners = np.repeat(selected, counts)
+        positions.append(owners)
+        dates.append(_occurrence_dates(unit, anchor[owners], interval[owners] * step, k))
+
+    if not positions:
+        return empty_occurrences()
+    positions = np.concatenate(positions)
+    dates = np.concatenate(dates)
+    order = np.lexsort((positions, dates))
+    positions, dates = positions[order], dates[order]
+    paid = dates <= paid_through[positions]  # NaT compara como False
+    return pd.DataFrame({
+        "Regra": rules[ID_COLUMN].to_numpy()[positions],
+        "Descrição": rules["Descrição"].to_numpy()[positions],
+        "Valor": rules["Valor"].to_numpy(dtype=float)[positions],
+        "Data de Vencimento": dates.astype("datetime64[ns]"),
+        "Pago": paid,
+    })
+
+
+def pending_occurrences(rules, until):
+    """Ocorrências ainda não pagas de cada regra, desde o início até `until` (inclusive)."""
+    return expand_rules(rules, end=until, pending_only=True)
@@ -0,0 +1,189 @@
+# core/rollups.py
+
+import numpy as np
+import pandas as pd
+
+from core.aggregations import _to_day, cumulative_daily, daily_totals, from_cents, to_cents
+from core.instrumentation import traced
+
+# Origem das despesas na tabela mensal
+SOURCE_TRANSACTIONS = "Transações"
+SOURCE_BILLS = "Contas"
+
+
+def _group_sums(keys, values):
+    """Soma e contagem de `values` (centavos) por chave composta (lista de arrays), como tuplas."""
+    grouped = pd.DataFrame({"Valor": values}).groupby(keys, sort=False)["Valor"].agg(["sum", "count"])
+    if grouped.index.nlevels == 1:
+        index = [(key,) for key in grouped.index]
+    else:
+        index = list(grouped.index)
+    return zip(index, grouped["sum"].to_numpy(), grouped["count"].to_numpy())
+
+
+def _accumulate(table, groups, sign):
+    """Aplica a variação de cada grupo na tabela; chaves que ficam sem linhas são removidas.
+
+    As entradas são tuplas substituídas a cada alteração (nunca alteradas no lugar), para
+    que uma cópia rasa da tabela (Rollups.copy()) não seja afetada.
+    """
+    for key, total, count in groups:
+        old_total, old_count = table.get(key, (0, 0))
+        entry = (old_total + sign * int(total), old_count + sign * int(count))
+        if entry[1] <= 0:
+            table.pop(key, None)
+        else:
+            table[key] = entry
+
+
+def _text(series):
+    """Coluna de texto (inclusive categórica) com valores ausentes como string vazia."""
+    return series.astype(object).where(series.notna(), "").to_numpy()
+
+
+class Rollups:
+    """Tabelas de totais pré-calculados, atualizadas por delta a cada escrita.
+
+    - `daily`: (dia, Tipo, Categoria) -> (soma de Valor, nº de transações)
+    - `monthly`: (mês, origem) -> (soma de despesas, nº de linhas), com as despesas das
+      transações (origem 'Transações') e as contas pagas (origem 'Contas').
+
+    As somas são guardadas em centavos inteiros: incluir e remover as mesmas linhas volta
+    exatamente ao total anterior, sem acumular erro de ponto flutuante.
+
+    Incluir, editar ou apagar linhas custa O(linhas alteradas); as leituras usadas pelo
+    dashboard custam O(dias/meses com movimento), independentemente do total de linhas.
+    """
+
+    def __init__(self):
+        self.daily = {}
+        self.monthly = {}
+        self._daily_view = None
+
+    @classmethod
+    @traced("rollups.build")
+    def from_frames(cls, transactions_df, bills_df):
+        """Constrói as tabelas a partir dos DataFrames completos (uma passada em cada)."""
+        rollups = cls()
+        rollups.add_transactions(transactions_df)
+        rollups.add_bills(bills_df)
+        return rollups
+
+    def copy(self):
+        """Cópia independente em O(chaves), para atualizar sem afetar quem lê esta instância."""
+        rollups = Rollups()
+        rollups.daily = dict(self.daily)
+        rollups.monthly = dict(self.monthly)
+        rollups._daily_view = self._daily_view
+        return rollups
+
+    # --- Atualização por delta ---
+
+    def add_transactions(self, df, sign=1):
+        if df.empty:
+            return
+        days = df["Data"].to_numpy(dtype="datetime64[D]")
+        months = df["Data"].to_numpy(dtype="datetime64[M]")
+        tipo = _text(df["Tipo"])
+        values = to_cents(df["Valor"])
+        _accumulate(self.daily, _group_sums([days, tipo, _text(df["Categoria"])], values), sign)
+
+        is_despesa = tipo == "Despesa"
+        if is_despesa.any():
+            _accumulate(self.monthly, _group_sums(
+                [months[is_despesa], np.full(is_despesa.sum(), SOURCE_TRANSACTIONS, dtype=object)],
+                values[is_despesa],
+            ), sign)
+        self._daily_view = None
+
+    def remove_transactions(self, df):
+        self.add_transactions(df, sign=-1)
+
+    def add_bills(self, df, sign=1):
+        paid = df[df["Pago"].astype(bool)]
+        if paid.empty:
+            return
+        months = paid["Data de Vencimento"].to_numpy(dtype="datetime64[M]")
+        _accumulate(self.monthly, _group_sums(
+            [months, np.full(len(paid), SOURCE_BILLS, dtype=object)],
+            to_cents(paid["Valor"]),
+        ), sign)
+
+    def remove_bills(self, df):
+        self.add_bills(df, sign=-1)
+
+    # --- Leituras ---
+
+    def daily_view(self):
+        """Tabela diária como DataFrame (Data, Tipo, Categoria, Valor) em ordem de Data,
+        recalculada só após escritas.
+        """
+        if self._daily_view is None:
+            keys = list(self.daily)
+            days = np.array([key[0] for key in keys], dtype="datetime64[D]")
+            order = np.argsort(days, kind="stable")
+            self._daily_view = pd.DataFrame({
+                "Data": pd.to_datetime(days[order]),
+                "Tipo": np.array([key[1] for key in keys], dtype=object)[order],
+                "Categoria": np.array([key[2] for key in keys], dtype=object)[order],
+                "Valor": from_cents(np.array([entry[0] for entry in self.daily.values()], dtype=np.int64)[order]),
+            })
+        return self._daily_view
+
+    def _daily_period(self, start_date, end_date):
+        """Linhas da tabela diária no período: um recorte achado por busca binária nas datas ordenadas."""
+        view = self.daily_view()
+        days = view["Data"].to_numpy()
+        lo = 0 if start_date is None else np.searchsorted(days, _to_day(start_date), side="left")
+        hi = len(days) if end_date is None else np.searchsorted(days, _to_day(end_date), side="right")
+        return view.iloc[lo:max(lo, hi)]
+
+    def _daily_sums(self, level, tipo=None):
+        """Soma de Valor (em reais) da tabela diária agrupada por Tipo (level=1) ou Categoria (level=2)."""
+        totals = {}
+        for key, (total, _) in self.daily.items():
+            if tipo is None or key[1] == tipo:
+                totals[key[level]] = totals.get(key[level], 0) + total
+        keys = sorted(totals)
+        index = pd.Index(keys, name="Tipo" if level == 1 else "Categoria")
+        return pd.Series(from_cents([totals[key] for key in keys]), index=index, name="Valor", dtype=float)
+
+    def totals_by_type(self):
+        """Soma de Valor por Tipo de transação."""
+        return self._daily_sums(1)
+
+    def expenses_by_category(self):
+        """Total de despesas por Categoria."""
+        return self._daily_sums(2, tipo="Despesa")
+
+    def paid_bills_total(self):
+        """Soma das contas marcadas como pagas."""
+        return sum(entry[0] for (_, source), entry in self.monthly.items() if source == SOURCE_BILLS) / 100
+
+    def monthly_expenses(self):
+        """Total de despesas por mês (transações do tipo Despesa + contas pagas), em ordem."""
+        totals = {}
+        for (month, _), entry in self.monthly.items():
+            totals[month] = totals.get(month, 0) + entry[0]
+        months = sorted(totals)
+        index = pd.PeriodIndex([pd.Period(month, freq="M") for month in months], freq="M")
+        return pd.Series(from_cents([totals[month] for month in months]), index=index, dtype=float)
+
+    def categories(self):
+        """Categorias com transações (na ordem em que apareceram)."""
+        return [category for category in dict.fromkeys(key[2] for key in self.daily) if category.strip()]
+
+    def date_range(self):
+        """(primeira, última) data das transações como Timestamps, ou None se não houver transações."""
+        if not self.daily:
+            return None
+        days = [key[0] for key in self.daily]
+        return pd.Timestamp(min(days)), pd.Timestamp(max(days))
+
+    def daily_totals(self, start_date=None, end_date=None):
+        """Totais diários de Receita e Despesa no período (ver core.aggregations.daily_totals)."""
+        return daily_totals(self._daily_period(start_date, end_date))
+
+    def cumulative_daily(self, start_date=None, end_date=None):
+        """Receita e Despesa acumuladas por dia no período (ver core.aggregations.cumulative_daily)."""
+        return cumulative_daily(self._daily_period(start_date, end_date))
@@ -0,0 +1,81 @@
+# core/simulation.py
+
+import numpy as np
+import pandas as pd
+
+
+def monthly_rate(annual_rate_percent):
+    """Taxa mensal equivalente a uma taxa anual em % (aceita arrays)."""
+    return (1 + np.asarray(annual_rate_percent, dtype=float) / 100) ** (1 / 12) - 1
+
+
+def simulate_grid(initial_investment, monthly_contribution, annual_rate_percent, years):
+    """Simula, de uma vez, uma grade de cenários de investimento em forma fechada.
+
+    Os quatro parâmetros aceitam escalares ou arrays e seguem as regras de broadcasting
+    do NumPy (por exemplo, 200 taxas x 1 aporte avaliam 200 cenários). Convenção da
+    simulação: juros compostos mensais sobre o saldo; o aporte entra a partir do 2º mês,
+    antes da capitalização daquele mês. No mês m, com g = 1 + taxa mensal:
+
+        Capital Acumulado = P·g^m + c·(g^m − g)/(g − 1)     (c·(m − 1) se a taxa for 0)
+        Capital Investido = P + c·(m − 1)
+
+    Retorna `(months, invested, accumulated)`: `months` é 1..N (N = maior horizonte) e os
+    dois arrays têm forma `broadcast(parâmetros) + (N,)`, com NaN após o horizonte de
+    cada cenário.
+    """
+    initial, contribution, rate, total_months = np.broadcast_arrays(
+        np.asarray(initial_investment, dtype=float),
+        np.asarray(monthly_contribution, dtype=float),
+        monthly_rate(annual_rate_percent),
+        (np.asarray(years) * 12).astype(np.int64),
+    )
+    n_months = int(total_months.max()) if total_months.size else 0
+    months = np.arange(1, n_months + 1)
+
+    # Eixo dos meses por último; parâmetros ganham uma dimensão para o broadcasting
+    m = months.astype(float)
+    initial = initial[..., None]
+    contribution = contribution[..., None]
+    rate = rate[..., None]
+
+    growth = (1 + rate) ** m
+    safe_rate = np.where(rate == 0, 1.0, rate)
+    contributions_factor = np.where(rate == 0, m - 1, (growth - (1 + rate)) / safe_rate)
+
+    accumulated = initial * growth + contribution * contributions_factor
+    invested = np.broadcast_to(initial + contribution * (m - 1), accumulated.shape).copy()
+
+    beyond_horizon = months > total_months[..., None]
+    accumulated[beyond_horizon] = np.nan
+    invested[beyond_horizon] = np.nan
+    return months, invested, accumulated
+
+
+def simulate_investment(initial_investment, monthly_contribution, annual_rate_percent, years):
+    """Trajetória mês a mês de um único cenário, como DataFrame (Mês, Capital Investido, Capital Acumulado)."""
+    months, invested, accumulated = simulate_grid(
+        initial_investment, monthly_contribution, annual_rate_percent, years
+    )
+    return pd.DataFrame({
+        "Mês": months,
+        "Capital Investido": invested,
+        "Capital Acumulado": accumulated,
+    })
+
+
+def rate_sensitivity_band(initial_investment, monthly_contribution, annual_rate_percent, years,
+                          spread_percent, n_rates=101):
+    """Faixa de Capital Acumulado para taxas anuais em `annual_rate_percent ± spread_percent`.
+
+    Avalia `n_rates` cenários numa única chamada de simulate_grid() e retorna um DataFrame
+    com 'Mês', 'Mínimo' e 'Máximo' (taxas negativas são limitadas a 0).
+    """
+    rates = np.linspace(annual_rate_percent - spread_percent, annual_rate_percent + spread_percent, n_rates)
+    rates = np.clip(rates, 0.0, None)
+    months, _, accumulated = simulate_grid(initial_investment, monthly_contribution, rates, years)
+    return pd.DataFrame({
+        "Mês": months,
+        "Mínimo": accumulated.min(axis=0),
+        "Máximo": accumulated.max(axis=0),
+    })
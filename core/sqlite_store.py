@@ -0,0 +1,432 @@
+# core/sqlite_store.py
+
+import contextlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.aggregations import _to_day, cumulative_daily, daily_totals
+from core.instrumentation import SPANS, traced
+from core.storage import ID_COLUMN, CsvBackend, JournaledStore
+
+# Índices de cada tabela (nome do conjunto de dados -> colunas de cada índice)
+INDEXES = {
+    "transactions": [("Data",), ("Tipo", "Data"), ("Categoria",)],
+    "bills": [("Data de Vencimento",), ("Pago", "Data de Vencimento")],
+}
+
+
+def _quote(name):
+    """Identificador SQL entre aspas (as colunas têm acentos e espaços)."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+# Soma de Valor feita em centavos inteiros (como em core.rollups), convertida para reais no fim
+SUM_VALOR = f"SUM(CAST(ROUND({_quote('Valor')} * 100) AS INTEGER)) / 100.0"
+
+
+def _sql_type(dtype):
+    if dtype == "int64" or dtype is bool:
+        return "INTEGER"
+    if dtype is float:
+        return "REAL"
+    return "TEXT"
+
+
+class SqliteBackend:
+    """Tabela SQLite indexada por conjunto de dados (IASMIN_STORAGE=sqlite).
+
+    Diferente dos formatos de arquivo base, não é usado pelo JournaledStore: o próprio
+    SQLite cuida do journal e da atomicidade, então open_store() abre um SqliteStore.
+    """
+
+    extension = ".sqlite"
+
+    def open_store(self, path, name, schema):
+        return SqliteStore(path, name, schema)
+
+
+class SqliteStore:
+    """Conjunto de dados numa tabela SQLite, com a mesma interface do JournaledStore.
+
+    Além de read/append/edit/rewrite, oferece consultas que levam filtros, ordenação,
+    paginação e agregações para o SQL (count, query_page, categories, date_range), para
+    que o dashboard não precise manter o livro-caixa inteiro na memória. As datas são
+    gravadas como texto AAAA-MM-DD, que compara e ordena corretamente nos índices.
+
+    Cada escrita é uma transação BEGIN IMMEDIATE, que serializa processos diferentes sobre
+    o mesmo banco; commits de outras conexões são detectados por refresh().
+    """
+
+    def __init__(self, path, table, schema):
+        self.base_path = path
+        self.table = table
+        self.schema = schema
+        self.date_column = schema.date_columns[0]
+        self._created = not os.path.exists(path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_table()
+        self._next_id = None
+        self._data_version = None
+        self.version = 0
+
+    def _create_table(self):
+        columns = ", ".join(
+            f"{_quote(col)} {'INTEGER PRIMARY KEY' if col == ID_COLUMN else _sql_type(dtype)}"
+            for col, dtype in self.schema.dtypes.items()
+        )
+        with self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(self.table)} ({columns})")
+            for index_columns in INDEXES.get(self.table, []):
+                index_name = _quote(self.table + "_" + "_".join(index_columns))
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {_quote(self.table)} "
+                    f"({', '.join(_quote(col) for col in index_columns)})"
+                )
+
+    def query(self, sql, params=()):
+        """Executa uma consulta somente leitura e retorna um DataFrame (colunas como no SELECT)."""
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    # --- Conversão entre DataFrame e linhas SQL ---
+
+    def _sql_values(self, col, values):
+        """Valores de uma coluna prontos para o sqlite3 (datas em texto, ausentes como None)."""
+        if col in self.schema.date_columns:
+            values = values.dt.strftime('%Y-%m-%d')
+        elif col == "Pago":
+            values = values.astype(int)
+        return values.astype(object).where(values.notna(), None).tolist()
+
+    def _sql_rows(self, df):
+        columns = [self._sql_values(col, df[col]) for col in self.schema.columns]
+        return list(zip(*columns))
+
+    def _from_sql(self, df):
+        """Converte o resultado de um SELECT * para os tipos do esquema."""
+        for col in self.schema.date_columns:
+            df[col] = pd.to_datetime(df[col], format="%Y-%m-%d", errors='coerce')
+        if "Pago" in df.columns:
+            df["Pago"] = df["Pago"].fillna(0).astype(bool)
+        return self.schema.coerce(df)
+
+    def _insert(self, df):
+        placeholders = ", ".join("?" for _ in self.schema.columns)
+        columns = ", ".join(_quote(col) for col in self.schema.columns)
+        self._conn.executemany(
+            f"INSERT INTO {_quote(self.table)} ({columns}) VALUES ({placeholders})", self._sql_rows(df)
+        )
+
+    # --- Leitura ---
+
+    @traced("sqlite.read")
+    def read(self):
+        """Carrega a tabela inteira (usado na exportação e pelo modo em memória)."""
+        df = self._from_sql(self.query(f"SELECT * FROM {_quote(self.table)} ORDER BY {_quote(ID_COLUMN)}"))
+        with self._lock:
+            self._track_ids(df)
+        return df
+
+    def journal_size(self):
+        """Sem journal próprio: as escritas já vão direto para a tabela."""
+        return 0
+
+    def _where(self, category=None, search=None, start_date=None, end_date=None):
+        clauses, params = [], []
+        if category is not None:
+            clauses.append(f"{_quote('Categoria')} = ?")
+            params.append(category)
+        if start_date is not None:
+            clauses.append(f"{_quote(self.date_column)} >= ?")
+            params.append(str(_to_day(start_date)))
+        if end_date is not None:
+            clauses.append(f"{_quote(self.date_column)} <= ?")
+            params.append(str(_to_day(end_date)))
+        if search:
+            # LIKE do SQLite ignora maiúsculas/minúsculas apenas em caracteres ASCII
+            pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append(f"({_quote('Descrição')} LIKE ? ESCAPE '\\' OR {_quote('Categoria')} LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern])
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    @traced("sqlite.count")
+    def count(self, **filters):
+        """Número de linhas que passam pelos filtros (mesmos de core.pagination.filter_mask)."""
+        where, params = self._where(**filters)
+        return int(self.query(f"SELECT COUNT(*) AS n FROM {_quote(self.table)}{where}", params)["n"].iloc[0])
+
+    @traced("sqlite.query_page")
+    def query_page(self, filters, sort_by, descending, offset, limit):
+        """Uma página das linhas filtradas, ordenadas por `sort_by` (empates em ordem de ID)."""
+        where, params = self._where(**filters)
+        order = f"{_quote(sort_by)} {'DESC' if descending else 'ASC'}, {_quote(ID_COLUMN)}"
+        return self._from_sql(self.query(
+            f"SELECT * FROM {_quote(self.table)}{where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [int(limit), int(offset)],
+        )).reset_index(drop=True)
+
+    def categories(self):
+        """Categorias distintas presentes na tabela (percorre só o índice de Categoria)."""
+        result = self.query(
+            f"SELECT DISTINCT {_quote('Categoria')} AS c FROM {_quote(self.table)} "
+            f"WHERE {_quote('Categoria')} IS NOT NULL AND {_quote('Categoria')} != ''"
+        )
+        return result["c"].tolist()
+
+    def date_range(self):
+        """(primeira, última) data da tabela como Timestamps, ou None se estiver vazia."""
+        col = _quote(self.date_column)
+        result = self.query(f"SELECT MIN({col}) AS first, MAX({col}) AS last FROM {_quote(self.table)}")
+        if result["first"].isna().iloc[0]:
+            return None
+        return pd.Timestamp(result["first"].iloc[0]), pd.Timestamp(result["last"].iloc[0])
+
+    # --- Escrita ---
+
+    def refresh(self):
+        """Detecta commits feitos por outra conexão (PRAGMA data_version); retorna True se houve."""
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            changed = self._data_version is not None and data_version != self._data_version
+            if changed:
+                self._next_id = None
+                self.version += 1
+            self._data_version = data_version
+            return changed
+
+    @contextlib.contextmanager
+    def _write(self):
+        """Transação de escrita; o banco fica travado para outros processos antes da atribuição de IDs."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self.refresh()
+                yield
+            self.version += 1
+
+    def _track_ids(self, df):
+        next_id = int(df[ID_COLUMN].max()) + 1 if len(df) else 1
+        self._next_id = max(self._next_id or 1, next_id)
+
+    def assign_ids(self, rows_df):
+        """Atribui IDs novos e crescentes às linhas (ver JournaledStore.assign_ids())."""
+        with self._lock:
+            if self._next_id is None:
+                max_id = self._conn.execute(
+                    f"SELECT COALESCE(MAX({_quote(ID_COLUMN)}), 0) FROM {_quote(self.table)}"
+                ).fetchone()[0]
+                self._next_id = max_id + 1
+            ids = np.arange(self._next_id, self._next_id + len(rows_df), dtype=np.int64)
+            self._next_id += len(rows_df)
+        return rows_df.assign(**{ID_COLUMN: ids})
+
+    @traced("sqlite.append")
+    def append(self, rows_df):
+        """Insere as linhas numa transação; retorna as linhas com seus IDs."""
+        with self._write():
+            rows_df = self.assign_ids(rows_df)
+            self._insert(rows_df)
+        return rows_df
+
+    @traced("sqlite.edit")
+    def edit(self, batch, version=None):
+        """Aplica um EditBatch numa única transação, com as mesmas regras de Schema.apply_edit().
+
+        Retorna o lote com os IDs definitivos das linhas incluídas. `version` existe pela
+        compatibilidade com o JournaledStore: aqui os IDs nunca são renumerados.
+        """
+        table = _quote(self.table)
+        id_col = _quote(ID_COLUMN)
+        required = self.schema.required
+        with self._write():
+            if batch.added is not None and len(batch.added):
+                batch = batch._replace(added=self.assign_ids(batch.added))
+            edited = set()
+            for col, (ids, values) in batch.updates.items():
+                ids = np.asarray(ids, dtype=np.int64).tolist()
+                self._conn.executemany(
+                    f"UPDATE {table} SET {_quote(col)} = ? WHERE {id_col} = ?",
+                    zip(self._sql_values(col, values), ids),
+                )
+                edited.update(ids)
+            # Linhas editadas que ficaram sem data ou valor são descartadas
+            missing = " OR ".join(f"{_quote(col)} IS NULL" for col in required)
+            self._conn.executemany(
+                f"DELETE FROM {table} WHERE {id_col} = ? AND ({missing})", [(i,) for i in edited]
+            )
+            self._conn.executemany(
+                f"DELETE FROM {table} WHERE {id_col} = ?",
+                [(i,) for i in np.asarray(batch.deletes, dtype=np.int64).tolist()],
+            )
+            if batch.added is not None:
+                self._insert(batch.added.dropna(subset=required))
+        return batch
+
+    @traced("sqlite.rewrite")
+    def rewrite(self, df):
+        """Substitui todo o conteúdo da tabela numa única transação."""
+        with self._write():
+            self._conn.execute(f"DELETE FROM {_quote(self.table)}")
+            self._insert(self.schema.coerce(df))
+            self._track_ids(df)
+
+    def compact(self):
+        """Nada a incorporar: mantido pela compatibilidade com o JournaledStore."""
+
+    # --- Importação/Exportação CSV ---
+
+    def migrate_from_csv(self, csv_path):
+        """Migração única: preenche o banco recém-criado a partir do CSV legado (e seu journal)."""
+        if not self._created:
+            return False
+        legacy = JournaledStore(csv_path, self.schema, CsvBackend())
+        if not os.path.exists(csv_path) and not os.path.exists(legacy.journal_path):
+            return False
+        legacy.compact()
+        self.rewrite(legacy.read())
+        self._created = False
+        return True
+
+    def export_csv(self, path=None):
+        """Exporta a tabela completa para CSV; sem `path`, retorna o texto."""
+        return CsvBackend().write(path, self.read(), self.schema)
+
+    def import_csv(self, path_or_buffer):
+        """Substitui o conteúdo da tabela pelo de um arquivo CSV."""
+        df = CsvBackend().read(path_or_buffer, self.schema).reset_index(drop=True)
+        self.rewrite(df)
+        return df
+
+
+class SqlLedger:
+    """Consultas do dashboard feitas no SQLite, com a mesma interface de leitura de Rollups.
+
+    Cada agregação é um SUM/GROUP BY sobre as tabelas indexadas e fica memorizada até a
+    próxima escrita em algum dos dois conjuntos de dados (pelas versões dos stores). Os
+    métodos de atualização por delta de Rollups não têm o que fazer aqui.
+    """
+
+    def __init__(self, transactions_store, bills_store):
+        self.transactions = transactions_store
+        self.bills = bills_store
+        self._lock = threading.Lock()
+        self._memo = {}
+        self._memo_versions = None
+
+    def _memoized(self, key, compute):
+        versions = (self.transactions.version, self.bills.version)
+        with self._lock:
+            if self._memo_versions != versions:
+                self._memo = {}
+                self._memo_versions = versions
+            if key in self._memo:
+                return self._memo[key]
+        with SPANS.span(f"sql.{key[0] if isinstance(key, tuple) else key}"):
+            result = compute()
+        with self._lock:
+            if self._memo_versions == versions:
+                self._memo[key] = result
+        return result
+
+    def copy(self):
+        """Sem estado próprio além do memo por versão: a mesma instância serve a todos."""
+        return self
+
+    # --- Atualização por delta (sem efeito: as consultas leem direto do banco) ---
+
+    def add_transactions(self, df, sign=1):
+        pass
+
+    def remove_transactions(self, df):
+        pass
+
+    def add_bills(self, df, sign=1):
+        pass
+
+    def remove_bills(self, df):
+        pass
+
+    # --- Leituras ---
+
+    def _sum_by(self, store, expression, where=""):
+        """SUM(Valor) agrupado por uma expressão SQL, como Series indexada pela chave."""
+        result = store.query(
+            f"SELECT {expression} AS key, {SUM_VALOR} AS total "
+            f"FROM {_quote(store.table)} {where} GROUP BY key"
+        )
+        return pd.Series(result["total"].to_numpy(dtype=float), index=result["key"].to_numpy(), name="Valor")
+
+    def totals_by_type(self):
+        """Soma de Valor por Tipo de transação."""
+        return self._memoized("totals_by_type", lambda: self._sum_by(self.transactions, _quote("Tipo")))
+
+    def expenses_by_category(self):
+        """Total de despesas por Categoria."""
+        return self._memoized("expenses_by_category", lambda: self._sum_by(
+            self.transactions, _quote("Categoria"), f"WHERE {_quote('Tipo')} = 'Despesa'"
+        ))
+
+    def paid_bills_total(self):
+        """Soma das contas marcadas como pagas."""
+        def compute():
+            result = self.bills.query(
+                f"SELECT COALESCE({SUM_VALOR}, 0) AS total FROM {_quote(self.bills.table)} "
+                f"WHERE {_quote('Pago')} = 1"
+            )
+            return float(result["total"].iloc[0])
+        return self._memoized("paid_bills_total", compute)
+
+    def monthly_expenses(self):
+        """Total de despesas por mês (transações do tipo Despesa + contas pagas), em ordem."""
+        def compute():
+            month = f"substr({_quote('Data')}, 1, 7)"
+            expenses = self._sum_by(self.transactions, month, f"WHERE {_quote('Tipo')} = 'Despesa'")
+            due_month = f"substr({_quote('Data de Vencimento')}, 1, 7)"
+            paid = self._sum_by(self.bills, due_month, f"WHERE {_quote('Pago')} = 1")
+            totals = pd.concat([expenses, paid]).groupby(level=0).sum().sort_index()
+            index = pd.PeriodIndex(totals.index, freq="M")
+            return pd.Series(totals.to_numpy(dtype=float), index=index, dtype=float)
+        return self._memoized("monthly_expenses", compute)
+
+    def _daily_view(self, start_date, end_date):
+        """Somas por (dia, Tipo) de Receita/Despesa no período, no formato de Rollups.daily_view()."""
+        where = [f"{_quote('Tipo')} IN ('Receita', 'Despesa')"]
+        params = []
+        if start_date is not None:
+            where.append(f"{_quote('Data')} >= ?")
+            params.append(str(_to_day(start_date)))
+        if end_date is not None:
+            where.append(f"{_quote('Data')} <= ?")
+            params.append(str(_to_day(end_date)))
+        view = self.transactions.query(
+            f"SELECT {_quote('Data')}, {_quote('Tipo')}, {SUM_VALOR} AS {_quote('Valor')} "
+            f"FROM {_quote(self.transactions.table)} WHERE {' AND '.join(where)} "
+            f"GROUP BY {_quote('Data')}, {_quote('Tipo')}",
+            params,
+        )
+        view["Data"] = pd.to_datetime(view["Data"], format="%Y-%m-%d")
+        return view
+
+    def daily_totals(self, start_date=None, end_date=None):
+        """Totais diários de Receita e Despesa no período (ver core.aggregations.daily_totals)."""
+        return self._memoized(("daily_totals", start_date, end_date),
+                              lambda: daily_totals(self._daily_view(start_date, end_date)))
+
+    def cumulative_daily(self, start_date=None, end_date=None):
+        """Receita e Despesa acumuladas por dia no período (ver core.aggregations.cumulative_daily)."""
+        return self._memoized(("cumulative_daily", start_date, end_date),
+                              lambda: cumulative_daily(self._daily_view(start_date, end_date)))
+
+    def categories(self):
+        """Categorias com transações."""
+        return self._memoized("categories", self.transactions.categories)
+
+    def date_range(self):
+        """(primeira, última) data das transações, ou None se não houver transações."""
+        return self._memoized("date_range", self.transactions.date_range)
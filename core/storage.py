@@ -0,0 +1,804 @@
+# core/storage.py
+
+import atexit
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from core.instrumentation import SPANS, traced
+from core.locking import file_lock
+
+logger = logging.getLogger("iasmin.storage")
+
+# Janela (em segundos) em que inclusões/edições seguidas são juntadas numa única gravação
+# do journal pela thread de escrita; 0 grava cada alteração na hora
+FLUSH_DELAY = float(os.environ.get("IASMIN_FLUSH_DELAY", "0.2"))
+
+
+# Coluna com o identificador inteiro e persistente de cada linha
+ID_COLUMN = "ID"
+# ID provisório das linhas novas até o armazenamento atribuir o definitivo
+PENDING_ID = -1
+
+# Texto livre (descrições) em strings Arrow: um buffer contíguo por coluna em vez de um
+# objeto Python por linha. Ausentes como NaN, como nas demais colunas (pandas >= 2.3;
+# no pandas 3 é o próprio dtype `str`).
+try:
+    TEXT_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+except TypeError:  # pandas < 2.3
+    TEXT_DTYPE = object
+
+# Lote de alterações aplicado de uma só vez (edições do st.data_editor ou replay do journal):
+# - updates: {coluna: (IDs das linhas, valores já convertidos)}
+# - deletes: IDs das linhas apagadas
+# - added: DataFrame com as linhas novas, já no esquema
+EditBatch = namedtuple("EditBatch", ["updates", "deletes", "added"])
+
+
+class Schema:
+    """Descreve as colunas de um conjunto de dados e como normalizá-las ao carregar.
+
+    Toda linha tem um ID inteiro persistente (coluna 'ID'), atribuído em ordem crescente
+    pelo armazenamento. Os DataFrames carregados ficam sempre ordenados por ID, de modo que
+    a localização de k linhas por ID é uma busca binária (ver positions_of()).
+    """
+
+    def __init__(self, dtypes, date_columns, optional_dates=()):
+        self.dtypes = dtypes
+        self.columns = list(dtypes)
+        self.date_columns = date_columns
+        # Linhas sem uma das datas obrigatórias ou sem valor são descartadas
+        self.required = [col for col in date_columns if col not in optional_dates] + ["Valor"]
+        self.categorical = [col for col, dtype in dtypes.items() if dtype == "category"]
+        self.text = [col for col, dtype in dtypes.items() if dtype is TEXT_DTYPE]
+
+    def empty(self):
+        """Cria um DataFrame vazio com os tipos de dados corretos."""
+        return pd.DataFrame(columns=self.columns).astype(self.dtypes)
+
+    def _astype(self, df):
+        """Aplica os tipos do esquema; textos ausentes viram string vazia."""
+        df = df.astype(self.dtypes)
+        for col in self.text:
+            if df[col].hasnans:
+                df[col] = df[col].fillna("")
+        return df
+
+    def normalize(self, df):
+        """Converte datas e valores vindos de texto, descarta linhas inválidas e aplica os tipos."""
+        for col in self.date_columns:
+            df[col] = pd.to_datetime(df[col], format="%Y-%m-%d", errors='coerce')
+
+        # Valores monetários sempre em centavos exatos (os totais são somados em centavos)
+        df["Valor"] = pd.to_numeric(df["Valor"], errors='coerce').round(2)
+        df = df.dropna(subset=self.required)
+
+        if "Pago" in df.columns:
+            df["Pago"] = df["Pago"].astype(bool)
+        if "Intervalo" in df.columns:
+            df["Intervalo"] = self.parse_values("Intervalo", df["Intervalo"]).to_numpy()
+        return self.coerce(df)
+
+    def coerce(self, df):
+        """Aplica os tipos do esquema a um DataFrame que já tem colunas tipadas."""
+        return self._astype(self.ensure_ids(df)[self.columns])
+
+    def ensure_ids(self, df):
+        """Garante IDs únicos em ordem crescente; dados sem ID válido (legado) recebem 1..n."""
+        ids = df[ID_COLUMN] if ID_COLUMN in df.columns else None
+        if ids is None or ids.isna().any() or not ids.is_unique:
+            return df.assign(**{ID_COLUMN: np.arange(1, len(df) + 1, dtype=np.int64)})
+        if not ids.is_monotonic_increasing:
+            return df.sort_values(ID_COLUMN, kind="stable")
+        return df
+
+    def positions_of(self, df, ids):
+        """Posições (iloc) das linhas com os `ids` informados; IDs inexistentes são ignorados.
+
+        Usa busca binária sobre a coluna de IDs ordenada: O(k log n), sem montar índice.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        all_ids = df[ID_COLUMN].to_numpy()
+        positions = np.searchsorted(all_ids, ids)
+        found = positions < len(all_ids)
+        found[found] = all_ids[positions[found]] == ids[found]
+        return positions[found], found
+
+    def concat(self, frames):
+        """Concatena DataFrames do esquema preservando as colunas categóricas."""
+        frames = [df for df in frames if not df.empty] or frames[:1]
+        for col in self.categorical:
+            categories = pd.Index([])
+            for df in frames:
+                categories = categories.append(df[col].cat.categories.difference(categories))
+            frames = [df.assign(**{col: df[col].cat.set_categories(categories)}) for df in frames]
+        return pd.concat(frames, ignore_index=True)
+
+    def parse_values(self, col, values, date_format="%Y-%m-%d"):
+        """Converte valores brutos (do editor ou do journal) para o tipo de `col`, como Series.
+
+        Datas que não seguem `date_format` são lidas como ISO 8601 (formato que o
+        st.data_editor usa para colunas de data); valores inválidos viram NaT/NaN.
+        """
+        series = pd.Series(list(values), dtype=object)
+        if col in self.date_columns:
+            parsed = pd.to_datetime(series, format=date_format, errors='coerce')
+            retry = parsed.isna() & series.notna()
+            if retry.any():
+                parsed[retry] = pd.to_datetime(series[retry], format="ISO8601", errors='coerce')
+            return parsed.astype(self.dtypes[col])
+        if col == "Valor":
+            return pd.to_numeric(series, errors='coerce').astype(float).round(2)
+        if col == "Pago":
+            return series.fillna(False).astype(bool)
+        if col == "Intervalo":
+            return pd.to_numeric(series, errors='coerce').fillna(1).clip(lower=1).astype(np.int64)
+        return series
+
+    def from_records(self, records, date_format="%Y-%m-%d"):
+        """Monta um DataFrame do esquema a partir de dicionários (valores ausentes viram NaN).
+
+        Linhas sem ID recebem PENDING_ID, a ser trocado pelo armazenamento.
+        """
+        raw = pd.DataFrame(list(records), columns=self.columns)
+        parsed = pd.DataFrame({
+            col: self.parse_values(col, raw[col], date_format)
+            for col in self.columns if col != ID_COLUMN
+        })
+        parsed.insert(0, ID_COLUMN, pd.to_numeric(raw[ID_COLUMN]).fillna(PENDING_ID).astype(np.int64))
+        return self._astype(parsed[self.columns])
+
+    def _assign(self, df, col, positions, values):
+        """Grava `values` nas linhas `positions` de `col` copiando apenas essa coluna.
+
+        `df` deve ser uma cópia rasa (copy(deep=False)): as demais colunas continuam
+        compartilhadas com o DataFrame original.
+        """
+        column = df[col]
+        if col in self.categorical:
+            new_categories = pd.Index(values.dropna().unique()).difference(column.cat.categories)
+            if len(new_categories):
+                column = column.cat.add_categories(new_categories)
+        column = column.copy()
+        column.iloc[positions] = values.to_numpy()
+        df[col] = column
+
+    @traced("editor.apply_edit")
+    def apply_edit(self, df, batch):
+        """Aplica um EditBatch e retorna (novo DataFrame, linhas removidas, linhas incluídas).
+
+        As atualizações são feitas por coluna, em bloco; as linhas novas são concatenadas
+        uma única vez. Linhas editadas que ficam sem data ou valor são descartadas, assim
+        como linhas novas inválidas. `removed`/`added` trazem as versões antigas/novas das
+        linhas afetadas, para a atualização dos totais pré-calculados por delta.
+        """
+        updated = df.copy(deep=False)
+        edited_positions = set()
+        for col, (ids, values) in batch.updates.items():
+            positions, found = self.positions_of(df, ids)
+            self._assign(updated, col, positions, values[found])
+            edited_positions.update(positions.tolist())
+
+        required = self.required
+        edited = np.array(sorted(edited_positions), dtype=np.int64)
+        invalid = edited[updated.iloc[edited][required].isna().any(axis=1).to_numpy()] if edited.size else edited
+        deleted = np.union1d(self.positions_of(df, batch.deletes)[0], invalid)
+
+        removed = df.iloc[np.union1d(edited, deleted)]
+        kept_edited = np.setdiff1d(edited, deleted)
+        added = batch.added.dropna(subset=required) if batch.added is not None else self.empty()
+
+        keep = np.ones(len(updated), dtype=bool)
+        keep[deleted] = False
+        result = updated[keep] if deleted.size else updated
+        result = self.concat([result, added]).reset_index(drop=True)
+        added_rows = self.concat([updated.iloc[kept_edited], added])
+        return result, removed, added_rows
+
+    def serialize(self, df):
+        """Copia as colunas do esquema com as datas formatadas como texto AAAA-MM-DD."""
+        df_to_save = df[self.columns].copy()
+        for col in self.date_columns:
+            df_to_save[col] = df_to_save[col].dt.strftime('%Y-%m-%d')
+        return df_to_save
+
+    def to_records(self, df):
+        """Serializa linhas para o journal (convertidas por coluna, não célula a célula)."""
+        serialized = self.serialize(df)
+        values = [serialized[col].to_numpy(dtype=object).tolist() for col in self.columns]
+        return [dict(zip(self.columns, row)) for row in zip(*values)]
+
+
+TRANSACTIONS_SCHEMA = Schema(
+    {
+        ID_COLUMN: "int64",
+        "Data": 'datetime64[ns]',
+        "Tipo": "category",
+        "Categoria": "category",
+        "Valor": float,
+        "Descrição": TEXT_DTYPE,
+    },
+    date_columns=["Data"],
+)
+
+BILLS_SCHEMA = Schema(
+    {
+        ID_COLUMN: "int64",
+        "Descrição": TEXT_DTYPE,
+        "Valor": float,
+        "Data de Vencimento": 'datetime64[ns]',
+        "Pago": bool,
+    },
+    date_columns=["Data de Vencimento"],
+)
+
+# Regras de contas recorrentes (core/recurrence.py): uma linha por regra, expandida em
+# vencimentos só quando uma janela de datas é pedida. "Pago Até" é a data da última
+# ocorrência já paga (registrada em BILLS_SCHEMA); "Fim" vazio repete indefinidamente.
+RECURRING_SCHEMA = Schema(
+    {
+        ID_COLUMN: "int64",
+        "Descrição": TEXT_DTYPE,
+        "Valor": float,
+        "Frequência": "category",
+        "Intervalo": "int64",
+        "Início": 'datetime64[ns]',
+        "Fim": 'datetime64[ns]',
+        "Pago Até": 'datetime64[ns]',
+    },
+    date_columns=["Início", "Fim", "Pago Até"],
+    optional_dates=["Fim", "Pago Até"],
+)
+
+
+# --- Gravação atômica ---
+
+def _fsync_dir(path):
+    """Persiste a entrada de diretório (o rename); ignorado onde não há suporte (Windows)."""
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, write):
+    """Grava `path` por inteiro ou não grava: `write(tmp)` num arquivo temporário, fsync e rename.
+
+    Uma queda no meio da gravação deixa apenas o temporário incompleto; o arquivo
+    anterior continua íntegro até o os.replace(), que é atômico. Quem ainda lê o arquivo
+    antigo via memory-map também não vê o conteúdo mudar por baixo. Cada gravação usa
+    um temporário próprio (no mesmo diretório, para o rename não cruzar sistemas de
+    arquivos), de modo que gravações simultâneas do mesmo `path` não se atropelam.
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory or None)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        with open(tmp_path, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(directory)
+
+
+# --- Formatos do arquivo base ---
+
+class CsvBackend:
+    """Texto CSV: formato legado, usado também para importação/exportação."""
+
+    extension = ".csv"
+
+    @traced("storage.parse_csv")
+    def read(self, path, schema):
+        return schema.normalize(pd.read_csv(path))
+
+    def write(self, path, df, schema):
+        return schema.serialize(df).to_csv(path, index=False)
+
+
+class FeatherBackend:
+    """Arrow IPC (Feather) colunar, sem compressão para permitir leitura via memory-map.
+
+    As colunas ficam gravadas já tipadas (datetime64, float, bool, categóricas),
+    então a leitura não precisa reinterpretar texto.
+    """
+
+    extension = ".feather"
+
+    @traced("storage.read_feather")
+    def read(self, path, schema):
+        table = feather.read_table(path, memory_map=True)
+        return schema.coerce(table.to_pandas())
+
+    def write(self, path, df, schema):
+        schema.coerce(df).reset_index(drop=True).to_feather(path, compression="uncompressed")
+
+
+BACKENDS = {
+    "csv": CsvBackend,
+    "feather": FeatherBackend,
+}
+
+
+def get_backend(name=None):
+    """Retorna o formato configurado (variável IASMIN_STORAGE: csv, feather ou sqlite; padrão: feather)."""
+    name = name or os.environ.get("IASMIN_STORAGE", "feather")
+    if name.lower() == "sqlite":
+        # Importação adiada: core.sqlite_store depende deste módulo
+        from core.sqlite_store import SqliteBackend
+        return SqliteBackend()
+    try:
+        return BACKENDS[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Formato de armazenamento desconhecido: {name!r}") from None
+
+
+class JournaledStore:
+    """Arquivo base + journal append-only (write-ahead) com as inclusões recentes.
+
+    Adicionar linhas grava apenas uma linha JSON no journal, com custo independente
+    do tamanho do histórico. Quando o journal passa de `compact_threshold` entradas,
+    ele é incorporado ao arquivo base em uma thread de fundo. Na leitura, o journal
+    é reaplicado sobre o arquivo base.
+
+    `version` cresce monotonicamente a cada alteração do conteúdo (a compactação não
+    conta) e serve de chave para os caches derivados deste conjunto de dados.
+
+    As escritas seguram uma trava de arquivo (`<base>.lock`), de modo que processos
+    diferentes sobre os mesmos arquivos não perdem linhas; alterações feitas por outro
+    processo são detectadas por refresh() e também incrementam `version`.
+
+    Com `flush_delay` > 0, append()/edit() retornam sem esperar o disco: as entradas ficam
+    pendentes na memória (já visíveis em read() e em `version`) e uma thread grava todas
+    as que chegarem dentro da janela de uma vez, com um único fsync. Uma queda perde no
+    máximo essa janela, nunca corrompe os arquivos. O arquivo base é sempre regravado de
+    forma atômica (atomic_write()).
+    """
+
+    def __init__(self, base_path, schema, backend=None, compact_threshold=200, flush_delay=0.0):
+        self.base_path = base_path
+        self.journal_path = base_path + ".journal"
+        self.lock_path = base_path + ".lock"
+        self.compacted_path = base_path + ".compacted"
+        self.schema = schema
+        self.backend = backend or CsvBackend()
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._journal_entries = None
+        self._compactor = None
+        self._next_id = None
+        self._lock_depth = 0
+        self._disk_state = None
+        self.flush_delay = flush_delay
+        self._pending = []
+        self._pending_first_id = None
+        self._flush_timer = None
+        # Rebases de IDs pendentes já feitos, como (versão resultante, primeiro ID, deslocamento)
+        self._rebases = []
+        self._locked_version = 0  # versão ao adquirir a trava exclusiva mais externa
+        self.version = 0
+        if flush_delay > 0:
+            atexit.register(self.flush)
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Lock de thread + trava de arquivo entre processos (reentrante no mesmo processo)."""
+        with self._lock:
+            outermost = self._lock_depth == 0
+            self._lock_depth += 1
+            try:
+                if outermost:
+                    with file_lock(self.lock_path):
+                        self._finish_compaction()
+                        self._locked_version = self.version
+                        self.refresh()
+                        yield
+                else:
+                    yield
+            finally:
+                self._lock_depth -= 1
+
+    def _fingerprint(self):
+        """Tamanho e data de modificação do arquivo base e do journal."""
+        def stat(path):
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                return None
+            return info.st_mtime_ns, info.st_size
+        return stat(self.base_path), stat(self.journal_path)
+
+    def refresh(self):
+        """Detecta alterações gravadas por outro processo; retorna True se houve alguma."""
+        with self._lock:
+            fingerprint = self._fingerprint()
+            changed = self._disk_state is not None and fingerprint != self._disk_state
+            if changed:
+                local_next_id = self._next_id
+                self._next_id = None
+                self._journal_entries = None
+                self.version += 1
+                if self._pending:
+                    self._rebase_pending(local_next_id)
+            self._disk_state = fingerprint
+            return changed
+
+    def _rebase_pending(self, local_next_id):
+        """Desloca os IDs das linhas novas ainda não gravadas para depois dos que outro processo gravou."""
+        pending, self._pending = self._pending, []
+        try:
+            self.read()
+        except FileNotFoundError:
+            self._next_id = 1
+        finally:
+            self._pending = pending
+        if self._pending_first_id is None:  # nenhuma linha nova pendente
+            self._next_id = max(self._next_id, local_next_id or 1)
+            return
+        offset = max(0, self._next_id - self._pending_first_id)
+        self._next_id = local_next_id + offset
+        if offset == 0:
+            return
+        first_id = self._pending_first_id
+        self._pending_first_id += offset
+        self._rebases.append((self.version, first_id, offset))
+
+        def shift(ids):
+            return [i + offset if i >= first_id else i for i in ids]
+
+        for entry in pending:
+            for row in entry["rows"]:
+                if row[ID_COLUMN] >= first_id:
+                    row[ID_COLUMN] += offset
+            if entry["op"] == "edit":
+                entry["deletes"] = shift(entry["deletes"])
+                for update in entry["updates"].values():
+                    update[0] = shift(update[0])
+
+    # --- Leitura ---
+
+    def _read_journal(self):
+        """Entradas gravadas no journal.
+
+        Um final sem quebra de linha que não é JSON válido é uma entrada truncada por uma
+        queda no meio da escrita (nunca confirmada): é ignorado, e descartado do arquivo antes
+        da próxima gravação (_repair_tail()). Uma linha inválida no meio do journal não deveria existir: é
+        registrada no log e ignorada.
+        """
+        entries = []
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                *lines, tail = f.read().split(b"\n")
+            for number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logger.error("Linha %d do journal %s corrompida; entrada ignorada", number, self.journal_path)
+            if tail.strip():
+                try:
+                    entries.append(json.loads(tail))  # entrada completa, só sem o "\n" final
+                except ValueError:
+                    pass
+        self._journal_entries = len(entries) + len(self._pending)
+        return entries
+
+    def _replay(self, df, entries):
+        """Reaplica as entradas do journal em ordem; inclusões consecutivas são concatenadas de uma vez."""
+        pending_rows = []
+        for entry in entries:
+            if entry.get("op") == "add":
+                pending_rows.extend(entry["rows"])
+                continue
+            if pending_rows:
+                df = self.schema.concat([df, self.schema.from_records(pending_rows)])
+                pending_rows = []
+            if entry.get("op") == "edit":
+                df, _, _ = self.schema.apply_edit(df, self._decode_edit(entry))
+        if pending_rows:
+            df = self.schema.concat([df, self.schema.from_records(pending_rows)])
+        return df
+
+    @traced("storage.read")
+    def read(self):
+        """Carrega o arquivo base e reaplica o journal, retornando um DataFrame tipado."""
+        with self._lock:
+            # Trava compartilhada: outro processo não troca a base nem o journal no meio da leitura
+            with file_lock(self.lock_path, shared=True) if self._lock_depth == 0 else contextlib.nullcontext():
+                if os.path.exists(self.compacted_path):
+                    # Compactação interrompida: o .compacted já contém o journal (ver _write_base())
+                    df = self.backend.read(self.compacted_path, self.schema)
+                    entries = []
+                elif not (os.path.exists(self.base_path) or os.path.exists(self.journal_path) or self._pending):
+                    raise FileNotFoundError(self.base_path)
+                else:
+                    if os.path.exists(self.base_path):
+                        df = self.backend.read(self.base_path, self.schema)
+                    else:
+                        df = self.schema.empty()
+                    entries = self._read_journal()
+            df = self._replay(df, entries + self._pending).reset_index(drop=True)
+            self._track_ids(df)
+            if self._disk_state is None:
+                self._disk_state = self._fingerprint()
+        return df
+
+    # --- Escrita ---
+
+    def journal_size(self):
+        """Número de entradas no journal ainda não compactadas (incluindo as não gravadas)."""
+        with self._lock:
+            if self._journal_entries is None:
+                self._read_journal()
+            return self._journal_entries
+
+    def _track_ids(self, df):
+        """Mantém o próximo ID acima de todos os IDs já vistos (IDs não são reaproveitados no processo)."""
+        next_id = int(df[ID_COLUMN].max()) + 1 if len(df) else 1
+        self._next_id = max(self._next_id or 1, next_id)
+
+    def assign_ids(self, rows_df):
+        """Atribui IDs novos e crescentes às linhas, retornando uma cópia com a coluna 'ID'."""
+        with self._lock:
+            if self._next_id is None:
+                try:
+                    self.read()
+                except FileNotFoundError:
+                    self._next_id = 1
+            ids = np.arange(self._next_id, self._next_id + len(rows_df), dtype=np.int64)
+            self._next_id += len(rows_df)
+        return rows_df.assign(**{ID_COLUMN: ids})
+
+    @traced("storage.append")
+    def append(self, rows_df):
+        """Acrescenta linhas ao journal sem reescrever o arquivo base; retorna as linhas com seus IDs."""
+        with self._exclusive():
+            rows_df = self.assign_ids(rows_df)
+            self._write_entry({"op": "add", "rows": self.schema.to_records(rows_df)})
+        return rows_df
+
+    @traced("storage.edit")
+    def edit(self, batch, version=None):
+        """Registra um lote de edições/exclusões/inclusões como uma única entrada do journal.
+
+        `version` é a versão em que os IDs do lote foram lidos (padrão: a de antes desta
+        chamada). Se depois dela as linhas ainda pendentes ganharam IDs novos (outro processo
+        gravou antes, ver _rebase_pending()), os IDs do lote são deslocados da mesma forma.
+        Retorna o lote com os IDs definitivos.
+        """
+        with self._exclusive():
+            seen = self._locked_version if version is None else version
+            for rebase_version, first_id, offset in self._rebases:
+                if rebase_version > seen:
+                    batch = self._rebase_batch(batch, first_id, offset)
+            if batch.added is not None and len(batch.added):
+                batch = batch._replace(added=self.assign_ids(batch.added))
+            self._write_entry(self._encode_edit(batch))
+        return batch
+
+    @staticmethod
+    def _rebase_batch(batch, first_id, offset):
+        def shift(ids):
+            ids = np.asarray(ids, dtype=np.int64)
+            return np.where(ids >= first_id, ids + offset, ids)
+
+        updates = {col: (shift(ids), values) for col, (ids, values) in batch.updates.items()}
+        return batch._replace(updates=updates, deletes=shift(batch.deletes))
+
+    def _encode_edit(self, batch):
+        updates = {}
+        for col, (ids, values) in batch.updates.items():
+            if col in self.schema.date_columns:
+                values = values.dt.strftime('%Y-%m-%d')
+            updates[col] = [np.asarray(ids).tolist(), values.astype(object).where(values.notna(), None).tolist()]
+        added = batch.added if batch.added is not None else self.schema.empty()
+        return {
+            "op": "edit",
+            "updates": updates,
+            "deletes": np.asarray(batch.deletes, dtype=np.int64).tolist(),
+            "rows": self.schema.to_records(added),
+        }
+
+    def _decode_edit(self, entry):
+        updates = {
+            col: (np.asarray(ids, dtype=np.int64), self.schema.parse_values(col, values))
+            for col, (ids, values) in entry["updates"].items()
+        }
+        return EditBatch(updates, entry["deletes"], self.schema.from_records(entry["rows"]))
+
+    def _write_entry(self, entry):
+        """Enfileira uma entrada do journal; chamado com _exclusive() já adquirido."""
+        with self._lock:
+            size = self.journal_size()
+            if self._pending_first_id is None and entry["rows"]:
+                self._pending_first_id = min(row[ID_COLUMN] for row in entry["rows"])
+            self._pending.append(entry)
+            self._journal_entries = size + 1
+            self.version += 1
+            if self.flush_delay > 0:
+                if self._flush_timer is None:
+                    self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+            else:
+                self._flush_pending()
+
+    def flush(self):
+        """Grava no journal as entradas pendentes (uma escrita e um fsync para o lote todo)."""
+        with self._exclusive():
+            self._flush_pending()
+
+    def _flush_pending(self):
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending:
+                return
+            with SPANS.span("storage.flush", rows=len(self._pending)):
+                lines = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in self._pending)
+                self._repair_tail()
+                with open(self.journal_path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._pending = []
+            self._pending_first_id = None
+            self._disk_state = self._fingerprint()
+            if self._journal_entries >= self.compact_threshold:
+                self.compact_in_background()
+
+    def _repair_tail(self):
+        """Deixa o journal terminando em "\\n" antes de acrescentar entradas.
+
+        Sem isso, a próxima entrada seria escrita colada a uma linha truncada por uma queda e
+        as duas virariam uma linha inválida. O final truncado é descartado (ou, se já for uma
+        entrada completa sem o "\\n", recebe a quebra de linha que faltava).
+        """
+        try:
+            f = open(self.journal_path, "rb+")
+        except FileNotFoundError:
+            return
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Procura a última quebra de linha a partir do fim, em blocos
+            end, block = size, 64 * 1024
+            while end > 0:
+                start = max(0, end - block)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    start += newline + 1
+                    break
+                end = start
+            else:
+                start = 0
+            f.seek(start)
+            tail = f.read()
+            try:
+                json.loads(tail)
+            except ValueError:
+                f.truncate(start)
+            else:
+                f.write(b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_base(self, df):
+        """Grava o arquivo base e descarta o journal; chamado com _exclusive() já adquirido.
+
+        A troca não pode reaplicar o journal sobre uma base que já o contém: o conteúdo
+        completo vai primeiro para `<base>.compacted`, depois o journal é apagado e só então
+        o .compacted substitui a base. Enquanto o .compacted existir, ele é o conteúdo
+        completo: read() o usa no lugar da base e do journal, e a próxima escrita conclui
+        a troca (_finish_compaction()).
+        """
+        with self._lock:
+            atomic_write(self.compacted_path, lambda path: self.backend.write(path, df, self.schema))
+            self._finish_compaction()
+            self._journal_entries = 0
+            self._disk_state = self._fingerprint()
+
+    def _finish_compaction(self):
+        """Conclui uma troca de base interrompida (ver _write_base()); chamado com a trava exclusiva."""
+        if not os.path.exists(self.compacted_path):
+            return
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        os.replace(self.compacted_path, self.base_path)
+        _fsync_dir(os.path.dirname(self.base_path))
+
+    @traced("storage.rewrite")
+    def rewrite(self, df):
+        """Reescreve o arquivo base com o DataFrame completo e descarta o journal.
+
+        As entradas ainda pendentes são descartadas: `df` já é o conteúdo completo.
+        """
+        with self._exclusive():
+            self._pending, self._pending_first_id = [], None
+            self._write_base(df)
+            self._track_ids(df)
+            self.version += 1
+
+    @traced("storage.compact")
+    def compact(self):
+        """Incorpora o journal ao arquivo base (sem alterar o conteúdo nem a versão)."""
+        with self._exclusive():
+            if self.journal_size() == 0:
+                return
+            df = self.read()
+            self._pending, self._pending_first_id = [], None
+            self._write_base(df)
+
+    def compact_in_background(self):
+        """Dispara a compactação em uma thread de fundo (no máximo uma por vez)."""
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    # --- Importação/Exportação CSV ---
+
+    def migrate_from_csv(self, csv_path):
+        """Migração única: cria o arquivo base a partir do CSV legado (e seu journal), se preciso."""
+        if isinstance(self.backend, CsvBackend):
+            return False
+        if os.path.exists(self.base_path) or os.path.exists(self.compacted_path):
+            return False
+        legacy = JournaledStore(csv_path, self.schema, CsvBackend())
+        if not os.path.exists(csv_path) and not os.path.exists(legacy.journal_path):
+            return False
+        # Compacta o legado primeiro, para que o CSV continue completo como cópia de exportação
+        legacy.compact()
+        self.rewrite(legacy.read())
+        return True
+
+    def export_csv(self, path=None):
+        """Exporta o conjunto de dados completo (base + journal) para CSV; sem `path`, retorna o texto."""
+        df = self.read()
+        if path is None:
+            return CsvBackend().write(None, df, self.schema)
+        atomic_write(path, lambda tmp_path: CsvBackend().write(tmp_path, df, self.schema))
+
+    def import_csv(self, path_or_buffer):
+        """Substitui o conjunto de dados pelo conteúdo de um arquivo CSV."""
+        df = CsvBackend().read(path_or_buffer, self.schema).reset_index(drop=True)
+        self.rewrite(df)
+        return df
+
+
+def open_store(data_dir, name, schema, backend=None):
+    """Abre o conjunto de dados `name` em `data_dir`, migrando do CSV legado na primeira vez."""
+    backend = backend or get_backend()
+    path = os.path.join(data_dir, name + backend.extension)
+    if hasattr(backend, "open_store"):
+        store = backend.open_store(path, name, schema)
+    else:
+        store = JournaledStore(path, schema, backend, flush_delay=FLUSH_DELAY)
+    store.migrate_from_csv(os.path.join(data_dir, name + ".csv"))
+    return store
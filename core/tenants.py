@@ -0,0 +1,21 @@
+# core/tenants.py
+
+import os
+import re
+
+# Usuário padrão: usa a pasta de dados original (instalações de um único usuário)
+DEFAULT_TENANT = "default"
+
+
+def tenant_slug(name):
+    """Nome seguro para pasta a partir do identificador do usuário (e-mail, login etc.)."""
+    slug = re.sub(r"[^a-z0-9._@-]+", "-", str(name or "").strip().lower()).strip(".-")
+    return slug or DEFAULT_TENANT
+
+
+def tenant_data_dir(root, tenant):
+    """Pasta de dados do usuário: `root` para o padrão, `root/tenants/<slug>` para os demais."""
+    slug = tenant_slug(tenant)
+    path = root if slug == DEFAULT_TENANT else os.path.join(root, "tenants", slug)
+    os.makedirs(path, exist_ok=True)
+    return path
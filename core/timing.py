@@ -0,0 +1,61 @@
+# core/timing.py
+
+import contextlib
+import threading
+import time
+from collections import defaultdict
+
+
+class SectionTimings:
+    """Tempo de execução de cada seção do dashboard, separando execuções completas do
+    script das reexecuções isoladas da seção (fragmentos).
+
+    Como `CACHE_STATS`, uma instância única (`SECTION_TIMINGS`) é compartilhada por
+    todas as sessões do processo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = defaultdict(int)
+        self._total = defaultdict(float)
+        self._last = {}
+
+    @contextlib.contextmanager
+    def measure(self, section, partial=False):
+        """Mede o bloco como uma execução de `section` (`partial=True`: só a seção foi reexecutada)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(section, time.perf_counter() - start, partial)
+
+    def record(self, section, seconds, partial=False):
+        key = (section, partial)
+        with self._lock:
+            self._runs[key] += 1
+            self._total[key] += seconds
+            self._last[key] = seconds
+
+    def rows(self):
+        """Uma linha por seção e tipo de execução, com número de execuções e tempos em ms."""
+        with self._lock:
+            rows = []
+            for section, partial in sorted(self._runs, key=lambda key: (key[0], key[1])):
+                key = (section, partial)
+                rows.append({
+                    "Seção": section,
+                    "Execução": "só a seção" if partial else "script completo",
+                    "Execuções": self._runs[key],
+                    "Última (ms)": self._last[key] * 1e3,
+                    "Média (ms)": self._total[key] / self._runs[key] * 1e3,
+                })
+            return rows
+
+    def reset(self):
+        with self._lock:
+            self._runs.clear()
+            self._total.clear()
+            self._last.clear()
+
+
+SECTION_TIMINGS = SectionTimings()
@@ -0,0 +1,29 @@
+# tests/test_importer.py
+
+import numpy as np
+import pytest
+
+from core.importer import _parse_amounts
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Vírgula decimal (extratos brasileiros)
+    ("1.234,56", 1234.56),
+    ("-1.234,56", -1234.56),
+    ("1.234.567,89", 1234567.89),
+    ("R$ 12,5", 12.5),
+    # Ponto decimal (extratos em inglês)
+    ("1,234.56", 1234.56),
+    ("-1,234.56", -1234.56),
+    ("1,234,567.89", 1234567.89),
+    ("12.5", 12.5),
+    # Um separador repetido é de milhar
+    ("1,234,567", 1234567.0),
+    ("1.234.567", 1234567.0),
+])
+def test_parse_amounts_decimal_separator(text, expected):
+    assert _parse_amounts([text])[0] == pytest.approx(expected)
+
+
+def test_parse_amounts_invalid_is_nan():
+    assert np.isnan(_parse_amounts(["abc"])[0])
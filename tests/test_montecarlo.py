@@ -0,0 +1,21 @@
+# tests/test_montecarlo.py
+
+import os
+
+import pandas as pd
+
+from core.montecarlo import PARALLEL_MIN_PATHS, simulate_percentiles
+
+
+def test_parallel_result_does_not_depend_on_cpu_count(monkeypatch):
+    params = dict(initial_investment=1_000.0, monthly_contribution=100.0, years=2,
+                  n_paths=PARALLEL_MIN_PATHS, seed=7)
+    expected = simulate_percentiles(**params)
+    for cpus in (1, 3, 64):
+        monkeypatch.setattr(os, "cpu_count", lambda cpus=cpus: cpus)
+        pd.testing.assert_frame_equal(simulate_percentiles(**params), expected)
+
+
+def test_serial_result_is_reproducible():
+    params = dict(initial_investment=1_000.0, monthly_contribution=100.0, years=5, n_paths=2_000, seed=3)
+    pd.testing.assert_frame_equal(simulate_percentiles(**params), simulate_percentiles(**params))
@@ -0,0 +1,73 @@
+# tests/test_simulation.py
+#
+# Propriedades do simulador em forma fechada (core/simulation.py) contra o laço mês a mês
+# que ele substituiu, em parâmetros aleatórios (incluindo taxa zero e aporte zero).
+
+import numpy as np
+import pytest
+
+from core.simulation import simulate_grid, simulate_investment
+
+N_CASES = 200
+
+
+def loop_simulation(initial_investment, monthly_contribution, annual_rate_percent, years):
+    """Implementação de referência: o laço mês a mês anterior, como (investido, acumulado)."""
+    monthly_interest_rate = (1 + annual_rate_percent / 100) ** (1 / 12) - 1
+    invested_capital = []
+    accumulated_capital = []
+    current_accumulated = initial_investment
+    total_invested = initial_investment
+    for month in range(1, int(years * 12) + 1):
+        if month > 1:
+            current_accumulated += monthly_contribution
+            total_invested += monthly_contribution
+        current_accumulated *= (1 + monthly_interest_rate)
+        invested_capital.append(total_invested)
+        accumulated_capital.append(current_accumulated)
+    return np.array(invested_capital), np.array(accumulated_capital)
+
+
+def random_parameters(rng):
+    """Um cenário aleatório; um terço dos casos com taxa zero e um terço com aporte zero."""
+    initial = float(rng.choice([0.0, rng.uniform(0, 100_000)]))
+    contribution = 0.0 if rng.random() < 1 / 3 else float(rng.uniform(0, 5_000))
+    rate = 0.0 if rng.random() < 1 / 3 else float(rng.uniform(0, 30))
+    years = int(rng.integers(1, 41))
+    return initial, contribution, rate, years
+
+
+@pytest.mark.parametrize("seed", range(N_CASES))
+def test_simulate_investment_matches_loop(seed):
+    params = random_parameters(np.random.default_rng(seed))
+    invested, accumulated = loop_simulation(*params)
+    df = simulate_investment(*params)
+    np.testing.assert_array_equal(df["Mês"].to_numpy(), np.arange(1, len(invested) + 1))
+    np.testing.assert_allclose(df["Capital Investido"].to_numpy(), invested, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(df["Capital Acumulado"].to_numpy(), accumulated, rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_simulate_grid_matches_loop_per_scenario(seed):
+    rng = np.random.default_rng(1000 + seed)
+    scenarios = [random_parameters(rng) for _ in range(8)]
+    initial, contribution, rate, years = (np.array(values) for values in zip(*scenarios))
+    months, invested, accumulated = simulate_grid(initial, contribution, rate, years)
+
+    assert invested.shape == accumulated.shape == (len(scenarios), years.max() * 12)
+    np.testing.assert_array_equal(months, np.arange(1, years.max() * 12 + 1))
+    for i, params in enumerate(scenarios):
+        expected_invested, expected_accumulated = loop_simulation(*params)
+        horizon = len(expected_invested)
+        np.testing.assert_allclose(invested[i, :horizon], expected_invested, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(accumulated[i, :horizon], expected_accumulated, rtol=1e-9, atol=1e-6)
+        # Depois do horizonte do cenário, NaN
+        assert np.isnan(invested[i, horizon:]).all()
+        assert np.isnan(accumulated[i, horizon:]).all()
+
+
+def test_zero_rate_and_zero_contribution():
+    months, invested, accumulated = simulate_grid(1_000.0, 0.0, 0.0, 2)
+    assert len(months) == 24
+    np.testing.assert_array_equal(invested, np.full(24, 1_000.0))
+    np.testing.assert_array_equal(accumulated, np.full(24, 1_000.0))
@@ -0,0 +1,174 @@
+# tests/test_storage.py
+#
+# Journal, compactação e escrita concorrente do JournaledStore (core/storage.py). Dois
+# stores no mesmo caminho fazem o papel de dois processos: cada um tem o seu estado em
+# memória e só se enxergam pelos arquivos (e pela trava de arquivo).
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.storage import TRANSACTIONS_SCHEMA, EditBatch, FeatherBackend, JournaledStore
+
+# Janela de gravação longa o bastante para as linhas ficarem pendentes durante o teste
+LONG_FLUSH_DELAY = 60.0
+
+
+def rows(*values, description="linha"):
+    return TRANSACTIONS_SCHEMA.normalize(pd.DataFrame({
+        "Data": pd.Timestamp("2024-01-10"),
+        "Tipo": "Despesa",
+        "Categoria": "Outros",
+        "Descrição": description,
+        "Valor": list(values),
+    }))
+
+
+def value_update(ids, values):
+    return EditBatch({"Valor": (np.asarray(ids), pd.Series(values, dtype=float))}, [], None)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "transactions.feather")
+
+
+def open_store(path, **kwargs):
+    return JournaledStore(path, TRANSACTIONS_SCHEMA, FeatherBackend(), **kwargs)
+
+
+def test_edit_of_pending_row_follows_rebased_id(path):
+    a = open_store(path)
+    b = open_store(path, flush_delay=LONG_FLUSH_DELAY)
+    b_row = b.append(rows(10.0, description="b"))
+    assert b_row["ID"].tolist() == [1]
+    a.append(rows(20.0, description="a"))  # grava o ID 1 antes de b
+
+    # O lote usa o ID que b devolveu; as linhas pendentes de b passam para depois das de a
+    b.edit(value_update(b_row["ID"], [11.0]))
+    b.flush()
+
+    df = open_store(path).read().set_index("Descrição")
+    assert df["ID"].tolist() == [1, 2]
+    assert df.loc["a", "Valor"] == 20.0
+    assert df.loc["b", "Valor"] == 11.0
+
+
+def test_edit_with_version_seen_before_refresh(path):
+    a = open_store(path)
+    b = open_store(path, flush_delay=LONG_FLUSH_DELAY)
+    b_row = b.append(rows(10.0, description="b"))
+    seen = b.version
+    a.append(rows(20.0, description="a"))
+    b.refresh()  # o rebase acontece fora do edit (como no snapshot() do livro-caixa)
+
+    b.edit(EditBatch({}, b_row["ID"].tolist(), None), version=seen)
+    b.flush()
+
+    assert open_store(path).read()["Descrição"].tolist() == ["a"]
+
+
+def test_replay_after_reopen(path):
+    store = open_store(path)
+    store.append(rows(1.0, 2.0))
+    store.edit(value_update([1], [5.0]))
+    store.append(rows(3.0))
+
+    df = open_store(path).read()
+    assert df["ID"].tolist() == [1, 2, 3]
+    assert df["Valor"].tolist() == [5.0, 2.0, 3.0]
+
+
+def test_torn_tail_is_repaired_before_next_append(path):
+    store = open_store(path)
+    store.append(rows(1.0, 2.0))
+    with open(store.journal_path, "ab") as f:
+        f.write('{"op": "add", "rows": [{"ID": 3, "Descrição": "Padaria S'.encode()[:-1])  # queda no meio
+
+    assert open_store(path).read()["ID"].tolist() == [1, 2]
+    store = open_store(path)
+    store.append(rows(4.0))
+    assert store.read()["Valor"].tolist() == [1.0, 2.0, 4.0]
+    assert open_store(path).read()["Valor"].tolist() == [1.0, 2.0, 4.0]
+
+
+def test_complete_entry_without_newline_is_kept(path):
+    store = open_store(path)
+    store.append(rows(1.0))
+    with open(store.journal_path, "rb+") as f:
+        f.truncate(f.seek(0, 2) - 1)  # só o "\n" final se perdeu
+
+    store = open_store(path)
+    store.append(rows(2.0))
+    assert open_store(path).read()["Valor"].tolist() == [1.0, 2.0]
+
+
+@pytest.mark.parametrize("journal_removed", [False, True])
+def test_compaction_crash_recovery(path, journal_removed):
+    store = open_store(path)
+    store.append(rows(1.0, 2.0, 3.0))
+    with open(store.journal_path, "rb") as f:
+        journal = f.read()
+    store.compact()
+    # Queda com o .compacted já gravado: antes de apagar o journal ou antes do rename final
+    with open(path, "rb") as f, open(store.compacted_path, "wb") as compacted:
+        compacted.write(f.read())
+    if not journal_removed:
+        with open(store.journal_path, "wb") as f:
+            f.write(journal)
+
+    assert open_store(path).read()["ID"].tolist() == [1, 2, 3]
+    store = open_store(path)
+    store.append(rows(4.0))
+    assert open_store(path).read()["ID"].tolist() == [1, 2, 3, 4]
+
+
+def test_flush_delay_coalesces_entries(path):
+    writer = open_store(path, flush_delay=LONG_FLUSH_DELAY)
+    writer.append(rows(1.0))
+    writer.append(rows(2.0))
+    assert writer.read()["Valor"].tolist() == [1.0, 2.0]  # pendentes já visíveis no próprio store
+    with pytest.raises(FileNotFoundError):
+        open_store(path).read()
+
+    writer.flush()
+    with open(writer.journal_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+    assert open_store(path).read()["Valor"].tolist() == [1.0, 2.0]
+
+
+def test_two_stores_append(path):
+    a = open_store(path)
+    b = open_store(path)
+    a.append(rows(1.0))
+    b.append(rows(2.0))
+    a.append(rows(3.0))
+
+    df = open_store(path).read()
+    assert df["ID"].tolist() == [1, 2, 3]
+    assert df["Valor"].tolist() == [1.0, 2.0, 3.0]
+    assert a.read()["ID"].tolist() == b.read()["ID"].tolist() == [1, 2, 3]
+
+
+def test_two_stores_pending_appends_keep_distinct_ids(path):
+    a = open_store(path)
+    b = open_store(path, flush_delay=LONG_FLUSH_DELAY)
+    b.append(rows(1.0, description="b"))
+    a.append(rows(2.0, description="a"))
+    b.flush()
+
+    df = open_store(path).read()
+    assert df["ID"].tolist() == [1, 2]
+    assert df["Descrição"].tolist() == ["a", "b"]
+
+
+def test_two_stores_append_and_edit(path):
+    a = open_store(path)
+    a.append(rows(1.0, 2.0))
+    b = open_store(path)
+    b.edit(value_update([2], [20.0]))
+    a.append(rows(3.0))
+
+    df = open_store(path).read()
+    assert df["ID"].tolist() == [1, 2, 3]
+    assert df["Valor"].tolist() == [1.0, 20.0, 3.0]